@@ -7,72 +7,85 @@ Original file is located at
     https://colab.research.google.com/drive/1Q8tQr3qYr2jcqsoC4sW33rrPc6NX00lR
 """
 
-import numpy as np
+import argparse
 import pandas as pd
-import networkx as nx
-import matplotlib.pyplot as plt
-
-data1 = pd.read_csv('/content/sensor_data_nRF_IMU_1_19092025_164551_not_labelled.csv')
-data2 = pd.read_csv('/content/sensor_data_nRF_IMU_2_19092025_164551_labelled.csv')
-
-data1.head()
-
-data2.head()
-
-data2 = data2.drop('Unnamed: 11', axis=1)
-data2.head()
-
-data2.dropna(inplace=True)
-data2.head()
-
-data = pd.merge(data1, data2, on=['TimeStamp'])
-data.head()
-
-data.info()
-
-data['TimeStamp'] = pd.to_datetime(data['TimeStamp'])
-data['delta_t'] = data['TimeStamp'].diff()
-data['delta_t'] = data['delta_t'].dt.total_seconds().fillna(0)
-
-data.sample(10)
-
-G = nx.DiGraph()
-nodes = list(range(1, 13))
-G.add_nodes_from(nodes)
-edge_weights = {}
-
-for i in range(1, 12):
-    mask = (data['Position'] == i)
-    next_pose_indices = data.index[data['Position'] == i + 1].tolist()
-
-    delta_ts = []
-    for idx in next_pose_indices:
-        prev_idx = idx - 1
-        if prev_idx in data.index and data.loc[prev_idx, 'Position'] == i:
-            delta_ts.append(data.loc[idx, 'delta_t'])
-
-    if delta_ts:
-        avg_weight = sum(delta_ts) / len(delta_ts)
+from pose_graph import DEFAULT_GRAPH_PATH
+from round_segmenter import RoundSegmenter, RoundStats, segment_stream
+
+SOURCES = ['/content/sensor_data_nRF_IMU_1_19092025_164551_not_labelled.csv',
+           '/content/sensor_data_nRF_IMU_2_19092025_164551_labelled.csv']
+NODES = list(range(1, 13))
+
+def load_session(sources):
+    data1 = pd.read_csv(sources[0])
+    data2 = pd.read_csv(sources[1])
+    data2 = data2.drop('Unnamed: 11', axis=1)
+    data2.dropna(inplace=True)
+
+    data = pd.merge(data1, data2, on=['TimeStamp'])
+    data['TimeStamp'] = pd.to_datetime(data['TimeStamp'])
+    data['delta_t'] = data['TimeStamp'].diff()
+    data['delta_t'] = data['delta_t'].dt.total_seconds().fillna(0)
+    return data
+
+def build_graph(data, graph_path=DEFAULT_GRAPH_PATH, nodes=NODES, rounds_path=None):
+    # Rows are streamed round by round; edge and dwell means are updated per round
+    stats = RoundStats(nodes)
+    times = (data['TimeStamp'] - data['TimeStamp'].iloc[0]).dt.total_seconds().to_numpy()
+    rounds = segment_stream(times, data['Position'].to_numpy(), RoundSegmenter(nodes), stats)
+    if rounds_path:
+        pd.DataFrame(rounds).to_csv(rounds_path, index=False)
+    print(f"{len(rounds)} round(s), {sum(r['complete'] for r in rounds)} complete")
+
+    # Saved for the automatic labeler and the streaming decoder (duration priors)
+    stats.save(graph_path)
+    return stats.edge_weights()
+
+def draw_graph(edge_weights, nodes=NODES, output=None):
+    """Linear layout of the pose chain with edge weights; shown, or saved to ``output``."""
+    import networkx as nx
+    import matplotlib
+    if output:
+        matplotlib.use('Agg')
+    import matplotlib.pyplot as plt
+
+    G = nx.DiGraph()
+    G.add_nodes_from(nodes)
+    for (i, j), avg_weight in edge_weights.items():
+        G.add_edge(i, j, weight=avg_weight)
+
+    pos = {i: (i, 0) for i in nodes}
+
+    plt.figure(figsize=(12, 3))
+
+    nx.draw_networkx_nodes(G, pos, node_size=700, node_color='red')
+
+    nx.draw_networkx_labels(G, pos, font_size=14, font_weight='bold')
+
+    nx.draw_networkx_edges(G, pos, edge_color='black', width=4, arrowsize=20)
+
+    edge_labels = {(u, v): f"{d['weight']:.2f}s" for u, v, d in G.edges(data=True)}
+    nx.draw_networkx_edge_labels(G, pos, edge_labels=edge_labels, label_pos=0.5,
+                                 font_color='blue', font_size=7, rotate=False, font_weight='bold')
+
+    plt.title("Surya Namaskar Pose Sequence Graph with Weighted Edges")
+    plt.tight_layout()
+    if output:
+        plt.savefig(output)
     else:
-        avg_weight = 0
-
-    edge_weights[(i, i+1)] = avg_weight
-    G.add_edge(i, i+1, weight=avg_weight)
-
-pos = {i: (i, 0) for i in range(1, 13)}
-
-plt.figure(figsize=(12, 3))
-
-nx.draw_networkx_nodes(G, pos, node_size=700, node_color='red')
-
-nx.draw_networkx_labels(G, pos, font_size=14, font_weight='bold')
-
-nx.draw_networkx_edges(G, pos, edge_color='black', width=4, arrowsize=20)
-
-edge_labels = {(u, v): f"{d['weight']:.2f}s" for u, v, d in G.edges(data=True)}
-nx.draw_networkx_edge_labels(G, pos, edge_labels=edge_labels, label_pos=0.5,
-                             font_color='blue', font_size=7, rotate=False, font_weight='bold')
-
-plt.title("Surya Namaskar Pose Sequence Graph with Weighted Edges")
-plt.tight_layout()
-plt.show()
\ No newline at end of file
+        plt.show()
+
+if __name__ == '__main__':
+    p = argparse.ArgumentParser()
+    p.add_argument('--inputs', nargs=2, default=SOURCES, metavar=('NOT_LABELLED', 'LABELLED'),
+                   help='Device 1 (not labelled) and device 2 (labelled) CSVs of the session')
+    p.add_argument('--graph', default=DEFAULT_GRAPH_PATH, help='Output pose graph JSON')
+    p.add_argument('--rounds', default=None, help='Also write per-round timing vectors (CSV)')
+    p.add_argument('--plot', default=None, help='Save the DAG figure here instead of showing it')
+    p.add_argument('--no-plot', action='store_true', help='Only write the pose graph JSON')
+    args = p.parse_args()
+
+    data = load_session(args.inputs)
+    edge_weights = build_graph(data, args.graph, rounds_path=args.rounds)
+    if not args.no_plot:
+        draw_graph(edge_weights, output=args.plot)
@@ -0,0 +1,139 @@
+"""
+Streaming pose smoothing over the Surya Namaskar pose graph.
+
+Feeds per-step class probabilities (one row per window prediction) through the
+same left-to-right HMM as the automatic labeler (pose_graph.py) and emits:
+  - the forward-filtered pose for the current step (no lag), and
+  - the fixed-lag Viterbi pose for the step ``lag`` samples back, which is the
+    smoothed decision to use for feedback.
+
+Each step costs one (S x S) max-product and one (S x S) sum-product update plus a
+back-pointer walk of at most ``lag`` entries, so with 12 poses it is negligible
+next to model inference. Memory is bounded by the lag.
+
+Usage (replay a batch_infer output and compare flicker):
+  python online_decoder.py --predictions predictions/19092025_164551.parquet --graph pose_graph.json --lag 8
+
+The smoothed poses are also cut into Surya Namaskar rounds (round_segmenter.py);
+--rounds writes the per-round timing vectors.
+"""
+import argparse
+from collections import deque
+import numpy as np
+import pandas as pd
+from pose_graph import (DEFAULT_DWELL_SECONDS, DEFAULT_SAMPLE_RATE, SURYA_NAMASKAR_POSES,
+                        load_graph, sequence_transitions)
+from round_segmenter import RoundSegmenter, RoundStats, format_rounds, seconds_of_day, segment_stream
+
+
+class OnlinePoseDecoder:
+    """Forward filter plus fixed-lag Viterbi over a pose transition matrix."""
+
+    def __init__(self, poses, transitions, lag=8, initial=None):
+        self.poses = np.asarray(poses)
+        self.transitions = np.asarray(transitions, dtype=np.float64)
+        with np.errstate(divide='ignore'):
+            self.log_transitions = np.log(self.transitions)
+        n = len(self.poses)
+        self.initial = np.asarray(initial, dtype=np.float64) if initial is not None else np.full(n, 1.0 / n)
+        self.lag = lag
+        self._cols = np.arange(n)
+        self.reset()
+
+    @classmethod
+    def from_graph(cls, graph_path=None, poses=SURYA_NAMASKAR_POSES, lag=8, sample_rate=DEFAULT_SAMPLE_RATE):
+        """Build from pose_graph.json (dwell-time priors); falls back to default dwell times."""
+        dwell = load_graph(graph_path)[1] if graph_path else None
+        T = sequence_transitions(list(poses), dwell, default_dwell=DEFAULT_DWELL_SECONDS * sample_rate)
+        return cls(poses, T, lag=lag)
+
+    def reset(self):
+        self.t = 0
+        self.alpha = None
+        self.delta = None
+        self.backpointers = deque(maxlen=self.lag)
+
+    def step(self, probs):
+        """Consume one probability vector.
+
+        Returns ``(filtered_pose, filtered_prob, smoothed)`` where ``smoothed`` is
+        ``(step_index, pose)`` for the step ``lag`` samples back, or None while
+        the first ``lag`` steps are still buffered.
+        """
+        e = np.clip(np.asarray(probs, dtype=np.float64), 1e-12, None)
+        log_e = np.log(e)
+        if self.alpha is None:
+            a = self.initial * e
+            self.delta = np.log(self.initial) + log_e
+        else:
+            a = (self.alpha @ self.transitions) * e
+            cand = self.delta[:, None] + self.log_transitions
+            bp = cand.argmax(axis=0)
+            self.delta = cand[bp, self._cols] + log_e
+            self.delta -= self.delta.max()
+            self.backpointers.append(bp)
+        self.alpha = a / a.sum()
+        self.t += 1
+
+        best = int(self.alpha.argmax())
+        smoothed = None
+        if self.t > self.lag:
+            state = int(self.delta.argmax())
+            for bp in reversed(self.backpointers):
+                state = int(bp[state])
+            smoothed = (self.t - 1 - len(self.backpointers), self.poses[state])
+        return self.poses[best], float(self.alpha[best]), smoothed
+
+    def flush(self):
+        """Final decisions for the buffered tail once the stream ends."""
+        if self.delta is None:
+            return []
+        state = int(self.delta.argmax())
+        tail = [state]
+        for bp in reversed(self.backpointers):
+            state = int(bp[state])
+            tail.append(state)
+        tail = tail[::-1][1:] if self.t > self.lag else tail[::-1]
+        first = self.t - len(tail)
+        return [(first + i, self.poses[s]) for i, s in enumerate(tail)]
+
+
+def decode_stream(prob_rows, decoder):
+    """Smooth an iterable of probability vectors; yields (step_index, pose) in order."""
+    for probs in prob_rows:
+        _, _, smoothed = decoder.step(probs)
+        if smoothed is not None:
+            yield smoothed
+    yield from decoder.flush()
+
+
+def count_switches(labels):
+    labels = np.asarray(labels)
+    return int((labels[1:] != labels[:-1]).sum())
+
+
+if __name__ == '__main__':
+    p = argparse.ArgumentParser()
+    p.add_argument('--predictions', required=True, help='Per-sample predictions Parquet from batch_infer.py')
+    p.add_argument('--graph', default=None, help='pose_graph.json written by dag.py')
+    p.add_argument('--lag', type=int, default=8, help='Fixed lag in samples')
+    p.add_argument('--rounds', default=None, help='Write per-round timing vectors of the smoothed poses (CSV)')
+    args = p.parse_args()
+
+    pred = pd.read_parquet(args.predictions).dropna(subset=['prediction']).reset_index(drop=True)
+    prob_cols = sorted([c for c in pred.columns if c.startswith('prob_')], key=lambda c: float(c[5:]))
+    poses = [float(c[5:]) for c in prob_cols]
+    decoder = OnlinePoseDecoder.from_graph(args.graph, poses, args.lag)
+    decoded = list(decode_stream(pred[prob_cols].to_numpy(), decoder))
+    smoothed = [pose for _, pose in decoded]
+
+    print(f"Steps: {len(smoothed)}")
+    print(f"Pose switches (argmax):   {count_switches(pred['prediction'])}")
+    print(f"Pose switches (smoothed): {count_switches(smoothed)}")
+
+    times = seconds_of_day(pred['TimeStamp'])[[step for step, _ in decoded]]
+    rounds = segment_stream(times, smoothed, RoundSegmenter(poses), RoundStats(poses), session=args.predictions)
+    print(f"Rounds (smoothed): {format_rounds(rounds)}")
+    if args.rounds:
+        pd.DataFrame(rounds).to_csv(args.rounds, index=False)
+        print(f"Saved per-round timing: {args.rounds}")
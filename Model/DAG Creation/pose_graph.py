@@ -0,0 +1,161 @@
+"""
+Surya Namaskar pose graph as a left-to-right HMM.
+
+Shared by dag.py (which measures the graph from labelled data), the automatic
+labeler and the streaming decoder. The 12 poses form a chain 1 -> 2 -> ... -> 12,
+with 12 -> 1 allowed so several rounds can follow each other in one session.
+
+The graph JSON written by dag.py holds:
+  edge_weights  average time difference (s) between consecutive poses (the DAG edges)
+  dwell_rows    average number of consecutive samples spent in each pose
+  dwell_seconds the same dwell expressed in seconds
+
+Dwell lengths become self-loop probabilities (a pose lasting d samples on average
+stays with probability 1 - 1/d), which is the duration prior used in decoding.
+"""
+import json
+import numpy as np
+import pandas as pd
+
+SURYA_NAMASKAR_POSES = list(range(1, 13))
+DEFAULT_GRAPH_PATH = 'pose_graph.json'
+# Sensors deliver about 7-8 readings per second (README, Week 4)
+DEFAULT_SAMPLE_RATE = 7.5
+DEFAULT_DWELL_SECONDS = 2.0
+
+
+def compute_edge_weights(data, poses=SURYA_NAMASKAR_POSES):
+    """Average delta_t over rows where Position steps from pose i to pose i+1.
+
+    ``data`` needs ``Position`` and ``delta_t`` (seconds since the previous row).
+    Poses with no observed transition get weight 0, as in the original DAG notebook.
+    """
+    pos = data['Position'].to_numpy()
+    dt = data['delta_t'].to_numpy()
+    prev = np.concatenate([[np.nan], pos[:-1]])
+    weights = {}
+    for a, b in zip(poses[:-1], poses[1:]):
+        mask = (pos == b) & (prev == a)
+        weights[(a, b)] = float(dt[mask].mean()) if mask.any() else 0.0
+    return weights
+
+
+def compute_dwell_times(data, poses=SURYA_NAMASKAR_POSES):
+    """Average run length of each pose, in rows and in seconds."""
+    pos = data['Position'].to_numpy()
+    ts = pd.to_datetime(data['TimeStamp']).to_numpy() if 'TimeStamp' in data else None
+    change = np.flatnonzero(np.concatenate([[True], pos[1:] != pos[:-1]]))
+    ends = np.concatenate([change[1:], [len(pos)]])
+    rows, secs = {p: [] for p in poses}, {p: [] for p in poses}
+    for s, e in zip(change, ends):
+        p = pos[s]
+        if p in rows:
+            rows[p].append(e - s)
+            if ts is not None:
+                secs[p].append((ts[e - 1] - ts[s]) / np.timedelta64(1, 's'))
+    dwell_rows = {p: float(np.mean(v)) if v else 0.0 for p, v in rows.items()}
+    dwell_seconds = {p: float(np.mean(v)) if v else 0.0 for p, v in secs.items()}
+    return dwell_rows, dwell_seconds
+
+
+def save_graph(path, edge_weights, dwell_rows, dwell_seconds):
+    state = {
+        'poses': SURYA_NAMASKAR_POSES,
+        'edge_weights': {f"{a}->{b}": w for (a, b), w in edge_weights.items()},
+        'dwell_rows': {str(p): v for p, v in dwell_rows.items()},
+        'dwell_seconds': {str(p): v for p, v in dwell_seconds.items()},
+    }
+    with open(path, 'w') as f:
+        json.dump(state, f, indent=2)
+    return path
+
+
+def load_graph(path):
+    """Return (edge_weights, dwell_rows, dwell_seconds) as written by ``save_graph``."""
+    with open(path) as f:
+        state = json.load(f)
+    edges = {tuple(int(x) for x in k.split('->')): v for k, v in state['edge_weights'].items()}
+    dwell_rows = {int(k): v for k, v in state['dwell_rows'].items()}
+    dwell_seconds = {int(k): v for k, v in state['dwell_seconds'].items()}
+    return edges, dwell_rows, dwell_seconds
+
+
+def sequence_transitions(poses, dwell_rows=None, default_dwell=DEFAULT_DWELL_SECONDS * DEFAULT_SAMPLE_RATE,
+                         skip_prob=1e-3, allow_restart=True):
+    """Row-stochastic transition matrix over ``poses`` (in sequence order).
+
+    Each pose stays with probability 1 - 1/dwell and otherwise advances to the
+    next pose; ``skip_prob`` lets the chain jump one pose ahead so a single missed
+    pose does not derail decoding. With ``allow_restart`` the last pose leads back
+    to the first (next round); otherwise it is absorbing.
+    """
+    n = len(poses)
+    T = np.zeros((n, n))
+    for i, p in enumerate(poses):
+        d = (dwell_rows or {}).get(p) or default_dwell
+        stay = 1.0 - 1.0 / max(d, 1.0 + 1e-6)
+        if i == n - 1 and not allow_restart:
+            T[i, i] = 1.0
+            continue
+        nxt = (i + 1) % n
+        skip = (i + 2) % n if (allow_restart or i + 2 < n) else None
+        T[i, i] = stay
+        move = 1.0 - stay
+        if skip is not None and n > 2 and skip_prob > 0:
+            T[i, skip] += move * skip_prob
+            move *= 1.0 - skip_prob
+        T[i, nxt] += move
+    return T
+
+
+def _log(x):
+    with np.errstate(divide='ignore'):
+        return np.log(x)
+
+
+def viterbi(emissions, transitions, initial=None):
+    """Most likely state path for (T, S) per-step state probabilities.
+
+    Runs in O(T * S^2) time and keeps only int16 back-pointers, so it is linear in
+    session length. Emissions are used as scaled likelihoods (classifier posteriors
+    with a uniform class prior).
+    """
+    emissions = np.asarray(emissions, dtype=np.float64)
+    T, S = emissions.shape
+    log_e = _log(np.clip(emissions, 1e-12, None))
+    log_t = _log(transitions)
+    log_i = _log(initial) if initial is not None else np.full(S, -np.log(S))
+    back = np.empty((T, S), dtype=np.int16)
+    score = log_i + log_e[0]
+    back[0] = -1
+    for t in range(1, T):
+        cand = score[:, None] + log_t
+        back[t] = cand.argmax(axis=0)
+        score = cand[back[t], np.arange(S)] + log_e[t]
+    path = np.empty(T, dtype=np.int64)
+    path[-1] = score.argmax()
+    for t in range(T - 1, 0, -1):
+        path[t - 1] = back[t, path[t]]
+    return path
+
+
+def forward_backward(emissions, transitions, initial=None):
+    """Per-step state posteriors (T, S) under the same model as ``viterbi``."""
+    emissions = np.clip(np.asarray(emissions, dtype=np.float64), 1e-12, None)
+    T, S = emissions.shape
+    init = np.asarray(initial) if initial is not None else np.full(S, 1.0 / S)
+    alpha = np.empty((T, S))
+    a = init * emissions[0]
+    alpha[0] = a / a.sum()
+    for t in range(1, T):
+        a = (alpha[t - 1] @ transitions) * emissions[t]
+        alpha[t] = a / a.sum()
+    post = np.empty((T, S))
+    b = np.ones(S)
+    post[-1] = alpha[-1]
+    for t in range(T - 2, -1, -1):
+        b = transitions @ (emissions[t + 1] * b)
+        b /= b.sum()
+        g = alpha[t] * b
+        post[t] = g / g.sum()
+    return post
@@ -0,0 +1,263 @@
+"""
+Online Surya Namaskar round segmentation with per-round pose-graph statistics.
+
+A session holds many rounds (ten sets of two per participant per week).
+``RoundSegmenter.update(t, pose)`` consumes one sample (seconds, pose) in O(1).
+It tracks the current pose run and the open round, and returns the finished
+round when the stream jumps back to the first pose (1) from any later pose:
+normally from the last pose (12), but also when a round skipped the end.
+Unlabelled samples (None/NaN) close the current run without ending the round;
+the next labelled sample is compared with the last labelled pose before the gap.
+Each round carries its timing vectors, indexed by pose:
+  dwell_s / dwell_rows  time and samples spent in each pose (NaN if skipped)
+  entry_s               offset of each pose's first sample from the round start
+  transition_s          mean gap between the last sample of pose i and the first
+                        of pose i+1 over the round's i -> i+1 steps
+                        (transition_n of them), the dag.py edge weight
+A round is complete when it starts at the first pose and visits every pose.
+
+``RoundStats`` folds finished rounds into running means and variances
+(Welford) of the edge and dwell times. The pose graph is therefore updated
+round by round instead of being recomputed over the whole session, and
+``save`` writes the same pose_graph.json as before: edge weights average
+every i -> i+1 step like compute_edge_weights, dwell times are per round. ``deviation`` z-scores a
+round's timing against the rounds before it, which is the per-round feedback.
+
+Usage:
+  python round_segmenter.py --inputs data/labelled/*_labelled.csv --rounds rounds.csv --graph pose_graph.json
+
+Predicted sessions are segmented after smoothing:
+  python online_decoder.py --predictions predictions/19092025_164551.parquet --rounds rounds.csv
+"""
+import argparse
+import numpy as np
+import pandas as pd
+from pose_graph import SURYA_NAMASKAR_POSES, save_graph
+
+
+def is_round_boundary(previous_pose, pose, poses=SURYA_NAMASKAR_POSES):
+    """True when the stream jumps back to the first pose of the sequence from a later one.
+
+    ``previous_pose`` is the last labelled pose, so unlabelled rows in between do not hide the boundary.
+    """
+    return pose == poses[0] and previous_pose is not None and previous_pose != poses[0] and previous_pose in poses
+
+
+class RoundSegmenter:
+    """Streaming round boundaries and per-round timing vectors."""
+
+    def __init__(self, poses=SURYA_NAMASKAR_POSES):
+        self.poses = list(poses)
+        self.index = {p: i for i, p in enumerate(self.poses)}
+        self.rounds = 0
+        self.round = None
+        self.pose = None
+        self.run_start = self.run_end = None
+        self.run_rows = 0
+        # Last labelled pose and its time, remembered across unlabelled samples
+        self.last_pose = self.last_end = None
+
+    def _new_round(self, t, pose):
+        n = len(self.poses)
+        self.round = {'round': self.rounds, 'start_s': t, 'first_pose': pose,
+                      'dwell_s': np.full(n, np.nan), 'dwell_rows': np.zeros(n, dtype=np.int64),
+                      'entry_s': np.full(n, np.nan), 'transition_sum': np.zeros(n - 1),
+                      'transition_n': np.zeros(n - 1, dtype=np.int64)}
+        self.rounds += 1
+
+    def _close_run(self):
+        i = self.index.get(self.pose)
+        if i is None or self.round is None:
+            return
+        r = self.round
+        r['dwell_rows'][i] += self.run_rows
+        r['dwell_s'][i] = np.nan_to_num(r['dwell_s'][i]) + (self.run_end - self.run_start)
+        r['end_s'] = self.run_end
+
+    def _finish(self):
+        r, self.round = self.round, None
+        visited = int((r['dwell_rows'] > 0).sum())
+        r['poses_visited'] = visited
+        r['complete'] = r['first_pose'] == self.poses[0] and visited == len(self.poses)
+        r['duration_s'] = r.get('end_s', r['start_s']) - r['start_s']
+        with np.errstate(invalid='ignore', divide='ignore'):
+            r['transition_s'] = np.where(r['transition_n'] > 0, r['transition_sum'] / r['transition_n'], np.nan)
+        return r
+
+    def update(self, t, pose):
+        """Consume one sample (pose None/NaN or unknown = unlabelled); returns the round it finished, or None."""
+        if pose not in self.index:
+            if self.pose is not None:
+                self._close_run()
+                self.pose = None
+            return None
+        if pose == self.pose:
+            self.run_rows += 1
+            self.run_end = self.last_end = t
+            return None
+        if self.pose is not None:
+            self._close_run()
+        previous, previous_end = self.last_pose, self.last_end
+        finished = None
+        if self.round is not None and is_round_boundary(previous, pose, self.poses):
+            finished = self._finish()
+        if self.round is None:
+            self._new_round(t, pose)
+        i = self.index[pose]
+        r = self.round
+        if np.isnan(r['entry_s'][i]):
+            r['entry_s'][i] = t - r['start_s']
+        if previous is not None and i > 0 and self.index[previous] == i - 1:
+            r['transition_sum'][i - 1] += t - previous_end
+            r['transition_n'][i - 1] += 1
+        self.pose = self.last_pose = pose
+        self.run_start = self.run_end = self.last_end = t
+        self.run_rows = 1
+        return finished
+
+    def flush(self):
+        """Close the open (possibly partial) round at the end of the stream."""
+        if self.pose is not None:
+            self._close_run()
+        self.pose = None
+        return self._finish() if self.round is not None else None
+
+
+class RoundStats:
+    """Running mean/variance of per-round edge, dwell and round-duration timing."""
+
+    def __init__(self, poses=SURYA_NAMASKAR_POSES):
+        self.poses = list(poses)
+        n = len(self.poses)
+        self.rounds = 0
+        # Edge weights average every i -> i+1 step (as compute_edge_weights), not the per-round means
+        self.edge_sum = np.zeros(n - 1)
+        self.edge_count = np.zeros(n - 1, dtype=np.int64)
+        self.moments = {key: [np.zeros(size), np.zeros(size), np.zeros(size)]
+                        for key, size in [('transition_s', n - 1), ('dwell_s', n), ('dwell_rows', n), ('duration_s', 1)]}
+
+    @staticmethod
+    def _values(rnd, key):
+        v = np.atleast_1d(np.asarray(rnd[key], dtype=np.float64))
+        return np.where(v == 0, np.nan, v) if key == 'dwell_rows' else v
+
+    def add(self, rnd):
+        """Welford update with one round (skipped poses / edges leave their entries unchanged)."""
+        self.rounds += 1
+        self.edge_sum += rnd['transition_sum']
+        self.edge_count += rnd['transition_n']
+        for key, (count, mean, m2) in self.moments.items():
+            v = self._values(rnd, key)
+            ok = np.isfinite(v)
+            count[ok] += 1
+            delta = v[ok] - mean[ok]
+            mean[ok] += delta / count[ok]
+            m2[ok] += delta * (v[ok] - mean[ok])
+
+    def mean(self, key):
+        count, mean, _ = self.moments[key]
+        return np.where(count > 0, mean, np.nan)
+
+    def std(self, key):
+        count, _, m2 = self.moments[key]
+        with np.errstate(invalid='ignore', divide='ignore'):
+            return np.where(count > 1, np.sqrt(m2 / (count - 1)), np.nan)
+
+    def deviation(self, rnd):
+        """z-scores of a round against the rounds folded in so far (NaN until two rounds are in, or no spread)."""
+        out = {}
+        for key in ('transition_s', 'dwell_s', 'duration_s'):
+            std = self.std(key)
+            std = np.where(std > 0, std, np.nan)
+            out[key] = (self._values(rnd, key) - self.mean(key)) / std
+        return out
+
+    def edge_weights(self):
+        """{(pose_i, pose_i+1): mean gap over every step}; 0 for edges never observed, as in compute_edge_weights."""
+        with np.errstate(invalid='ignore', divide='ignore'):
+            mean = np.where(self.edge_count > 0, self.edge_sum / self.edge_count, 0.0)
+        return {(a, b): float(w) for a, b, w in zip(self.poses[:-1], self.poses[1:], mean)}
+
+    def dwell_times(self):
+        rows, secs = np.nan_to_num(self.mean('dwell_rows')), np.nan_to_num(self.mean('dwell_s'))
+        return ({p: float(v) for p, v in zip(self.poses, rows)}, {p: float(v) for p, v in zip(self.poses, secs)})
+
+    def save(self, path):
+        """Write the current graph as pose_graph.json (same format as dag.py)."""
+        return save_graph(path, self.edge_weights(), *self.dwell_times())
+
+
+def round_row(rnd, deviation, poses=SURYA_NAMASKAR_POSES, session=None):
+    """Flat per-round record: timing vectors plus z-scores against the previous rounds."""
+    row = {'session': session, 'round': rnd['round'], 'start_s': rnd['start_s'], 'duration_s': rnd['duration_s'],
+           'complete': rnd['complete'], 'poses_visited': rnd['poses_visited'],
+           'duration_z': float(deviation['duration_s'][0])}
+    for i, p in enumerate(poses):
+        row[f'dwell_s_{p}'] = rnd['dwell_s'][i]
+        row[f'entry_s_{p}'] = rnd['entry_s'][i]
+    for i, (a, b) in enumerate(zip(poses[:-1], poses[1:])):
+        row[f'transition_s_{a}_{b}'] = rnd['transition_s'][i]
+    z = np.abs(np.concatenate([deviation['dwell_s'], deviation['transition_s']]))
+    names = [f'dwell {p}' for p in poses] + [f'{a}->{b}' for a, b in zip(poses[:-1], poses[1:])]
+    worst = int(np.nanargmax(z)) if np.isfinite(z).any() else None
+    row['worst_timing'] = names[worst] if worst is not None else None
+    row['worst_timing_z'] = float(z[worst]) if worst is not None else np.nan
+    return row
+
+
+def segment_stream(times, poses, segmenter, stats, session=None):
+    """Feed (time, pose) samples through ``segmenter``; each finished round is scored, then folded into ``stats``."""
+    rows = []
+
+    def finish(rnd):
+        rows.append(round_row(rnd, stats.deviation(rnd), segmenter.poses, session))
+        stats.add(rnd)
+
+    for t, pose in zip(times, poses):
+        rnd = segmenter.update(float(t), pose)
+        if rnd is not None:
+            finish(rnd)
+    rnd = segmenter.flush()
+    if rnd is not None:
+        finish(rnd)
+    return rows
+
+
+def format_rounds(rows):
+    lines = [f"{len(rows)} round(s), {sum(r['complete'] for r in rows)} complete"]
+    for r in rows:
+        lines.append(f"  round {r['round']:2d}: {r['duration_s']:6.1f}s, {r['poses_visited']:2d} poses, "
+                     f"duration z {r['duration_z']:+.2f}, worst {r['worst_timing']} (z {r['worst_timing_z']:.2f})")
+    return '\n'.join(lines)
+
+
+def seconds_of_day(stamps):
+    """Seconds since midnight for logger TimeStamp strings (or anything pandas parses)."""
+    ts = pd.to_datetime(pd.Series(stamps).astype(str), format='%H:%M:%S', errors='coerce')
+    if ts.isna().any():
+        ts = pd.to_datetime(pd.Series(stamps))
+    return ((ts - ts.dt.normalize()) / pd.Timedelta(seconds=1)).to_numpy()
+
+
+if __name__ == '__main__':
+    p = argparse.ArgumentParser()
+    p.add_argument('--inputs', nargs='+', required=True, help='Labelled session CSVs (TimeStamp, Position)')
+    p.add_argument('--graph', default=None, help='Write the per-round pose graph JSON here')
+    p.add_argument('--rounds', default=None, help='Write per-round timing vectors (CSV)')
+    args = p.parse_args()
+
+    stats = RoundStats()
+    rows = []
+    for path in args.inputs:
+        data = pd.read_csv(path, usecols=['TimeStamp', 'Position'])
+        session_rows = segment_stream(seconds_of_day(data['TimeStamp']), data['Position'].to_numpy(),
+                                      RoundSegmenter(), stats, session=path)
+        rows += session_rows
+        print(f"{path}: {format_rounds(session_rows)}")
+    if args.rounds:
+        pd.DataFrame(rows).to_csv(args.rounds, index=False)
+        print(f"Saved per-round timing: {args.rounds}")
+    if args.graph:
+        stats.save(args.graph)
+        print(f"Saved pose graph from {stats.rounds} round(s): {args.graph}")
+    print('Done!')
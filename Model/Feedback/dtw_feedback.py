@@ -0,0 +1,294 @@
+"""
+Execution-correctness feedback against reference performances.
+
+A practitioner's labelled session (TimeStamp, sensor columns, Position) is cut
+into pose segments. Each segment is compared with every reference execution of
+the same pose, e.g. the SAC "proper form" recordings:
+  - shape: banded DTW (Sakoe-Chiba) over the scaled sensor streams, resampled to
+    a fixed length. References are pruned with LB_Keogh against precomputed
+    envelopes, and DTW abandons early once it passes the best distance so far,
+    so scoring stays fast with many references.
+  - angular deviation: angle between the mean gravity direction of each
+    accelerometer (Ax/Ay/Az triplet) in the segment and in the best reference.
+  - timing: pose duration against the median reference duration, and the
+    transition gap into the pose against the dag.py edge weight.
+Segments are numbered by Surya Namaskar round (a jump back to pose 1 from a later
+pose starts a new one) and --rounds writes one summary row per round.
+
+Usage:
+  python dtw_feedback.py build --references sac/*_labelled.csv --output reference_library.npz
+  python dtw_feedback.py score --session 23092025_labelled.csv --library reference_library.npz \
+      --graph "../DAG Creation/pose_graph.json" --output feedback.csv --rounds feedback_rounds.csv
+"""
+import argparse
+import os
+import sys
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'DAG Creation'))
+from pose_graph import load_graph  # noqa: E402
+from round_segmenter import is_round_boundary  # noqa: E402
+
+RESAMPLE_LENGTH = 32
+BAND = 4
+NON_FEATURE_COLUMNS = ['Position', 'TimeStamp']
+
+
+def feature_columns(data):
+    return [c for c in data.columns if c not in NON_FEATURE_COLUMNS and not c.startswith('Unnamed')
+            and pd.api.types.is_numeric_dtype(data[c])]
+
+
+def accelerometer_triplets(columns):
+    """Index triplets of (Ax, Ay, Az) columns, keeping merge suffixes such as Ax_x/Ay_x/Az_x."""
+    triplets = []
+    for i, c in enumerate(columns):
+        if c.startswith('Ax'):
+            y, z = 'Ay' + c[2:], 'Az' + c[2:]
+            if y in columns and z in columns:
+                triplets.append((i, columns.index(y), columns.index(z)))
+    return triplets
+
+
+def parse_timestamps(col):
+    """Logger TimeStamp strings ('%H:%M:%S'), falling back to pandas inference (ISO, datetimes)."""
+    ts = pd.to_datetime(col, format='%H:%M:%S', errors='coerce')
+    return ts if ts.notna().all() else pd.to_datetime(col)
+
+
+def pose_segments(data, columns):
+    """Split a labelled session into contiguous runs of the same Position."""
+    data = data.dropna(subset=['Position']).reset_index(drop=True)
+    pos = data['Position'].to_numpy()
+    ts = parse_timestamps(data['TimeStamp']).to_numpy()
+    X = data[columns].to_numpy(dtype=np.float32)
+    # Logger timestamps have 1 s resolution, so derive the sample period from the whole session
+    span = (ts[-1] - ts[0]) / np.timedelta64(1, 's') if len(ts) > 1 else 0.0
+    period = span / (len(ts) - 1) if span > 0 else 0.0
+    change = np.flatnonzero(np.concatenate([[True], pos[1:] != pos[:-1]]))
+    ends = np.concatenate([change[1:], [len(pos)]])
+    segments = []
+    for s, e in zip(change, ends):
+        gap = (ts[s] - ts[s - 1]) / np.timedelta64(1, 's') if s > 0 else np.nan
+        segments.append({
+            'pose': int(pos[s]),
+            'previous_pose': int(pos[s - 1]) if s > 0 else None,
+            'start_row': int(s),
+            'rows': int(e - s),
+            'duration_s': (e - s) * period,
+            'transition_s': gap,
+            'features': X[s:e],
+        })
+    return segments
+
+
+def resample(x, length=RESAMPLE_LENGTH):
+    """Linear resampling of a (n, f) stream to (length, f)."""
+    if len(x) == 1:
+        return np.repeat(x, length, axis=0)
+    src = np.linspace(0.0, 1.0, len(x))
+    dst = np.linspace(0.0, 1.0, length)
+    return np.stack([np.interp(dst, src, x[:, j]) for j in range(x.shape[1])], axis=1).astype(np.float32)
+
+
+def envelope(x, band=BAND):
+    """Upper/lower LB_Keogh envelopes of a (length, f) series within +/- band steps."""
+    padded = np.pad(x, ((band, band), (0, 0)), mode='edge')
+    win = np.lib.stride_tricks.sliding_window_view(padded, 2 * band + 1, axis=0)
+    return win.max(axis=-1), win.min(axis=-1)
+
+
+def lb_keogh(query, upper, lower):
+    """Lower bound of the banded DTW distance between ``query`` and every reference.
+
+    ``upper``/``lower`` are stacked envelopes of shape (refs, length, f).
+    """
+    above = np.clip(query - upper, 0.0, None)
+    below = np.clip(lower - query, 0.0, None)
+    return np.sqrt((above ** 2 + below ** 2).sum(axis=(1, 2)))
+
+
+def dtw_banded(a, b, band=BAND, best_so_far=np.inf):
+    """Sakoe-Chiba banded DTW (Euclidean) with early abandoning; returns inf when abandoned."""
+    n, m = len(a), len(b)
+    cost = ((a[:, None, :] - b[None, :, :]) ** 2).sum(axis=-1)
+    limit = best_so_far ** 2
+    prev = np.full(m + 1, np.inf)
+    prev[0] = 0.0
+    for i in range(1, n + 1):
+        cur = np.full(m + 1, np.inf)
+        lo, hi = max(1, i - band), min(m, i + band)
+        for j in range(lo, hi + 1):
+            cur[j] = cost[i - 1, j - 1] + min(prev[j - 1], prev[j], cur[j - 1])
+        if cur[lo:hi + 1].min() > limit:
+            return np.inf
+        prev = cur
+    return float(np.sqrt(prev[m]))
+
+
+def tilt_deviation(a, b, triplets):
+    """Largest angle (degrees) between mean accelerometer directions of two segments."""
+    worst = 0.0
+    for t in triplets:
+        va, vb = a[:, t].mean(axis=0), b[:, t].mean(axis=0)
+        denom = np.linalg.norm(va) * np.linalg.norm(vb)
+        if denom > 0:
+            worst = max(worst, float(np.degrees(np.arccos(np.clip(va @ vb / denom, -1.0, 1.0)))))
+    return worst
+
+
+class ReferenceLibrary:
+    """Resampled reference segments per pose with precomputed envelopes."""
+
+    def __init__(self, columns, mean, std, refs, durations, raw_means):
+        self.columns = list(columns)
+        self.mean = mean
+        self.std = std
+        self.refs = refs            # pose -> (N, L, f) scaled, resampled
+        self.durations = durations  # pose -> (N,) seconds
+        self.raw_means = raw_means  # pose -> (N, f) unscaled mean per segment (for tilt)
+        self.envelopes = {p: self._envelopes(r) for p, r in refs.items()}
+        self.triplets = accelerometer_triplets(self.columns)
+
+    @staticmethod
+    def _envelopes(refs):
+        env = [envelope(r) for r in refs]
+        return np.stack([u for u, _ in env]), np.stack([lo for _, lo in env])
+
+    @classmethod
+    def build(cls, sessions):
+        columns = feature_columns(sessions[0])
+        allX = np.concatenate([s[columns].to_numpy(dtype=np.float64) for s in sessions])
+        mean, std = allX.mean(axis=0), allX.std(axis=0)
+        std[std == 0] = 1.0
+        refs, durations, raw_means = {}, {}, {}
+        for data in sessions:
+            for seg in pose_segments(data, columns):
+                x = seg['features']
+                refs.setdefault(seg['pose'], []).append(resample((x - mean) / std))
+                durations.setdefault(seg['pose'], []).append(seg['duration_s'])
+                raw_means.setdefault(seg['pose'], []).append(x.mean(axis=0))
+        return cls(columns, mean.astype(np.float32), std.astype(np.float32),
+                   {p: np.stack(v) for p, v in refs.items()},
+                   {p: np.asarray(v) for p, v in durations.items()},
+                   {p: np.stack(v) for p, v in raw_means.items()})
+
+    def save(self, path):
+        arrays = {'columns': np.array(self.columns), 'mean': self.mean, 'std': self.std}
+        for p in self.refs:
+            arrays[f'refs_{p}'] = self.refs[p]
+            arrays[f'durations_{p}'] = self.durations[p]
+            arrays[f'raw_means_{p}'] = self.raw_means[p]
+        np.savez_compressed(path, **arrays)
+        return path
+
+    @classmethod
+    def load(cls, path):
+        z = np.load(path)
+        poses = sorted(int(k[5:]) for k in z.files if k.startswith('refs_'))
+        return cls(z['columns'].tolist(), z['mean'], z['std'],
+                   {p: z[f'refs_{p}'] for p in poses},
+                   {p: z[f'durations_{p}'] for p in poses},
+                   {p: z[f'raw_means_{p}'] for p in poses})
+
+    def best_match(self, pose, segment):
+        """Closest reference of ``pose``: (distance, ref index, number of full DTW runs)."""
+        if pose not in self.refs:
+            return np.nan, None, 0
+        q = resample((segment - self.mean) / self.std)
+        upper, lower = self.envelopes[pose]
+        bounds = lb_keogh(q, upper, lower)
+        best, best_idx, runs = np.inf, None, 0
+        for i in np.argsort(bounds):
+            if bounds[i] >= best:
+                break
+            d = dtw_banded(q, self.refs[pose][i], best_so_far=best)
+            runs += 1
+            if d < best:
+                best, best_idx = d, int(i)
+        return best, best_idx, runs
+
+
+def score_session(data, library, edge_weights=None):
+    """Per-pose feedback rows for one labelled session."""
+    rows = []
+    round_no = 0
+    for seg in pose_segments(data, library.columns):
+        pose = seg['pose']
+        round_no += is_round_boundary(seg['previous_pose'], pose)
+        dist, idx, runs = library.best_match(pose, seg['features'])
+        ref_duration = float(np.median(library.durations[pose])) if pose in library.durations else np.nan
+        tilt = np.nan
+        if idx is not None:
+            ref_mean = library.raw_means[pose][idx][None, :]
+            tilt = tilt_deviation(seg['features'], ref_mean, library.triplets)
+        expected_gap = np.nan
+        if edge_weights and seg['previous_pose'] is not None:
+            expected_gap = edge_weights.get((seg['previous_pose'], pose), np.nan)
+        rows.append({
+            'round': round_no,
+            'pose': pose,
+            'start_row': seg['start_row'],
+            'duration_s': seg['duration_s'],
+            'reference_duration_s': ref_duration,
+            'timing_deviation_s': seg['duration_s'] - ref_duration,
+            'timing_deviation_pct': 100.0 * (seg['duration_s'] - ref_duration) / ref_duration if ref_duration else np.nan,
+            'transition_s': seg['transition_s'],
+            'expected_transition_s': expected_gap,
+            'transition_deviation_s': seg['transition_s'] - expected_gap,
+            'dtw_distance': dist,
+            'tilt_deviation_deg': tilt,
+            'reference_index': idx,
+            'dtw_evaluations': runs,
+        })
+    return pd.DataFrame(rows)
+
+
+def round_feedback(fb):
+    """One row per round of score_session output: timing, shape and tilt summaries."""
+    fb = fb.assign(abs_timing=fb['timing_deviation_s'].abs(), abs_transition=fb['transition_deviation_s'].abs())
+    out = fb.groupby('round').agg(poses=('pose', 'nunique'), segments=('pose', 'size'),
+                                  duration_s=('duration_s', 'sum'),
+                                  mean_abs_timing_deviation_s=('abs_timing', 'mean'),
+                                  mean_abs_transition_deviation_s=('abs_transition', 'mean'),
+                                  mean_dtw_distance=('dtw_distance', 'mean'),
+                                  max_tilt_deviation_deg=('tilt_deviation_deg', 'max'))
+    worst = fb.dropna(subset=['dtw_distance'])
+    worst = worst.loc[worst.groupby('round')['dtw_distance'].idxmax(), ['round', 'pose']]
+    return out.join(worst.set_index('round').rename(columns={'pose': 'worst_dtw_pose'})).reset_index()
+
+
+if __name__ == '__main__':
+    p = argparse.ArgumentParser()
+    sub = p.add_subparsers(dest='command', required=True)
+    b = sub.add_parser('build', help='Build a reference library from labelled reference sessions')
+    b.add_argument('--references', nargs='+', required=True, help='Labelled reference CSVs (proper form)')
+    b.add_argument('--output', required=True, help='Output library (.npz)')
+    s = sub.add_parser('score', help='Score a labelled practitioner session against the library')
+    s.add_argument('--session', required=True, help='Labelled session CSV (TimeStamp, sensors, Position)')
+    s.add_argument('--library', required=True, help='Reference library (.npz)')
+    s.add_argument('--graph', default=None, help='pose_graph.json written by dag.py (edge weights)')
+    s.add_argument('--output', required=True, help='Output feedback CSV')
+    s.add_argument('--rounds', default=None, help='Also write per-round summaries (CSV)')
+    args = p.parse_args()
+
+    if args.command == 'build':
+        lib = ReferenceLibrary.build([pd.read_csv(f) for f in args.references])
+        lib.save(args.output)
+        print(f"Saved reference library: {args.output}")
+        for pose in sorted(lib.refs):
+            print(f"  Pose {pose:2d}: {len(lib.refs[pose])} reference segment(s)")
+    else:
+        lib = ReferenceLibrary.load(args.library)
+        edges = load_graph(args.graph)[0] if args.graph else None
+        fb = score_session(pd.read_csv(args.session), lib, edges)
+        fb.to_csv(args.output, index=False)
+        print(fb[['round', 'pose', 'duration_s', 'timing_deviation_s', 'dtw_distance', 'tilt_deviation_deg']]
+              .to_string(index=False, float_format=lambda v: f'{v:.2f}'))
+        print(f"\nSaved feedback: {args.output}")
+        if args.rounds:
+            rounds = round_feedback(fb)
+            rounds.to_csv(args.rounds, index=False)
+            print(f"Saved {len(rounds)} round summaries: {args.rounds}")
+    print('Done!')
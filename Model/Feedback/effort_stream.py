@@ -0,0 +1,362 @@
+"""
+Streaming heart-rate and effort analytics per pose segment.
+
+Samples (user, TimeStamp, BPM, pose) go through ``EffortTracker.update`` one at
+a time. Each user keeps running statistics with O(1) (amortized) cost per
+sample:
+  - EWMA of the heart rate (time constant --tau seconds),
+  - rolling min / max over the last --window seconds (monotonic deques); the
+    rolling min is the user's baseline,
+  - recovery slope: least-squares HR slope (bpm/min) over the last --slope-window
+    seconds, from running sums over a sliding window.
+The current pose segment accumulates the same sums. When the pose changes,
+the finished segment is emitted as an effort summary: mean/min/max HR, HR at
+start and end, slope within the pose, HR above baseline, and the trailing
+recovery slope at its end.
+
+Logger timestamps have 1 s resolution. SampleClock spreads the samples of
+one second at the sample rate, and handles a midnight rollover.
+BPM values outside 30-220 (no reading) do not update the HR statistics, but
+they still count toward the segment duration.
+
+Batch mode replays archived labelled sessions (CSV or .imua, with a BPM column
+and Position) through the same tracker; --predictions uses the batch_infer.py
+poses instead of the labels. Follow mode tails a growing CSV and prints each
+summary as its pose ends.
+
+Usage:
+  python effort_stream.py batch --inputs data/labelled/*_labelled.csv --output effort.csv
+  python effort_stream.py batch --inputs data/labelled/*_labelled.csv --predictions predictions/ --output effort.csv
+  python effort_stream.py follow --input live_session.csv --user p07
+"""
+import argparse
+import math
+import os
+import re
+import sys
+import time
+from collections import deque
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'DAG Creation'))
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..', 'Sensor Code'))
+from pose_graph import DEFAULT_SAMPLE_RATE  # noqa: E402
+from imu_archive import read_sensor_file  # noqa: E402
+
+HR_RANGE = (30.0, 220.0)
+SESSION_PATTERN = re.compile(r'(\d{8}_\d{6})')
+
+
+class SampleClock:
+    """Seconds since midnight for 1 s logger timestamps, spreading each second's samples at ``sample_rate``."""
+
+    def __init__(self, sample_rate=DEFAULT_SAMPLE_RATE):
+        self.sample_rate = sample_rate
+        self.second = None
+        self.index = 0
+        self.offset = 0.0
+
+    def __call__(self, stamp):
+        h, m, s = str(stamp).split(':')
+        second = int(h) * 3600 + int(m) * 60 + float(s) + self.offset
+        if self.second is not None and second < self.second - 43200:
+            self.offset += 86400.0
+            second += 86400.0
+        if second == self.second:
+            self.index += 1
+        else:
+            self.second, self.index = second, 0
+        return second + min(self.index, self.sample_rate - 1) / self.sample_rate
+
+
+class SlopeWindow:
+    """Least-squares slope of (t, v) pairs; optionally only those within the last ``span`` seconds."""
+
+    def __init__(self, span=None):
+        self.span = span
+        self.points = deque()
+        self.reset()
+
+    def reset(self):
+        self.points.clear()
+        self.n = 0
+        self.st = self.sv = self.stt = self.stv = 0.0
+        self.t0 = None
+
+    def _add(self, t, v, sign):
+        self.n += sign
+        self.st += sign * t
+        self.sv += sign * v
+        self.stt += sign * t * t
+        self.stv += sign * t * v
+
+    def update(self, t, v):
+        if self.t0 is None:
+            self.t0 = t
+        t -= self.t0  # keep the sums well conditioned
+        self._add(t, v, 1)
+        if self.span is not None:
+            self.points.append((t, v))
+            while self.points and self.points[0][0] < t - self.span:
+                self._add(*self.points.popleft(), -1)
+
+    def slope(self):
+        """dv/dt in units per second (nan with fewer than two distinct times)."""
+        denom = self.n * self.stt - self.st * self.st
+        if self.n < 2 or denom <= 1e-9:
+            return float('nan')
+        return (self.n * self.stv - self.st * self.sv) / denom
+
+
+class RollingExtremes:
+    """Min and max over the last ``span`` seconds with monotonic deques."""
+
+    def __init__(self, span):
+        self.span = span
+        self.lows = deque()
+        self.highs = deque()
+
+    def update(self, t, v):
+        while self.lows and self.lows[-1][1] >= v:
+            self.lows.pop()
+        while self.highs and self.highs[-1][1] <= v:
+            self.highs.pop()
+        self.lows.append((t, v))
+        self.highs.append((t, v))
+        for q in (self.lows, self.highs):
+            while q[0][0] < t - self.span:
+                q.popleft()
+
+    @property
+    def low(self):
+        return self.lows[0][1] if self.lows else float('nan')
+
+    @property
+    def high(self):
+        return self.highs[0][1] if self.highs else float('nan')
+
+
+class UserState:
+    """Running HR statistics of one user plus the open pose segment."""
+
+    def __init__(self, tau, window, slope_window, sample_rate):
+        self.tau = tau
+        self.clock = SampleClock(sample_rate)
+        self.ewma = float('nan')
+        self.last_t = None
+        self.extremes = RollingExtremes(window)
+        self.recovery = SlopeWindow(slope_window)
+        self.segment = None
+
+    def update_hr(self, t, hr):
+        if math.isnan(self.ewma):
+            self.ewma = hr
+        else:
+            alpha = 1.0 - math.exp(-max(t - self.last_t, 0.0) / self.tau)
+            self.ewma += alpha * (hr - self.ewma)
+        self.last_t = t
+        self.extremes.update(t, hr)
+        self.recovery.update(t, hr)
+
+
+class Segment:
+    def __init__(self, pose, t, stamp):
+        self.pose = pose
+        self.start_t = self.end_t = t
+        self.start_stamp = self.end_stamp = stamp
+        self.samples = 0
+        self.hr_samples = 0
+        self.hr_sum = 0.0
+        self.hr_min = float('inf')
+        self.hr_max = float('-inf')
+        self.hr_start = self.hr_end = float('nan')
+        self.trend = SlopeWindow()
+
+    def update(self, t, stamp, hr):
+        self.end_t, self.end_stamp = t, stamp
+        self.samples += 1
+        if hr is None:
+            return
+        if self.hr_samples == 0:
+            self.hr_start = hr
+        self.hr_samples += 1
+        self.hr_sum += hr
+        self.hr_min = min(self.hr_min, hr)
+        self.hr_max = max(self.hr_max, hr)
+        self.hr_end = hr
+        self.trend.update(t, hr)
+
+
+class EffortTracker:
+    """Per-user streaming HR statistics joined to the current pose segment."""
+
+    def __init__(self, tau=10.0, window=120.0, slope_window=15.0, sample_rate=DEFAULT_SAMPLE_RATE):
+        self.tau = tau
+        self.window = window
+        self.slope_window = slope_window
+        self.sample_rate = sample_rate
+        self.users = {}
+
+    def _state(self, user):
+        if user not in self.users:
+            self.users[user] = UserState(self.tau, self.window, self.slope_window, self.sample_rate)
+        return self.users[user]
+
+    def update(self, user, stamp, bpm, pose):
+        """Consume one sample; returns the summary of the segment it closed, or None."""
+        state = self._state(user)
+        t = state.clock(stamp)
+        hr = None
+        if bpm is not None and HR_RANGE[0] < bpm < HR_RANGE[1]:
+            hr = float(bpm)
+            state.update_hr(t, hr)
+        closed = None
+        if pose is None or (isinstance(pose, float) and math.isnan(pose)):
+            if state.segment is not None:
+                closed = self._close(user, state)
+            return closed
+        if state.segment is not None and state.segment.pose != pose:
+            closed = self._close(user, state)
+        if state.segment is None:
+            state.segment = Segment(pose, t, stamp)
+        state.segment.update(t, stamp, hr)
+        return closed
+
+    def _close(self, user, state):
+        seg = state.segment
+        state.segment = None
+        mean = seg.hr_sum / seg.hr_samples if seg.hr_samples else float('nan')
+        baseline = state.extremes.low
+        return {
+            'user': user,
+            'pose': seg.pose,
+            'start': str(seg.start_stamp),
+            'end': str(seg.end_stamp),
+            'duration_s': seg.end_t - seg.start_t + 1.0 / self.sample_rate,
+            'samples': seg.samples,
+            'hr_samples': seg.hr_samples,
+            'hr_mean': mean,
+            'hr_min': seg.hr_min if seg.hr_samples else float('nan'),
+            'hr_max': seg.hr_max if seg.hr_samples else float('nan'),
+            'hr_start': seg.hr_start,
+            'hr_end': seg.hr_end,
+            'hr_slope_bpm_min': seg.trend.slope() * 60.0,
+            'hr_ewma': state.ewma,
+            'hr_above_baseline': mean - baseline,
+            'recovery_slope_bpm_min': state.recovery.slope() * 60.0,
+        }
+
+    def flush(self):
+        """Close every open segment (end of stream)."""
+        return [self._close(user, state) for user, state in self.users.items() if state.segment is not None]
+
+
+def bpm_column(columns):
+    """BPM, or its merge-suffixed variant (BPM_x) when several devices were merged."""
+    return next((c for c in columns if c == 'BPM' or c.startswith('BPM_')), None)
+
+
+def session_frame(path, predictions_dir=None, pose_column='Position'):
+    """TimeStamp, BPM and pose of an archived session; poses from batch_infer when ``predictions_dir`` is set."""
+    data = read_sensor_file(path)
+    bpm = bpm_column(data.columns)
+    frame = pd.DataFrame({'TimeStamp': data['TimeStamp'].astype(str).to_numpy(),
+                          'BPM': data[bpm].to_numpy(dtype=np.float64) if bpm else np.nan})
+    if predictions_dir:
+        m = SESSION_PATTERN.search(os.path.basename(path))
+        pred = pd.read_parquet(os.path.join(predictions_dir, f'{m.group(1)}.parquet'), columns=['row', 'prediction'])
+        pose = np.full(len(frame), np.nan)
+        pose[pred['row'].to_numpy()] = pred['prediction'].to_numpy()
+        frame['pose'] = pose
+    else:
+        frame['pose'] = data[pose_column].to_numpy(dtype=np.float64) if pose_column in data else np.nan
+    return frame
+
+
+def replay(tracker, user, frame):
+    """Feed a session through the tracker sample by sample; returns its segment summaries."""
+    summaries = []
+    for stamp, bpm, pose in zip(frame['TimeStamp'].to_numpy(), frame['BPM'].to_numpy(), frame['pose'].to_numpy()):
+        closed = tracker.update(user, stamp, None if np.isnan(bpm) else bpm, None if np.isnan(pose) else int(pose))
+        if closed:
+            summaries.append(closed)
+    return summaries
+
+
+def follow(path, tracker, user, pose_column='Position', poll=0.5):
+    """Tail a growing CSV and yield each summary as soon as its pose ends."""
+    with open(path, newline='') as f:
+        header = f.readline().strip().split(',')
+        ts_i, pose_i = header.index('TimeStamp'), header.index(pose_column)
+        bpm_i = header.index(bpm_column(header))
+        buffer = ''
+        while True:
+            chunk = f.readline()
+            if not chunk:
+                time.sleep(poll)
+                continue
+            buffer += chunk
+            if not buffer.endswith('\n'):
+                continue  # partial line still being written
+            fields, buffer = buffer.strip().split(','), ''
+            if len(fields) < len(header):
+                continue
+            bpm = float(fields[bpm_i]) if fields[bpm_i] else None
+            pose = int(float(fields[pose_i])) if fields[pose_i] else None
+            closed = tracker.update(user, fields[ts_i], bpm, pose)
+            if closed:
+                yield closed
+
+
+def format_summary(s):
+    return (f"{s['user']} pose {s['pose']:>2} {s['start']}-{s['end']} {s['duration_s']:5.1f}s  "
+            f"HR {s['hr_mean']:5.1f} ({s['hr_min']:.0f}-{s['hr_max']:.0f}), "
+            f"{s['hr_slope_bpm_min']:+5.1f} bpm/min in pose, {s['hr_above_baseline']:+5.1f} over baseline, "
+            f"recovery {s['recovery_slope_bpm_min']:+5.1f} bpm/min")
+
+
+if __name__ == '__main__':
+    p = argparse.ArgumentParser()
+    sub = p.add_subparsers(dest='command', required=True)
+    b = sub.add_parser('batch', help='Replay archived labelled sessions')
+    b.add_argument('--inputs', nargs='+', required=True, help='Labelled session CSVs / archives with BPM')
+    b.add_argument('--predictions', default=None, help='batch_infer.py output folder (use predicted poses)')
+    b.add_argument('--user', default=None, help='User id (default: session id of each input)')
+    b.add_argument('--output', required=True, help='Output CSV of per-pose summaries')
+    f = sub.add_parser('follow', help='Tail a growing session CSV and print summaries live')
+    f.add_argument('--input', required=True, help='Session CSV being written (TimeStamp, BPM, Position)')
+    f.add_argument('--user', required=True, help='User id')
+    for s in (b, f):
+        s.add_argument('--pose-column', default='Position', help='Column holding the pose')
+        s.add_argument('--tau', type=float, default=10.0, help='HR EWMA time constant (s)')
+        s.add_argument('--window', type=float, default=120.0, help='Rolling min/max window (s)')
+        s.add_argument('--slope-window', type=float, default=15.0, help='Recovery slope window (s)')
+        s.add_argument('--sample-rate', type=float, default=DEFAULT_SAMPLE_RATE, help='Samples per second')
+    args = p.parse_args()
+
+    tracker = EffortTracker(args.tau, args.window, args.slope_window, args.sample_rate)
+    if args.command == 'batch':
+        summaries = []
+        t0 = time.perf_counter()
+        samples = 0
+        for path in args.inputs:
+            frame = session_frame(path, args.predictions, args.pose_column)
+            m = SESSION_PATTERN.search(os.path.basename(path))
+            user = args.user or (m.group(1) if m else os.path.splitext(os.path.basename(path))[0])
+            summaries += replay(tracker, user, frame)
+            summaries += tracker.flush()
+            samples += len(frame)
+        out = pd.DataFrame(summaries)
+        out.to_csv(args.output, index=False)
+        secs = time.perf_counter() - t0
+        print(f"{len(out)} pose segment(s) from {samples} samples in {secs:.1f}s "
+              f"({samples / max(secs, 1e-9):,.0f} samples/s) -> {args.output}")
+    else:
+        try:
+            for summary in follow(args.input, tracker, args.user, args.pose_column):
+                print(format_summary(summary), flush=True)
+        except KeyboardInterrupt:
+            for summary in tracker.flush():
+                print(format_summary(summary))
+    print('Done!')
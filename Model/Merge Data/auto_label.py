@@ -0,0 +1,125 @@
+"""
+Semi-automatic Position labelling from model predictions and the pose DAG.
+
+Takes the per-sample class probabilities written by Model/Sensor Model/batch_infer.py
+for a session and decodes them with a Viterbi pass over the Surya Namaskar pose
+chain (Model/DAG Creation/pose_graph.py), so the labels follow the legal
+1 -> 2 -> ... -> 12 order with realistic dwell times instead of flickering
+per-window argmax. Decoding is linear in the number of samples.
+
+The decoded labels are written into a copy of the device CSV as a Position
+column, i.e. the same "..._labelled.csv" format the date-specific merge scripts
+read. Rows whose decoded pose has a low posterior, or that disagree with a
+confident model prediction, are left blank (NaN) so the merge scripts drop them,
+and are listed in a separate review CSV for a human to check against the video.
+
+Usage:
+  python auto_label.py --device-csv sensor_csv_data/device_2/sensor_data_nRF_IMU_2_19092025_164551.csv \
+      --predictions predictions/19092025_164551.parquet \
+      --graph "../DAG Creation/pose_graph.json" \
+      --output sensor_data_nRF_IMU_2_19092025_164551_labelled.csv
+"""
+import argparse
+import os
+import sys
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'DAG Creation'))
+from pose_graph import (DEFAULT_DWELL_SECONDS, DEFAULT_SAMPLE_RATE, forward_backward,  # noqa: E402
+                        load_graph, sequence_transitions, viterbi)
+
+
+def load_posteriors(predictions_path):
+    """Return (poses, probs, timestamps) from a batch_infer Parquet file.
+
+    Rows without a prediction (the first window of the session) get a uniform
+    distribution so the decoder fills them from context.
+    """
+    pred = pd.read_parquet(predictions_path)
+    prob_cols = sorted([c for c in pred.columns if c.startswith('prob_')], key=lambda c: float(c[5:]))
+    poses = [float(c[5:]) for c in prob_cols]
+    probs = pred[prob_cols].to_numpy(dtype=np.float64)
+    missing = np.isnan(probs).any(axis=1)
+    probs[missing] = 1.0 / len(poses)
+    return poses, probs, pred['TimeStamp'].astype(str).to_numpy()
+
+
+def decode_session(poses, probs, graph_path=None, sample_rate=DEFAULT_SAMPLE_RATE,
+                   min_posterior=0.6, disagree_confidence=0.9):
+    """Decode a label per sample and flag the ones that need review.
+
+    Returns a DataFrame with Position, posterior, model_prediction,
+    model_confidence and reason ('' when the label is trusted).
+    """
+    dwell = None
+    if graph_path and os.path.exists(graph_path):
+        _, dwell, _ = load_graph(graph_path)
+    T = sequence_transitions(poses, dwell, default_dwell=DEFAULT_DWELL_SECONDS * sample_rate)
+    path = viterbi(probs, T)
+    post = forward_backward(probs, T)
+
+    steps = np.arange(len(path))
+    labels = np.asarray(poses)[path]
+    posterior = post[steps, path]
+    model_best = probs.argmax(axis=1)
+    model_conf = probs[steps, model_best]
+
+    reason = np.full(len(path), '', dtype=object)
+    reason[posterior < min_posterior] = 'low_posterior'
+    disagree = (model_best != path) & (model_conf >= disagree_confidence)
+    reason[disagree] = 'model_disagrees'
+    return pd.DataFrame({
+        'Position': labels,
+        'posterior': posterior,
+        'model_prediction': np.asarray(poses)[model_best],
+        'model_confidence': model_conf,
+        'reason': reason,
+    })
+
+
+def label_device_csv(device_csv, predictions_path, output_csv, graph_path=None,
+                     min_posterior=0.6, keep_flagged=False):
+    """Write ``device_csv`` with a decoded Position column plus a review CSV."""
+    poses, probs, timestamps = load_posteriors(predictions_path)
+    decoded = decode_session(poses, probs, graph_path, min_posterior=min_posterior)
+    decoded['TimeStamp'] = timestamps
+    flagged = decoded['reason'] != ''
+
+    # Prediction rows come from the merged session; several can share one TimeStamp.
+    # Take the majority label per TimeStamp and flag the second if any of its rows is flagged.
+    trusted = decoded if keep_flagged else decoded[~flagged]
+    per_ts = trusted.groupby('TimeStamp')['Position'].agg(lambda s: s.mode().iloc[0])
+
+    device = pd.read_csv(device_csv)
+    device = device.drop(columns=[c for c in device.columns if c.startswith('Unnamed')])
+    device['Position'] = device['TimeStamp'].astype(str).map(per_ts)
+    if not keep_flagged:
+        bad_ts = set(decoded.loc[flagged, 'TimeStamp'])
+        device.loc[device['TimeStamp'].astype(str).isin(bad_ts), 'Position'] = np.nan
+    device.to_csv(output_csv, index=False)
+
+    review_csv = os.path.splitext(output_csv)[0] + '_review.csv'
+    review = decoded.loc[flagged, ['TimeStamp', 'Position', 'posterior',
+                                   'model_prediction', 'model_confidence', 'reason']]
+    review.to_csv(review_csv, index_label='row')
+
+    labelled = device['Position'].notna().sum()
+    print(f"Saved labelled CSV: {output_csv} ({labelled}/{len(device)} rows labelled)")
+    print(f"Saved review list: {review_csv} ({len(review)} flagged samples)")
+    return output_csv
+
+
+if __name__ == '__main__':
+    p = argparse.ArgumentParser()
+    p.add_argument('--device-csv', required=True, help='Raw device CSV to label')
+    p.add_argument('--predictions', required=True, help='Per-sample predictions Parquet from batch_infer.py')
+    p.add_argument('--graph', default=None, help='pose_graph.json written by dag.py (duration priors)')
+    p.add_argument('--output', required=True, help='Output labelled CSV path')
+    p.add_argument('--min-posterior', type=float, default=0.6, help='Flag labels below this posterior')
+    p.add_argument('--keep-flagged', action='store_true', help='Keep labels on flagged rows instead of blanking them')
+    args = p.parse_args()
+
+    label_device_csv(args.device_csv, args.predictions, args.output, args.graph,
+                     args.min_posterior, args.keep_flagged)
+    print('Done!')
@@ -10,12 +10,28 @@ This script labels frames according to the intervals CSV (columns: pose_num,star
 maps pose_num -> pose_class using POSE_CLASS_MAPPING similar to the notebook,
 and saves a CSV containing only numeric features + frame/video metadata.
 
+Landmarks are written into preallocated float32 arrays per batch of frames, and
+the normalized features are computed vectorized at extraction time: raw x, y, z,
+visibility per landmark, hip-centred torso-scaled coordinates (<name>_nx/_ny/_nz)
+and joint angles in degrees (<side>_<joint>_angle for elbow, knee, hip, shoulder).
+
 If the output file exists, new rows are appended with column alignment.
+
+Pose estimation results are cached per video (content hash of the file and the
+MediaPipe settings) in --cache-dir and checkpointed periodically (each checkpoint
+writes only the frames detected since the previous one), so a crashed run resumes
+where it stopped and relabeling with a new intervals CSV reuses the
+cached landmarks instead of re-running MediaPipe.
+
+cv2 and mediapipe are imported by the functions that decode and detect, so the
+constants and feature helpers can be imported without them.
 """
 import argparse
+import glob
+import hashlib
 import os
-import cv2
-import mediapipe as mp
+import queue
+import threading
 import numpy as np
 import pandas as pd
 
@@ -52,6 +68,37 @@ POSE_CLASS_MAPPING = {
 }
 
 
+LANDMARK_INDICES = list(LANDMARKS_OF_INTEREST)
+LANDMARK_NAMES = list(LANDMARKS_OF_INTEREST.values())
+# Frames are collected in preallocated arrays of this many rows
+FRAME_BATCH = 1024
+
+# MediaPipe settings; part of the landmark cache key
+MODEL_COMPLEXITY = 1
+MIN_DETECTION_CONFIDENCE = 0.3
+MIN_TRACKING_CONFIDENCE = 0.5
+
+# Per-video landmark cache (content hash of video + settings) and checkpoint interval in frames
+DEFAULT_CACHE_DIR = '.landmark_cache'
+CHECKPOINT_EVERY = 900
+CACHE_VERSION = 1
+
+# Decoded frames waiting for pose inference (0 = decode and infer on one thread)
+FRAME_QUEUE_SIZE = 8
+
+# Joint angle at the middle landmark of each (a, joint, b) triple
+JOINT_ANGLES = {
+    'left_elbow_angle': ('left_shoulder', 'left_elbow', 'left_wrist'),
+    'right_elbow_angle': ('right_shoulder', 'right_elbow', 'right_wrist'),
+    'left_knee_angle': ('left_hip', 'left_knee', 'left_ankle'),
+    'right_knee_angle': ('right_hip', 'right_knee', 'right_ankle'),
+    'left_hip_angle': ('left_shoulder', 'left_hip', 'left_knee'),
+    'right_hip_angle': ('right_shoulder', 'right_hip', 'right_knee'),
+    'left_shoulder_angle': ('left_elbow', 'left_shoulder', 'left_hip'),
+    'right_shoulder_angle': ('right_elbow', 'right_shoulder', 'right_hip'),
+}
+
+
 def load_intervals(csv_path):
     df = pd.read_csv(csv_path)
     intervals = {}
@@ -70,57 +117,303 @@ def get_pose_for_time(t, intervals):
     return 0, 0
 
 
-def process_video(input_video, intervals_csv, output_csv):
-    intervals = load_intervals(intervals_csv) if intervals_csv and os.path.exists(intervals_csv) else {}
+def landmark_features(coords):
+    """Normalized coordinates and joint angles for a (frames, landmarks, 4) x/y/z/visibility array.
+
+    Coordinates are centred on the hip midpoint and divided by the torso length
+    (hip midpoint to shoulder midpoint), so they do not depend on where the person
+    stands or how far they are from the camera.
+    """
+    idx = {name: i for i, name in enumerate(LANDMARK_NAMES)}
+    xyz = coords[:, :, :3]
+    hip = 0.5 * (xyz[:, idx['left_hip']] + xyz[:, idx['right_hip']])
+    shoulder = 0.5 * (xyz[:, idx['left_shoulder']] + xyz[:, idx['right_shoulder']])
+    torso = np.linalg.norm(shoulder - hip, axis=1)
+    torso[torso == 0] = 1.0
+    norm = (xyz - hip[:, None, :]) / torso[:, None, None]
+
+    features = {}
+    for i, name in enumerate(LANDMARK_NAMES):
+        for j, axis in enumerate('xyz'):
+            features[f"{name}_n{axis}"] = norm[:, i, j].astype(np.float32)
+    for col, (a, b, c) in JOINT_ANGLES.items():
+        ba = xyz[:, idx[a]] - xyz[:, idx[b]]
+        bc = xyz[:, idx[c]] - xyz[:, idx[b]]
+        denom = np.linalg.norm(ba, axis=1) * np.linalg.norm(bc, axis=1)
+        cos = np.einsum('ij,ij->i', ba, bc) / np.where(denom == 0, 1.0, denom)
+        features[col] = np.degrees(np.arccos(np.clip(cos, -1.0, 1.0))).astype(np.float32)
+    return features
 
-    mp_pose = mp.solutions.pose
-    pose = mp_pose.Pose(static_image_mode=False, model_complexity=1,
-                        enable_segmentation=False, min_detection_confidence=0.3, min_tracking_confidence=0.5)
 
-    cap = cv2.VideoCapture(input_video)
+def landmarks_to_frame(frames, pose_classes, coords):
+    """Build the dataset DataFrame (typed columns) from the extraction arrays."""
+    data = {'frame': frames.astype(np.int32), 'pose_class': pose_classes.astype(np.int8)}
+    for i, name in enumerate(LANDMARK_NAMES):
+        for j, axis in enumerate(('x', 'y', 'z', 'visibility')):
+            data[f"{name}_{axis}"] = coords[:, i, j]
+    data.update(landmark_features(coords))
+    return pd.DataFrame(data)
+
+
+def label_frames(frames, fps, intervals):
+    """Vectorized get_pose_for_time over frame numbers -> pose_class per frame (0 = unlabeled)."""
+    t = frames / fps
+    classes = np.zeros(len(frames), dtype=np.int8)
+    assigned = np.zeros(len(frames), dtype=bool)
+    for pose_num, (s, e) in (intervals or {}).items():
+        hit = ~assigned & (t >= s) & (t < e)
+        classes[hit] = POSE_CLASS_MAPPING.get(pose_num, pose_num)
+        assigned |= hit
+    return classes
+
+
+def video_cache_key(input_video, model_complexity=MODEL_COMPLEXITY,
+                    min_detection_confidence=MIN_DETECTION_CONFIDENCE,
+                    min_tracking_confidence=MIN_TRACKING_CONFIDENCE, inference_width=None):
+    """Content hash of the video plus every setting that changes the landmarks."""
+    h = hashlib.sha256()
+    with open(input_video, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            h.update(chunk)
+    settings = f"v{CACHE_VERSION}:{model_complexity}:{min_detection_confidence}:{min_tracking_confidence}"
+    if inference_width:
+        settings += f":w{inference_width}"
+    h.update(settings.encode())
+    return h.hexdigest()[:32]
+
+
+def _save_arrays(path, fps, next_frame, frames, coords):
+    tmp = path + '.tmp.npz'
+    np.savez(tmp, fps=fps, next_frame=next_frame, frames=frames, coords=coords)
+    os.replace(tmp, path)
+
+
+def _checkpoint_chunks(partial_prefix):
+    """Checkpoint chunk files of an interrupted run, in the order they were written."""
+    return sorted(p for p in glob.glob(f"{partial_prefix}.[0-9]*.npz") if not p.endswith('.tmp.npz'))
+
+
+def open_video(input_video, hw_decode=False):
+    """cv2.VideoCapture, asking for hardware-accelerated decoding when requested and supported."""
+    import cv2
+    cap = None
+    if hw_decode and hasattr(cv2, 'CAP_PROP_HW_ACCELERATION'):
+        cap = cv2.VideoCapture(input_video, cv2.CAP_ANY,
+                               [cv2.CAP_PROP_HW_ACCELERATION, cv2.VIDEO_ACCELERATION_ANY])
+    if cap is None or not cap.isOpened():
+        cap = cv2.VideoCapture(input_video)
     if not cap.isOpened():
         raise FileNotFoundError(f"Could not open video: {input_video}")
+    return cap
+
+
+def inference_size(cap, inference_width=None):
+    """(width, height) to downscale frames to before pose inference, or None to keep them as decoded."""
+    import cv2
+    width = int(cap.get(cv2.CAP_PROP_FRAME_WIDTH) or 0)
+    height = int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT) or 0)
+    if not inference_width or not width or width <= inference_width:
+        return None
+    return inference_width, max(1, round(height * inference_width / width))
+
+
+def _to_rgb(frame, size, buf):
+    """Optional downscale + BGR->RGB into a reused buffer."""
+    import cv2
+    if size is not None:
+        frame = cv2.resize(frame, size, interpolation=cv2.INTER_AREA)
+    if buf is None or buf.shape != frame.shape:
+        buf = np.empty_like(frame)
+    cv2.cvtColor(frame, cv2.COLOR_BGR2RGB, dst=buf)
+    return buf
 
+
+def read_frames(cap, start_idx=0, size=None, queue_size=FRAME_QUEUE_SIZE):
+    """Yield (frame_idx, rgb) for the remaining frames of ``cap``.
+
+    With ``queue_size`` > 0 decoding and colour conversion run on a producer
+    thread that stays up to ``queue_size`` frames ahead of the consumer, so
+    decode overlaps pose inference (both release the GIL). RGB buffers are
+    preallocated once and recycled: a yielded buffer is only valid until the
+    next frame is requested.
+    """
+    if not queue_size:
+        buf, idx = None, start_idx
+        while True:
+            ret, frame = cap.read()
+            if not ret:
+                return
+            idx += 1
+            buf = _to_rgb(frame, size, buf)
+            yield idx, buf
+
+    free = queue.Queue()
+    ready = queue.Queue(maxsize=queue_size)
+    for _ in range(queue_size + 2):
+        free.put(None)  # buffers are allocated on first use, then reused
+    stop = threading.Event()
+
+    def produce():
+        idx = start_idx
+        try:
+            while not stop.is_set():
+                ret, frame = cap.read()
+                if not ret:
+                    break
+                idx += 1
+                buf = free.get()
+                if stop.is_set():
+                    break
+                ready.put((idx, _to_rgb(frame, size, buf)))
+        except Exception as e:
+            ready.put(e)
+        finally:
+            ready.put(None)
+
+    producer = threading.Thread(target=produce, name='frame-decoder', daemon=True)
+    producer.start()
+    try:
+        while True:
+            item = ready.get()
+            if item is None:
+                break
+            if isinstance(item, Exception):
+                raise item
+            yield item
+            free.put(item[1])
+    finally:
+        stop.set()
+        free.put(None)
+        while producer.is_alive():
+            try:
+                ready.get(timeout=0.1)
+            except queue.Empty:
+                pass
+        producer.join()
+
+
+def detect_landmarks(input_video, cache_dir=DEFAULT_CACHE_DIR, checkpoint_every=CHECKPOINT_EVERY,
+                     model_complexity=MODEL_COMPLEXITY, min_detection_confidence=MIN_DETECTION_CONFIDENCE,
+                     min_tracking_confidence=MIN_TRACKING_CONFIDENCE, queue_size=FRAME_QUEUE_SIZE,
+                     inference_width=None, hw_decode=False):
+    """Run MediaPipe pose over every frame; return (fps, frames, coords) for frames with a detected pose.
+
+    With a ``cache_dir`` results are stored under a content hash of the video and
+    the pose settings, so re-running (e.g. with new intervals) skips inference.
+    Partial results are checkpointed every ``checkpoint_every`` frames, each
+    checkpoint as a separate chunk file holding only the new detections, and an
+    interrupted run resumes from the last chunk.
+
+    Decoding runs ahead of inference on a separate thread (see ``read_frames``);
+    ``inference_width`` downscales frames before pose estimation (landmarks are
+    normalized to the image, so they stay comparable) and is part of the cache key.
+    """
+    import cv2
+    import mediapipe as mp
+    final_path = partial_prefix = None
+    frames_done, coords_done, chunk_paths, start_frame = [], [], [], 0
+    if cache_dir:
+        os.makedirs(cache_dir, exist_ok=True)
+        key = video_cache_key(input_video, model_complexity, min_detection_confidence, min_tracking_confidence,
+                              inference_width)
+        final_path = os.path.join(cache_dir, f"{key}.npz")
+        partial_prefix = os.path.join(cache_dir, f"{key}.partial")
+        if os.path.exists(final_path):
+            z = np.load(final_path)
+            print(f"Loaded cached landmarks for {input_video} ({len(z['frames'])} frames)")
+            return float(z['fps']), z['frames'], z['coords']
+        chunk_paths = _checkpoint_chunks(partial_prefix)
+        for path in chunk_paths:
+            z = np.load(path)
+            frames_done.append(z['frames'])
+            coords_done.append(z['coords'])
+            start_frame = int(z['next_frame'])
+        if chunk_paths:
+            print(f"Resuming {input_video} from frame {start_frame} ({len(chunk_paths)} checkpoint chunk(s))")
+
+    mp_pose = mp.solutions.pose
+    pose = mp_pose.Pose(static_image_mode=False, model_complexity=model_complexity,
+                        enable_segmentation=False, min_detection_confidence=min_detection_confidence,
+                        min_tracking_confidence=min_tracking_confidence)
+
+    cap = open_video(input_video, hw_decode)
     fps = cap.get(cv2.CAP_PROP_FPS) or 30.0
+    size = inference_size(cap, inference_width)
     frame_idx = 0
-    rows = []
-
-    while True:
-        ret, frame = cap.read()
-        if not ret:
-            break
+    # Skip already-processed frames without decoding them to RGB (grab is exact, unlike seeking)
+    while frame_idx < start_frame and cap.grab():
         frame_idx += 1
-        timestamp = frame_idx / fps
-        pose_num, pose_class = get_pose_for_time(timestamp, intervals) if intervals else (0, 0)
 
-        rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-        results = pose.process(rgb)
+    n_landmarks = len(LANDMARK_INDICES)
+    batches = []
+    frames = np.empty(FRAME_BATCH, dtype=np.int32)
+    coords = np.empty((FRAME_BATCH, n_landmarks, 4), dtype=np.float32)
+    n = 0
+    # (batch index, row) of the first detection not yet written to a checkpoint chunk
+    saved = [0, 0]
 
-        row = {'frame': frame_idx, 'pose_class': int(pose_class)}
+    def collected():
+        parts_f = frames_done + [b[0] for b in batches] + [frames[:n]]
+        parts_c = coords_done + [b[1] for b in batches] + [coords[:n]]
+        return np.concatenate(parts_f), np.concatenate(parts_c)
 
-        # Save raw MediaPipe landmark coordinates (x, y, z) and visibility — no normalization here.
-        # Append rows ONLY when a pose is detected AND the frame is labeled (pose_class > 0)
-        if results.pose_landmarks and int(pose_class) > 0:
+    def unsaved():
+        bufs = [(f, c, len(f)) for f, c in batches] + [(frames, coords, n)]
+        b, row = saved
+        parts = [(f[row if i == b else 0:count], c[row if i == b else 0:count])
+                 for i, (f, c, count) in enumerate(bufs) if i >= b]
+        saved[:] = [len(batches), n]
+        return np.concatenate([f for f, _ in parts]), np.concatenate([c for _, c in parts])
+
+    for frame_idx, rgb in read_frames(cap, frame_idx, size, queue_size):
+        results = pose.process(rgb)
+
+        # Keep raw MediaPipe landmark coordinates (x, y, z) and visibility for every detected pose;
+        # labels are applied afterwards so the cache does not depend on the intervals.
+        if results.pose_landmarks:
+            if n == FRAME_BATCH:
+                batches.append((frames, coords))
+                frames = np.empty(FRAME_BATCH, dtype=np.int32)
+                coords = np.empty((FRAME_BATCH, n_landmarks, 4), dtype=np.float32)
+                n = 0
             lms = results.pose_landmarks.landmark
-            for idx, name in LANDMARKS_OF_INTEREST.items():
+            row = coords[n]
+            for k, idx in enumerate(LANDMARK_INDICES):
                 lm = lms[idx]
                 # MediaPipe landmarks are normalized to image (x,y in [0,1]) and z is relative depth.
-                row[f"{name}_x"] = float(lm.x)
-                row[f"{name}_y"] = float(lm.y)
-                row[f"{name}_z"] = float(lm.z)
-                row[f"{name}_visibility"] = float(lm.visibility)
+                row[k] = (lm.x, lm.y, lm.z, lm.visibility)
+            frames[n] = frame_idx
+            n += 1
 
-            rows.append(row)
-        else:
-            # Skip frames without detected pose or without a label (pose_class == 0)
-            pass
+        if partial_prefix and checkpoint_every and frame_idx % checkpoint_every == 0:
+            chunk_paths.append(f"{partial_prefix}.{len(chunk_paths):05d}.npz")
+            _save_arrays(chunk_paths[-1], fps, frame_idx, *unsaved())
 
     cap.release()
     pose.close()
 
-    df_new = pd.DataFrame(rows)
-    df_new['video_source'] = os.path.splitext(os.path.basename(input_video))[0]
+    all_frames, all_coords = collected()
+    if final_path:
+        _save_arrays(final_path, fps, frame_idx, all_frames, all_coords)
+        for path in chunk_paths:
+            if os.path.exists(path):
+                os.remove(path)
+    return fps, all_frames, all_coords
+
+
+def extract_landmarks(input_video, intervals=None, cache_dir=DEFAULT_CACHE_DIR, **pose_settings):
+    """Landmarks for a video as (fps, DataFrame), one row per kept frame.
+
+    Frames are kept ONLY when a pose is detected AND the frame is labeled (pose_class > 0).
+    """
+    fps, frames, coords = detect_landmarks(input_video, cache_dir, **pose_settings)
+    classes = label_frames(frames, fps, intervals)
+    keep = classes > 0
+    return fps, landmarks_to_frame(frames[keep], classes[keep], coords[keep])
 
+
+def save_dataset(df_new, output_csv):
+    """Order columns and write ``df_new``, appending to an existing output (columns aligned)."""
     # reorder columns
     feature_cols = [c for c in df_new.columns if c not in ['frame', 'pose_class', 'video_source']]
     df_new = df_new[['frame', 'pose_class'] + sorted(feature_cols) + ['video_source']]
@@ -143,12 +436,26 @@ def process_video(input_video, intervals_csv, output_csv):
     return output_csv
 
 
+def process_video(input_video, intervals_csv, output_csv, cache_dir=DEFAULT_CACHE_DIR, **pose_settings):
+    intervals = load_intervals(intervals_csv) if intervals_csv and os.path.exists(intervals_csv) else {}
+
+    _, df_new = extract_landmarks(input_video, intervals, cache_dir, **pose_settings)
+    df_new['video_source'] = os.path.splitext(os.path.basename(input_video))[0]
+    return save_dataset(df_new, output_csv)
+
+
 if __name__ == '__main__':
     p = argparse.ArgumentParser()
     p.add_argument('--video', required=True, help='Input video file')
     p.add_argument('--intervals', required=False, help='CSV with pose intervals (pose_num,start,end)')
     p.add_argument('--output', required=True, help='Output dataset CSV path')
+    p.add_argument('--cache-dir', default=DEFAULT_CACHE_DIR, help='Landmark cache / checkpoint directory')
+    p.add_argument('--no-cache', action='store_true', help='Always re-run pose estimation')
+    p.add_argument('--inference-width', type=int, default=None, help='Downscale frames to this width before pose inference')
+    p.add_argument('--hw-decode', action='store_true', help='Request hardware-accelerated video decoding')
+    p.add_argument('--queue-size', type=int, default=FRAME_QUEUE_SIZE, help='Decoded frames buffered ahead of inference (0 = no decode thread)')
     args = p.parse_args()
 
-    out = process_video(args.video, args.intervals, args.output)
+    out = process_video(args.video, args.intervals, args.output, None if args.no_cache else args.cache_dir,
+                        queue_size=args.queue_size, inference_width=args.inference_width, hw_decode=args.hw_decode)
     print('Done:', out)
@@ -0,0 +1,140 @@
+"""
+Fuse a per-video landmark dataset with the IMU CSV recorded in the same session.
+
+create_dataset_from_video.py writes landmarks keyed by ``frame``; the loggers write
+samples keyed by a wall-clock ``TimeStamp`` (1 s resolution, ~7-8 samples/s). This
+script:
+  1. turns both into seconds on their own clocks (frame / fps; sensor samples are
+     spread evenly inside each logged second),
+  2. builds a motion-energy signal for each (speed of the tracked landmark, e.g.
+     the right wrist where the sensor is worn; gyroscope magnitude for the IMU),
+  3. estimates the clock offset as the lag that maximises their normalised
+     cross-correlation (FFT, searched within +/- --max-lag seconds),
+  4. resamples landmarks and sensor channels onto one common timeline and writes
+     a single multimodal Parquet file in fixed-size row groups.
+
+The video ``pose_class`` label is carried over to every fused row, which gives
+sensor rows a label without manual syncing.
+
+Usage:
+  python fuse_video_sensor.py --landmarks data/video1_dataset.csv --fps 30 \
+      --sensor sensor_csv_data/device_1/sensor_data_nRF_IMU_1_23092025_120831.csv \
+      --video-start 12:08:35 --output data/video1_fused.parquet
+"""
+import argparse
+import numpy as np
+import pandas as pd
+
+META_COLUMNS = ['frame', 'pose_class', 'video_source']
+SENSOR_META_COLUMNS = ['TimeStamp', 'Position']
+
+
+def sensor_seconds(timestamps):
+    """Seconds since the first sample, spreading samples evenly within each logged second."""
+    ts = pd.to_datetime(timestamps, format='%H:%M:%S', errors='coerce')
+    if ts.isna().any():
+        ts = pd.to_datetime(timestamps)
+    whole = (ts - ts.iloc[0]).dt.total_seconds().to_numpy()
+    groups = pd.Series(whole)
+    rank = groups.groupby(groups).cumcount().to_numpy()
+    count = groups.map(groups.value_counts()).to_numpy()
+    return whole + rank / count, ts.iloc[0]
+
+
+def motion_energy(t, values, rate):
+    """Speed of a multi-channel signal on a uniform grid at ``rate`` Hz starting at t=0."""
+    grid = np.arange(0.0, t[-1], 1.0 / rate)
+    v = np.stack([np.interp(grid, t, values[:, j]) for j in range(values.shape[1])], axis=1)
+    speed = np.linalg.norm(np.diff(v, axis=0, prepend=v[:1]), axis=1) * rate
+    return grid, speed
+
+
+def estimate_offset(video_energy, sensor_energy, rate, max_lag):
+    """Lag (s) to add to video time to get sensor time, by normalised cross-correlation."""
+    a = (video_energy - video_energy.mean()) / (video_energy.std() or 1.0)
+    b = (sensor_energy - sensor_energy.mean()) / (sensor_energy.std() or 1.0)
+    n = len(a) + len(b) - 1
+    size = 1 << (n - 1).bit_length()
+    corr = np.fft.irfft(np.fft.rfft(b, size) * np.conj(np.fft.rfft(a, size)), size)
+    # corr[k] = sum_i b[i + k] * a[i]; negative lags wrap to the end
+    lags = np.concatenate([np.arange(0, len(b)), np.arange(-(len(a) - 1), 0)])
+    corr = np.concatenate([corr[:len(b)], corr[size - (len(a) - 1):]])
+    overlap = np.minimum(len(a), len(b) - lags) - np.maximum(0, -lags)
+    valid = (np.abs(lags) <= max_lag * rate) & (overlap > rate)
+    score = np.where(valid, corr / np.maximum(overlap, 1), -np.inf)
+    best = int(np.argmax(score))
+    return lags[best] / rate, float(score[best])
+
+
+def fuse(landmarks, sensor, fps, rate=10.0, landmark='right_wrist', video_start=None, max_lag=30.0):
+    """Return (fused DataFrame, offset seconds, correlation score)."""
+    landmarks = landmarks.sort_values('frame').reset_index(drop=True)
+    t_video = landmarks['frame'].to_numpy(dtype=np.float64) / fps
+    lm_cols = [c for c in landmarks.columns if c not in META_COLUMNS and not c.endswith('_visibility')]
+    track = [f'{landmark}_{a}' for a in 'xyz' if f'{landmark}_{a}' in landmarks.columns]
+
+    sensor = sensor.drop(columns=[c for c in sensor.columns if c.startswith('Unnamed')])
+    t_sensor, sensor_t0 = sensor_seconds(sensor['TimeStamp'])
+    s_cols = [c for c in sensor.columns if c not in SENSOR_META_COLUMNS]
+    gyro = [c for c in s_cols if c[:2] in ('Gx', 'Gy', 'Gz')] or s_cols
+
+    # Coarse alignment from the known wall-clock start, refined by cross-correlation
+    base = 0.0
+    if video_start is not None:
+        base = (pd.to_datetime(video_start, format='%H:%M:%S') - sensor_t0).total_seconds()
+    _, e_video = motion_energy(t_video, landmarks[track].to_numpy(dtype=np.float64), rate)
+    # The gyroscope already measures angular speed, so its magnitude is the sensor's motion energy
+    gyro_mag = np.linalg.norm(sensor[gyro].to_numpy(dtype=np.float64), axis=1)
+    e_sensor = np.interp(np.arange(0.0, t_sensor[-1], 1.0 / rate), t_sensor, gyro_mag)
+    # Trim whichever stream started earlier by the coarse offset before searching the residual lag
+    start_idx = int(round(base * rate))
+    if start_idx > 0:
+        e_sensor = e_sensor[start_idx:]
+    elif start_idx < 0:
+        e_video = e_video[-start_idx:]
+    residual, score = estimate_offset(e_video, e_sensor, rate, max_lag)
+    offset = base + residual
+
+    # Common timeline in sensor seconds over the overlap of both streams
+    v_in_s = t_video + offset
+    lo, hi = max(v_in_s[0], t_sensor[0]), min(v_in_s[-1], t_sensor[-1])
+    if hi <= lo:
+        raise ValueError('Video and sensor streams do not overlap after alignment')
+    grid = np.arange(lo, hi, 1.0 / rate)
+    out = {'time_s': grid.astype(np.float32),
+           'TimeStamp': (sensor_t0 + pd.to_timedelta(grid, unit='s')).strftime('%H:%M:%S.%f').str[:-3]}
+    for c in s_cols:
+        out[c] = np.interp(grid, t_sensor, sensor[c].to_numpy(dtype=np.float64)).astype(np.float32)
+    for c in lm_cols:
+        out[c] = np.interp(grid, v_in_s, landmarks[c].to_numpy(dtype=np.float64)).astype(np.float32)
+    # Labels are not interpolated: take the nearest labelled frame
+    nearest = np.clip(np.searchsorted(v_in_s, grid), 0, len(v_in_s) - 1)
+    prev = np.clip(nearest - 1, 0, len(v_in_s) - 1)
+    nearest = np.where(np.abs(v_in_s[prev] - grid) < np.abs(v_in_s[nearest] - grid), prev, nearest)
+    out['pose_class'] = landmarks['pose_class'].to_numpy()[nearest].astype(np.int8)
+    # Frames without a detected/labelled pose leave gaps; mark rows far from any frame
+    out['video_gap'] = np.abs(v_in_s[nearest] - grid) > 2.0 / fps
+    if 'video_source' in landmarks:
+        out['video_source'] = landmarks['video_source'].iloc[0]
+    return pd.DataFrame(out), offset, score
+
+
+if __name__ == '__main__':
+    p = argparse.ArgumentParser()
+    p.add_argument('--landmarks', required=True, help='Per-video landmark CSV from create_dataset_from_video.py')
+    p.add_argument('--sensor', required=True, help='Sensor CSV recorded during the video')
+    p.add_argument('--fps', type=float, default=30.0, help='Video frame rate used for frame numbers')
+    p.add_argument('--video-start', default=None, help='Wall-clock time (HH:MM:SS) of frame 0, if known')
+    p.add_argument('--landmark', default='right_wrist', help='Landmark tracking the sensor location')
+    p.add_argument('--rate', type=float, default=10.0, help='Common timeline rate in Hz')
+    p.add_argument('--max-lag', type=float, default=30.0, help='Largest clock offset searched (s)')
+    p.add_argument('--row-group-size', type=int, default=65536, help='Rows per Parquet row group')
+    p.add_argument('--output', required=True, help='Output Parquet path')
+    args = p.parse_args()
+
+    fused, offset, score = fuse(pd.read_csv(args.landmarks), pd.read_csv(args.sensor), args.fps,
+                                args.rate, args.landmark, args.video_start, args.max_lag)
+    fused.to_parquet(args.output, index=False, row_group_size=args.row_group_size)
+    print(f"Estimated clock offset: {offset:+.2f}s (correlation {score:.2f})")
+    print(f"Saved fused dataset: {args.output} ({len(fused)} rows, {fused.shape[1]} columns)")
+    print('Done!')
@@ -0,0 +1,201 @@
+"""
+Merge and label every recorded session in one run (replaces the per-day *_data_label.py scripts).
+
+Device recordings are discovered under --data-dir by the session timestamp in
+their file name (ddmmYYYY_HHMMSS), e.g. the logger layout
+  sensor_csv_data/device_1/sensor_data_nRF_IMU_1_19092025_164551.csv
+  sensor_csv_data/device_2/sensor_data_nRF_IMU_2_19092025_164551_labelled.csv
+Both CSVs and .imua archives (Sensor Code/imu_archive.py) are accepted. When a
+device has several files for a session, the *_labelled one is used.
+
+Cleanup comes from a JSON rules file (label_rules.json): "defaults" apply to
+every session and "sessions" override them per session timestamp:
+  merge_on       columns the device tables are joined on
+  label_column   column holding the pose label (sessions without it are skipped)
+  drop_columns   regexes of columns to drop (e.g. the stray "Unnamed: 11")
+  dropna         "all", "none" or a list of devices whose incomplete rows are dropped
+                 (rows missing a required sensor value or the label; optional
+                 columns such as BPM may stay empty)
+  rename         {device: {old: new}} column renames applied before merging
+
+Sessions are processed in parallel. The manifest (<output>/manifest.json)
+records the inputs, a content hash (input bytes + effective rules) and the row
+counts, so unchanged sessions are skipped on the next run.
+
+Usage:
+  python label_sessions.py --data-dir sensor_csv_data --output data/labelled --workers 4
+"""
+import argparse
+import glob
+import hashlib
+import json
+import os
+import re
+import sys
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor, as_completed
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..', 'Sensor Code'))
+from imu_archive import ARCHIVE_SUFFIX, read_sensor_file  # noqa: E402
+from sensor_loader import SCHEMAS, detect_schema  # noqa: E402
+
+DEFAULT_RULES = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'label_rules.json')
+MANIFEST_FILE = 'manifest.json'
+SESSION_PATTERN = re.compile(r'(\d{8}_\d{6})')
+DEVICE_PATTERNS = [re.compile(r'IMU_(\d+)_\d{8}_\d{6}'), re.compile(r'device_?(\d+)')]
+
+
+def device_of(path):
+    """Device name ("device_N") from the file name or its device_N folder."""
+    for pattern in DEVICE_PATTERNS:
+        for text in (os.path.basename(path), os.path.basename(os.path.dirname(path))):
+            m = pattern.search(text)
+            if m:
+                return f'device_{m.group(1)}'
+    return os.path.splitext(os.path.basename(path))[0]
+
+
+def discover_sessions(data_dir):
+    """{session: {device: path}} for every CSV/archive with a session timestamp."""
+    sessions = defaultdict(dict)
+    paths = sorted(glob.glob(os.path.join(data_dir, '**', '*.csv'), recursive=True)
+                   + glob.glob(os.path.join(data_dir, '**', '*' + ARCHIVE_SUFFIX), recursive=True))
+    for path in paths:
+        m = SESSION_PATTERN.search(os.path.basename(path))
+        if not m:
+            continue
+        device = device_of(path)
+        current = sessions[m.group(1)].get(device)
+        stem = os.path.splitext(os.path.basename(path))[0]
+        labelled = stem.endswith('_labelled') and not stem.endswith('not_labelled')
+        if current is None or labelled:
+            sessions[m.group(1)][device] = path
+    return {s: dict(sorted(d.items(), key=lambda kv: device_sort_key(kv[0]))) for s, d in sorted(sessions.items())}
+
+
+def device_sort_key(device):
+    m = re.search(r'(\d+)$', device)
+    return (int(m.group(1)) if m else float('inf'), device)
+
+
+def load_rules(path):
+    with open(path) as f:
+        return json.load(f)
+
+
+def session_rules(rules, session):
+    """Defaults overridden by the per-session entry."""
+    return dict(rules.get('defaults', {}), **rules.get('sessions', {}).get(session, {}))
+
+
+def content_hash(paths, rules):
+    h = hashlib.sha256(json.dumps(rules, sort_keys=True).encode())
+    for path in paths:
+        with open(path, 'rb') as f:
+            for block in iter(lambda: f.read(1 << 20), b''):
+                h.update(block)
+    return h.hexdigest()
+
+
+def required_columns(columns, label_column):
+    """Columns a complete row must have: the logger schema's time and sensor values, plus the label.
+
+    Tables in no known layout need every column except the loggers' optional ones (BPM).
+    """
+    try:
+        spec = SCHEMAS[detect_schema(list(columns))]
+        required = [spec['time']] + spec['values']
+    except ValueError:
+        optional = {c for spec in SCHEMAS.values() for c in spec.get('optional', [])}
+        required = [c for c in columns if c not in optional]
+    return required + [label_column] if label_column in columns and label_column not in required else required
+
+
+def clean_device(data, device, rules):
+    patterns = [re.compile(p) for p in rules.get('drop_columns', [])]
+    data = data.drop(columns=[c for c in data.columns if any(p.search(c) for p in patterns)])
+    data = data.rename(columns=rules.get('rename', {}).get(device, {}))
+    dropna = rules.get('dropna', 'all')
+    if dropna == 'all' or (isinstance(dropna, list) and device in dropna):
+        data = data.dropna(subset=required_columns(data.columns, rules.get('label_column', 'Position')))
+    return data
+
+
+def label_session(session, devices, rules, output_dir):
+    """Clean, merge and write one session; returns its manifest entry."""
+    merge_on = rules.get('merge_on', ['TimeStamp'])
+    label_column = rules.get('label_column', 'Position')
+    data = None
+    for device, path in devices.items():
+        frame = clean_device(read_sensor_file(path), device, rules)
+        data = frame if data is None else pd.merge(data, frame, on=merge_on)
+    entry = {'inputs': devices, 'rows': len(data)}
+    if label_column not in data.columns:
+        return dict(entry, status='unlabelled')
+    output = os.path.join(output_dir, f'{session}_labelled.csv')
+    data.to_csv(output + '.tmp', index=False)
+    os.replace(output + '.tmp', output)
+    return dict(entry, status='labelled', output=os.path.relpath(output, output_dir),
+                labelled_rows=int(data[label_column].notna().sum()))
+
+
+def _run_session(args):
+    session, devices, rules, output_dir, digest = args
+    try:
+        return session, dict(label_session(session, devices, rules, output_dir), hash=digest)
+    except Exception as e:
+        return session, {'inputs': devices, 'hash': digest, 'status': 'failed', 'error': str(e)}
+
+
+def write_manifest(path, manifest):
+    with open(path + '.tmp', 'w') as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+    os.replace(path + '.tmp', path)
+
+
+def run(data_dir, output_dir, rules_path=DEFAULT_RULES, workers=None, force=False, min_devices=2):
+    rules = load_rules(rules_path)
+    os.makedirs(output_dir, exist_ok=True)
+    manifest_path = os.path.join(output_dir, MANIFEST_FILE)
+    manifest = {}
+    if os.path.exists(manifest_path):
+        with open(manifest_path) as f:
+            manifest = json.load(f)
+
+    jobs = []
+    for session, devices in discover_sessions(data_dir).items():
+        if len(devices) < min_devices:
+            print(f"  {session}: only {len(devices)} device file(s), skipped")
+            continue
+        effective = session_rules(rules, session)
+        digest = content_hash(list(devices.values()), effective)
+        previous = manifest.get(session, {})
+        if not force and previous.get('hash') == digest and previous.get('status') != 'failed':
+            continue
+        jobs.append((session, devices, effective, output_dir, digest))
+    print(f"{len(jobs)} session(s) to process, {len(manifest)} in manifest")
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = [pool.submit(_run_session, job) for job in jobs]
+        for future in as_completed(futures):
+            session, entry = future.result()
+            manifest[session] = entry
+            write_manifest(manifest_path, manifest)
+            detail = entry.get('error') or f"{entry['rows']} rows"
+            print(f"  {session}: {entry['status']} ({detail})")
+    return manifest
+
+
+if __name__ == '__main__':
+    p = argparse.ArgumentParser()
+    p.add_argument('--data-dir', required=True, help='Logger output folder (searched recursively)')
+    p.add_argument('--output', required=True, help='Output folder for <session>_labelled.csv and manifest.json')
+    p.add_argument('--rules', default=DEFAULT_RULES, help='JSON cleanup rules')
+    p.add_argument('--workers', type=int, default=None, help='Worker processes (default: CPU count)')
+    p.add_argument('--min-devices', type=int, default=2, help='Skip sessions with fewer device files')
+    p.add_argument('--force', action='store_true', help='Reprocess sessions even if their hash is unchanged')
+    args = p.parse_args()
+
+    run(args.data_dir, args.output, args.rules, args.workers, args.force, args.min_devices)
+    print('Done!')
@@ -9,10 +9,12 @@ import argparse
 import pandas as pd
 
 
-def merge_datasets(input_files, output_file, shuffle=True, random_state=42):
+def merge_datasets(input_files, output_file, shuffle=True, random_state=42, normalized_only=False):
     """
     Merge multiple dataset CSVs into one, optionally shuffle, and save.
     Removes visibility columns to match notebook format (only x,y,z coords).
+    With normalized_only, raw x,y,z are dropped too and only the normalized
+    coordinates (_nx/_ny/_nz) and joint angles computed at extraction are kept.
     """
     dfs = []
     for f in input_files:
@@ -30,6 +32,11 @@ def merge_datasets(input_files, output_file, shuffle=True, random_state=42):
     if visibility_cols:
         print(f"Removing {len(visibility_cols)} visibility columns to match notebook format...")
         merged_df = merged_df.drop(columns=visibility_cols)
+
+    if normalized_only:
+        raw_cols = [c for c in merged_df.columns if c.endswith(('_x', '_y', '_z'))]
+        print(f"Removing {len(raw_cols)} raw coordinate columns (keeping normalized coordinates and angles)...")
+        merged_df = merged_df.drop(columns=raw_cols)
     
     # Shuffle if requested
     if shuffle:
@@ -59,7 +66,9 @@ if __name__ == '__main__':
     p.add_argument('--output', required=True, help='Output combined dataset CSV path')
     p.add_argument('--no-shuffle', action='store_true', help='Skip shuffling')
     p.add_argument('--random-state', type=int, default=42, help='Random state for shuffling')
+    p.add_argument('--normalized-only', action='store_true', help='Keep only normalized coordinates and joint angles')
     args = p.parse_args()
     
-    df = merge_datasets(args.inputs, args.output, shuffle=not args.no_shuffle, random_state=args.random_state)
+    df = merge_datasets(args.inputs, args.output, shuffle=not args.no_shuffle, random_state=args.random_state,
+                        normalized_only=args.normalized_only)
     print('\nDone!')
@@ -7,72 +7,68 @@ Original file is located at
     https://colab.research.google.com/drive/1fGJ2_cVPsWGpI-3C_6fOhdqB-_hJURtQ
 """
 
-import numpy as np
+import argparse
+import os
 import pandas as pd
-import tensorflow as tf
-from tensorflow.keras.models import Sequential
-from tensorflow.keras.layers import LSTM, Dense, Dropout
-from sklearn.model_selection import train_test_split
-from sklearn.preprocessing import StandardScaler, LabelEncoder
-
-data1 = pd.read_csv('/content/sensor_data_nRF_IMU_1_19092025_164551_not_labelled.csv')
-data2 = pd.read_csv('/content/sensor_data_nRF_IMU_2_19092025_164551_labelled.csv')
-
-data1.head()
-
-data2.head()
-
-data2 = data2.drop('Unnamed: 11', axis=1)
-data2.head()
-
-data2.dropna(inplace=True)
-data2.head()
-
-data = pd.merge(data1, data2, on=['TimeStamp'])
-data.head()
-
-data.info()
-
-X = data.drop(['Position','TimeStamp'], axis=1).values
-y = data['Position'].values
-
-label_encoder = LabelEncoder()
-y = label_encoder.fit_transform(y)
-
-y
-
-y=y-1
-
-scaler = StandardScaler()
-X_scaled = scaler.fit_transform(X)
-
-sequence_length = 50
-
-def create_sequences(X, y, seq_len):
-    Xs, ys = [], []
-    for i in range(len(X) - seq_len):
-        Xs.append(X[i:(i + seq_len)])
-        ys.append(y[i + seq_len])
-    return np.array(Xs), np.array(ys)
-
-X_seq, y_seq = create_sequences(X, y, sequence_length)
-
-X_train, X_test, y_train, y_test = train_test_split(X_seq, y_seq, test_size=0.2, random_state=42)
-
-model = Sequential([
-    LSTM(128, return_sequences=True, input_shape=(X_train.shape[1], X_train.shape[2])),
-    Dropout(0.3),
-    LSTM(64),
-    Dropout(0.3),
-    Dense(64, activation='relu'),
-    Dense(len(np.unique(y)), activation='softmax')
-])
-
-model.compile(optimizer='adam', loss='sparse_categorical_crossentropy', metrics=['accuracy'])
-
-history = model.fit(X_train, y_train, epochs=30, batch_size=64, validation_data=(X_test, y_test))
-
-test_loss, test_acc = model.evaluate(X_test, y_test)
-print(f"Test Accuracy: {test_acc:.2f}")
-
-print("Thank You")
\ No newline at end of file
+from preprocessing import DEFAULT_ARTIFACT_PATH, load_or_fit
+
+SOURCES = ['/content/sensor_data_nRF_IMU_1_19092025_164551_not_labelled.csv',
+           '/content/sensor_data_nRF_IMU_2_19092025_164551_labelled.csv']
+DEFAULT_MODEL_PATH = os.path.join('artifacts', 'basic_lstm.keras')
+
+def load_labelled_session(sources):
+    data1 = pd.read_csv(sources[0])
+    data2 = pd.read_csv(sources[1])
+    data2 = data2.drop('Unnamed: 11', axis=1)
+    data2.dropna(inplace=True)
+    return pd.merge(data1, data2, on=['TimeStamp'])
+
+def build_model(sequence_length, num_features, num_classes):
+    from tensorflow.keras.models import Sequential
+    from tensorflow.keras.layers import LSTM, Dense, Dropout
+    model = Sequential([
+        LSTM(128, return_sequences=True, input_shape=(sequence_length, num_features)),
+        Dropout(0.3),
+        LSTM(64),
+        Dropout(0.3),
+        Dense(64, activation='relu'),
+        Dense(num_classes, activation='softmax')
+    ])
+    model.compile(optimizer='adam', loss='sparse_categorical_crossentropy', metrics=['accuracy'])
+    return model
+
+def train(sources=SOURCES, sequence_length=50, epochs=30, output=DEFAULT_MODEL_PATH):
+    from sklearn.model_selection import train_test_split
+    from input_pipeline import WindowedInput
+
+    # Scaler statistics, label mapping and column order are saved to artifacts/preprocessing.json;
+    # the scaled arrays are cached so unchanged sources skip this step entirely.
+    preprocessor, X_scaled, y = load_or_fit(sources, load_labelled_session, DEFAULT_ARTIFACT_PATH)
+
+    # Windows are gathered per batch from the scaled array by index instead of being materialized
+    windows = WindowedInput(X_scaled, y)
+    train_idx, test_idx = train_test_split(windows.starts(sequence_length), test_size=0.2, random_state=42)
+    train_ds = windows.dataset(train_idx, sequence_length, batch_size=64)
+    test_ds = windows.dataset(test_idx, sequence_length, batch_size=64, shuffle=False, cache=True)
+
+    model = build_model(sequence_length, preprocessor.num_features, preprocessor.num_classes)
+    model.fit(train_ds, epochs=epochs, validation_data=test_ds)
+
+    test_loss, test_acc = model.evaluate(test_ds)
+    print(f"Test Accuracy: {test_acc:.2f}")
+
+    # Saved next to artifacts/preprocessing.json for batch_infer.py and streaming inference
+    model.save(output)
+    return model
+
+if __name__ == '__main__':
+    p = argparse.ArgumentParser()
+    p.add_argument('--inputs', nargs=2, default=SOURCES, metavar=('NOT_LABELLED', 'LABELLED'),
+                   help='Device 1 (not labelled) and device 2 (labelled) CSVs of the session')
+    p.add_argument('--sequence-length', type=int, default=50, help='Window length in samples')
+    p.add_argument('--epochs', type=int, default=30, help='Training epochs')
+    p.add_argument('--output', default=DEFAULT_MODEL_PATH, help='Saved Keras model')
+    args = p.parse_args()
+
+    train(args.inputs, args.sequence_length, args.epochs, args.output)
+    print("Thank You")
@@ -0,0 +1,184 @@
+"""
+Batch offline scoring of archived logger sessions with a trained sensor model.
+
+Sessions are discovered in the logger folder layout (sensor_csv_data/device_N/
+sensor_data_nRF_IMU_N_<ddmmYYYY_HHMMSS>.csv); the device CSVs of one session are
+merged on TimeStamp exactly like the training scripts, scaled with the saved
+preprocessing artifact and scored in large batches. Files are spread over a
+process pool, each worker loading the model once.
+
+Every session produces one Parquet file with, per sample: TimeStamp, row,
+prediction (Position), confidence and the full class probabilities (prob_<Position>).
+The first ``sequence_length`` rows of a session have no complete window and get
+no prediction. Output is written atomically, so an interrupted run can simply be
+restarted and skips sessions that already have results.
+
+Usage:
+  python batch_infer.py --data-dir sensor_csv_data --output predictions/ \
+      --model artifacts/basic_lstm.keras --artifact artifacts/preprocessing.json --workers 4
+"""
+import argparse
+import glob
+import os
+import re
+import time
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor, as_completed
+import sys
+import numpy as np
+import pandas as pd
+from preprocessing import SensorPreprocessor, DEFAULT_ARTIFACT_PATH, make_windows
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..', 'Sensor Code'))
+from sensor_loader import load_logger_csv  # noqa: E402
+
+DEFAULT_MODEL_PATH = os.path.join('artifacts', 'basic_lstm.keras')
+SESSION_PATTERN = re.compile(r'(\d{8}_\d{6})')
+
+_model = None
+_preprocessor = None
+
+
+def device_number(device):
+    """Numeric part of a ``device_N`` folder name, so device_10 sorts after device_2."""
+    digits = device.rsplit('_', 1)[-1]
+    return (int(digits), device) if digits.isdigit() else (float('inf'), device)
+
+
+def discover_sessions(data_dir, devices=None):
+    """Group device CSVs by session timestamp: {session: [csv per device, in device order]}.
+
+    Device order is the order of ``devices`` when given, else numeric (device_2 before
+    device_10). It decides which merged columns get the _x/_y suffixes, so it must
+    match the order the model was trained on.
+    """
+    sessions = defaultdict(dict)
+    for path in glob.glob(os.path.join(data_dir, 'device_*', '*.csv')):
+        device = os.path.basename(os.path.dirname(path))
+        if devices and device not in devices:
+            continue
+        m = SESSION_PATTERN.search(os.path.basename(path))
+        if m:
+            sessions[m.group(1)][device] = path
+    wanted = len(devices) if devices else None
+    result = {}
+    for session, by_device in sorted(sessions.items()):
+        if wanted and len(by_device) != wanted:
+            continue
+        order = [d for d in devices if d in by_device] if devices else sorted(by_device, key=device_number)
+        result[session] = [by_device[d] for d in order]
+    return result
+
+
+def load_session(paths):
+    """Merge the device CSVs of one session on TimeStamp (same suffixes as training).
+
+    The loader types and validates each logger CSV and already drops stray Unnamed columns.
+    """
+    data = load_logger_csv(paths[0])
+    for path in paths[1:]:
+        data = pd.merge(data, load_logger_csv(path), on=['TimeStamp'])
+    return data
+
+
+def _init_worker(model_path, artifact_path, threads):
+    global _model, _preprocessor
+    import tensorflow as tf
+    if threads:
+        tf.config.threading.set_intra_op_parallelism_threads(threads)
+        tf.config.threading.set_inter_op_parallelism_threads(1)
+    _model = tf.keras.models.load_model(model_path)
+    _preprocessor = SensorPreprocessor.load(artifact_path)
+
+
+def predict_windows(model, windows, batch_size):
+    """Class probabilities for a (possibly strided-view) window array, batch by batch."""
+    probs = np.empty((len(windows), model.output_shape[-1]), dtype=np.float32)
+    for start in range(0, len(windows), batch_size):
+        batch = np.ascontiguousarray(windows[start:start + batch_size])
+        probs[start:start + len(batch)] = model.predict_on_batch(batch)
+    return probs
+
+
+def score_session(session, paths, output_dir, batch_size):
+    """Score one session and write its Parquet file; returns (session, samples, seconds)."""
+    t0 = time.perf_counter()
+    data = load_session(paths)
+    seq_len = _model.input_shape[1]
+    X = _preprocessor.transform(data)
+
+    classes = _preprocessor.classes
+    out = pd.DataFrame({'TimeStamp': data['TimeStamp'].astype(str).to_numpy(),
+                        'row': np.arange(len(data), dtype=np.int32)})
+    pred = np.full(len(data), np.nan, dtype=np.float32)
+    conf = np.full(len(data), np.nan, dtype=np.float32)
+    probs = np.full((len(data), len(classes)), np.nan, dtype=np.float32)
+    n = 0
+    if len(X) > seq_len:
+        windows, _ = make_windows(X, np.zeros(len(X)), seq_len)
+        p = predict_windows(_model, windows, batch_size)
+        n = len(p)
+        best = p.argmax(axis=1)
+        pred[seq_len:] = classes[best]
+        conf[seq_len:] = p[np.arange(n), best]
+        probs[seq_len:] = p
+    out['prediction'] = pred
+    out['confidence'] = conf
+    for i, c in enumerate(classes):
+        out[f'prob_{c:g}'] = probs[:, i]
+
+    final = os.path.join(output_dir, f'{session}.parquet')
+    tmp = final + '.tmp'
+    out.to_parquet(tmp, index=False)
+    os.replace(tmp, final)
+    return session, n, time.perf_counter() - t0
+
+
+def run(data_dir, output_dir, model_path=DEFAULT_MODEL_PATH, artifact_path=DEFAULT_ARTIFACT_PATH,
+        workers=None, batch_size=2048, devices=None, threads=None):
+    os.makedirs(output_dir, exist_ok=True)
+    sessions = discover_sessions(data_dir, devices)
+    todo = {s: p for s, p in sessions.items()
+            if not os.path.exists(os.path.join(output_dir, f'{s}.parquet'))}
+    print(f"Found {len(sessions)} session(s), {len(sessions) - len(todo)} already scored, {len(todo)} to go")
+    if not todo:
+        return
+
+    workers = workers or os.cpu_count() or 1
+    if threads is None:
+        threads = max(1, (os.cpu_count() or 1) // workers)
+
+    total, t0 = 0, time.perf_counter()
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                             initargs=(model_path, artifact_path, threads)) as pool:
+        futures = {pool.submit(score_session, s, p, output_dir, batch_size): s for s, p in todo.items()}
+        for fut in as_completed(futures):
+            try:
+                session, n, secs = fut.result()
+            except Exception as e:
+                print(f"  {futures[fut]}: FAILED ({e})")
+                continue
+            total += n
+            elapsed = time.perf_counter() - t0
+            print(f"  {session}: {n} samples in {secs:.2f}s ({n / max(secs, 1e-9):.0f} samples/s); "
+                  f"overall {total / elapsed:.0f} samples/s")
+    elapsed = time.perf_counter() - t0
+    print(f"\nScored {total} samples in {elapsed:.1f}s ({total / max(elapsed, 1e-9):.0f} samples/s)")
+
+
+if __name__ == '__main__':
+    p = argparse.ArgumentParser()
+    p.add_argument('--data-dir', default='sensor_csv_data', help='Logger output folder with device_* subfolders')
+    p.add_argument('--output', required=True, help='Output folder for per-session Parquet predictions')
+    p.add_argument('--model', default=DEFAULT_MODEL_PATH, help='Saved Keras model')
+    p.add_argument('--artifact', default=DEFAULT_ARTIFACT_PATH, help='Preprocessing artifact used in training')
+    p.add_argument('--devices', nargs='+', default=['device_1', 'device_2'],
+                   help='Device folders merged into one session, in training order')
+    p.add_argument('--workers', type=int, default=None, help='Worker processes (default: all cores)')
+    p.add_argument('--threads', type=int, default=None, help='TensorFlow threads per worker')
+    p.add_argument('--batch-size', type=int, default=2048, help='Windows per inference batch')
+    args = p.parse_args()
+
+    run(args.data_dir, args.output, args.model, args.artifact, args.workers,
+        args.batch_size, args.devices, args.threads)
+    print('Done!')
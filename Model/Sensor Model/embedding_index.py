@@ -0,0 +1,316 @@
+"""
+Nearest-neighbour index over window embeddings, for "this is what a correct pose looks like" retrieval.
+
+Every window of the sessions in a SessionStore is turned into a fixed-size
+embedding, either
+  model        the output of the penultimate Dense layer of the trained LSTM
+  engineered   per-feature mean, std, min, max and mean absolute first difference
+and L2-normalized, so inner product = cosine similarity.
+
+The index is an inverted file (IVF): k-means centroids partition the
+embeddings into lists and a query only scans the ``nprobe`` lists closest to
+it, which keeps queries in the millisecond range at millions of windows.
+Everything lives in a directory of append-only arrays (vectors, labels,
+session, window start, list assignment) plus the centroids, so inserting new
+sessions appends to the files without rebuilding. New rows are scanned
+exhaustively until they are merged into the list layout (automatically once
+they exceed 5% of the index).
+
+Usage:
+  python embedding_index.py build --store store/ --output window_index/ --model artifacts/basic_lstm.keras
+  python embedding_index.py add --store store_new/ --index window_index/ --model artifacts/basic_lstm.keras
+  python embedding_index.py query --index window_index/ --store store/ --session 19092025_164551 --start 1200 --label 7
+  python embedding_index.py bench --index window_index/
+"""
+import argparse
+import json
+import os
+import time
+import numpy as np
+
+INDEX_VERSION = 1
+INDEX_FILE = 'index.json'
+CENTROIDS_FILE = 'centroids.npy'
+ARRAY_FILES = {'vectors': np.float32, 'labels': np.int32, 'sessions': np.int32, 'starts': np.int64,
+               'lists': np.int32}
+MERGE_FRACTION = 0.05
+DEFAULT_STRIDE = 5
+TRAIN_SAMPLE = 100_000
+
+
+def normalize(X):
+    X = np.ascontiguousarray(X, dtype=np.float32)
+    norms = np.linalg.norm(X, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return X / norms
+
+
+def kmeans(X, k, iters=20, sample=100_000, random_state=0):
+    """Spherical k-means on a sample (centroids are unit vectors)."""
+    rng = np.random.default_rng(random_state)
+    if len(X) > sample:
+        X = X[rng.choice(len(X), sample, replace=False)]
+    k = min(k, len(X))
+    centroids = X[rng.choice(len(X), k, replace=False)].copy()
+    for _ in range(iters):
+        assign = (X @ centroids.T).argmax(axis=1)
+        order = np.argsort(assign, kind='stable')
+        counts = np.bincount(assign, minlength=k)
+        sums = np.zeros_like(centroids)
+        present = counts > 0
+        sums[present] = np.add.reduceat(X[order], (np.cumsum(counts) - counts)[present])
+        empty = ~present
+        sums[empty] = X[rng.choice(len(X), int(empty.sum()))]
+        centroids = normalize(sums)
+    return centroids
+
+
+def engineered_features(windows):
+    """(n, seq_len, f) windows -> (n, 5f) summary statistics."""
+    W = np.asarray(windows, dtype=np.float32)
+    return np.concatenate([W.mean(axis=1), W.std(axis=1), W.min(axis=1), W.max(axis=1),
+                           np.abs(np.diff(W, axis=1)).mean(axis=1)], axis=1)
+
+
+def model_embedder(model_path):
+    """Embedding function from the penultimate Dense layer of a saved model; returns (fn, seq_len)."""
+    import tensorflow as tf
+    from personalize import embed
+    model = tf.keras.models.load_model(model_path)
+    dense = [layer for layer in model.layers if isinstance(layer, tf.keras.layers.Dense)]
+    if len(dense) < 2:
+        raise ValueError(f"{model_path} has no hidden Dense layer to take embeddings from")
+    backbone = tf.keras.Model(model.inputs, dense[-2].output)
+    return (lambda windows: embed(backbone, windows)), model.input_shape[1]
+
+
+class WindowIndex:
+    """IVF index with on-disk, append-only storage and incremental inserts."""
+
+    def __init__(self, path):
+        self.path = path
+        with open(os.path.join(path, INDEX_FILE)) as f:
+            self.meta = json.load(f)
+        if self.meta['version'] != INDEX_VERSION:
+            raise ValueError(f"Unsupported index version {self.meta['version']} in {path}")
+        self.centroids = np.load(os.path.join(path, CENTROIDS_FILE))
+        # arrays[name] is a view of the first len(self) rows of a buffer that grows by doubling,
+        # so appending a session does not copy the whole index
+        self.arrays, self._buffers = {}, {}
+        for name, dtype in ARRAY_FILES.items():
+            data = np.fromfile(os.path.join(path, f'{name}.bin'), dtype=dtype)
+            self.arrays[name] = self._buffers[name] = data.reshape(-1, self.dim) if name == 'vectors' else data
+        self._merge()
+
+    @property
+    def dim(self):
+        return self.meta['dim']
+
+    @property
+    def session_names(self):
+        return self.meta['sessions']
+
+    def __len__(self):
+        return len(self.arrays['labels'])
+
+    @classmethod
+    def create(cls, path, vectors, nlist=None, expected=None, **meta):
+        """Train centroids on ``vectors`` and create an empty index directory.
+
+        ``vectors`` is a training sample; ``nlist`` defaults to ~4*sqrt of the
+        ``expected`` number of indexed windows (the sample size if not given).
+        """
+        vectors = normalize(vectors)
+        nlist = nlist or int(np.clip(4 * np.sqrt(expected or len(vectors)), 1, 4096))
+        os.makedirs(path, exist_ok=True)
+        np.save(os.path.join(path, CENTROIDS_FILE), kmeans(vectors, nlist))
+        for name in ARRAY_FILES:
+            open(os.path.join(path, f'{name}.bin'), 'wb').close()
+        with open(os.path.join(path, INDEX_FILE), 'w') as f:
+            json.dump(dict(meta, version=INDEX_VERSION, dim=vectors.shape[1], sessions=[]), f, indent=2)
+        return cls(path)
+
+    def add(self, vectors, labels, session, starts):
+        """Append the windows of one session (vectors are normalized here)."""
+        vectors = normalize(vectors)
+        if vectors.shape[1] != self.dim:
+            raise ValueError(f"Expected {self.dim}-d embeddings, got {vectors.shape[1]}")
+        if session not in self.meta['sessions']:
+            self.meta['sessions'].append(session)
+        new = {'vectors': vectors, 'labels': np.asarray(labels, dtype=np.int32),
+               'sessions': np.full(len(vectors), self.meta['sessions'].index(session), dtype=np.int32),
+               'starts': np.asarray(starts, dtype=np.int64),
+               'lists': (vectors @ self.centroids.T).argmax(axis=1).astype(np.int32)}
+        for name, values in new.items():
+            with open(os.path.join(self.path, f'{name}.bin'), 'ab') as f:
+                values.astype(ARRAY_FILES[name]).tofile(f)
+            self._append(name, values)
+        with open(os.path.join(self.path, INDEX_FILE), 'w') as f:
+            json.dump(self.meta, f, indent=2)
+        if len(self) - self.merged > MERGE_FRACTION * max(self.merged, 1):
+            self._merge()
+
+    def _append(self, name, values):
+        n = len(self.arrays[name])
+        need = n + len(values)
+        buf = self._buffers[name]
+        if need > len(buf):
+            grown = np.empty((max(need, 2 * len(buf)),) + buf.shape[1:], dtype=buf.dtype)
+            grown[:n] = buf[:n]
+            buf = self._buffers[name] = grown
+        buf[n:need] = values
+        self.arrays[name] = buf[:need]
+
+    def _merge(self):
+        """Rebuild the list layout (row ids grouped by list) over all rows."""
+        lists = self.arrays['lists']
+        self.order = np.argsort(lists, kind='stable')
+        self.offsets = np.searchsorted(lists[self.order], np.arange(len(self.centroids) + 1))
+        self.merged = len(lists)
+        # Which lists hold each label, so filtered queries only probe lists that can match
+        labels = self.arrays['labels']
+        self.list_labels = np.zeros((len(self.centroids), int(labels.max()) + 1 if len(labels) else 1), dtype=bool)
+        self.list_labels[lists, labels] = True
+
+    def search(self, queries, k=5, nprobe=8, label=None, exclude_session=None):
+        """Top-k (scores, row ids) per query; ``label`` keeps only windows of that class index."""
+        queries = normalize(np.atleast_2d(queries))
+        similarity = queries @ self.centroids.T
+        if label is not None:
+            has_label = np.zeros(len(self.centroids), dtype=bool)
+            if label < self.list_labels.shape[1]:
+                has_label = self.list_labels[:, label]
+            similarity[:, ~has_label] = -np.inf
+        probes = np.argsort(-similarity, axis=1)[:, :nprobe]
+        pending = np.arange(self.merged, len(self))
+        all_scores = np.full((len(queries), k), -np.inf, dtype=np.float32)
+        all_ids = np.full((len(queries), k), -1, dtype=np.int64)
+        for qi, (q, lists) in enumerate(zip(queries, probes)):
+            candidates = np.concatenate([self.order[self.offsets[l]:self.offsets[l + 1]] for l in lists] + [pending])
+            if label is not None:
+                candidates = candidates[self.arrays['labels'][candidates] == label]
+            if exclude_session in self.session_names:
+                excluded = self.session_names.index(exclude_session)
+                candidates = candidates[self.arrays['sessions'][candidates] != excluded]
+            if not len(candidates):
+                continue
+            scores = self.arrays['vectors'][candidates] @ q
+            top = np.argpartition(-scores, min(k, len(scores)) - 1)[:k]
+            top = top[np.argsort(-scores[top])]
+            all_scores[qi, :len(top)] = scores[top]
+            all_ids[qi, :len(top)] = candidates[top]
+        return all_scores, all_ids
+
+    def describe(self, ids):
+        """Session name, window start and class index for row ids."""
+        ids = np.asarray(ids)
+        ids = ids[ids >= 0]
+        return [{'session': self.session_names[self.arrays['sessions'][i]], 'start': int(self.arrays['starts'][i]),
+                 'label': int(self.arrays['labels'][i])} for i in ids]
+
+
+def session_windows(store, session, seq_len, stride=DEFAULT_STRIDE):
+    """(starts relative to the session, windows, labels) every ``stride`` rows of one store session."""
+    starts = store.window_starts(seq_len, [session['name']])[::stride]
+    windows, labels = store.gather(starts, seq_len)
+    return starts - session['offset'], windows, labels
+
+
+def training_sample(store, embed_fn, seq_len, stride=DEFAULT_STRIDE, total=TRAIN_SAMPLE, random_state=0):
+    """Embeddings of up to ``total`` windows drawn evenly from every session, for the k-means centroids.
+
+    Returns (sample, number of windows the store will index), so the lists are
+    sized for the whole index and reflect every participant, not the first session.
+    """
+    rng = np.random.default_rng(random_state)
+    per_session = [store.window_starts(seq_len, [s['name']])[::stride] for s in store.sessions]
+    quota = max(1, total // max(len(per_session), 1))
+    picked = [np.sort(rng.choice(starts, min(quota, len(starts)), replace=False)) for starts in per_session if len(starts)]
+    if not picked:
+        raise ValueError(f"No session in the store is longer than {seq_len} rows")
+    windows, _ = store.gather(np.concatenate(picked), seq_len)
+    return embed_fn(windows), sum(len(starts) for starts in per_session)
+
+
+def index_store(index, store, embed_fn, seq_len, stride=DEFAULT_STRIDE, batch=20_000):
+    """Add every session of ``store`` not yet in the index."""
+    for session in store.sessions:
+        if session['name'] in index.session_names:
+            continue
+        starts = store.window_starts(seq_len, [session['name']])[::stride]
+        for i in range(0, len(starts), batch):
+            windows, labels = store.gather(starts[i:i + batch], seq_len)
+            index.add(embed_fn(windows), labels, session['name'], starts[i:i + batch] - session['offset'])
+        print(f"  {session['name']}: {len(starts)} windows")
+
+
+def make_embedder(model_path, seq_len):
+    if model_path:
+        return model_embedder(model_path)
+    return engineered_features, seq_len
+
+
+if __name__ == '__main__':
+    from session_store import SessionStore
+    p = argparse.ArgumentParser()
+    sub = p.add_subparsers(dest='command', required=True)
+    b = sub.add_parser('build', help='Create an index from a session store')
+    b.add_argument('--output', required=True, help='Index directory')
+    a = sub.add_parser('add', help='Append sessions of a store that are not indexed yet')
+    a.add_argument('--index', required=True, help='Index directory')
+    for s in (b, a):
+        s.add_argument('--store', required=True, help='Session store directory')
+        s.add_argument('--model', default=None, help='Keras model for embeddings (engineered features if omitted)')
+        s.add_argument('--seq-len', type=int, default=50, help='Window length for engineered features')
+        s.add_argument('--stride', type=int, default=DEFAULT_STRIDE, help='Index every n-th window')
+    b.add_argument('--nlist', type=int, default=None, help='Number of IVF lists (default ~4*sqrt(n))')
+    q = sub.add_parser('query', help='Nearest reference windows to one window of a session')
+    q.add_argument('--index', required=True, help='Index directory')
+    q.add_argument('--store', required=True, help='Store holding the query session')
+    q.add_argument('--session', required=True, help='Session name')
+    q.add_argument('--start', type=int, required=True, help='Window start row within the session')
+    q.add_argument('--label', type=float, default=None, help='Only return windows of this Position')
+    q.add_argument('--k', type=int, default=5, help='Neighbours to return')
+    q.add_argument('--nprobe', type=int, default=8, help='Lists scanned per query')
+    bn = sub.add_parser('bench', help='Query latency with random indexed windows as queries')
+    bn.add_argument('--index', required=True, help='Index directory')
+    bn.add_argument('--queries', type=int, default=200, help='Number of queries')
+    bn.add_argument('--nprobe', type=int, default=8, help='Lists scanned per query')
+    args = p.parse_args()
+
+    if args.command in ('build', 'add'):
+        store = SessionStore(args.store)
+        embed_fn, seq_len = make_embedder(args.model, args.seq_len)
+        if args.command == 'build':
+            sample, expected = training_sample(store, embed_fn, seq_len, args.stride)
+            index = WindowIndex.create(args.output, sample, args.nlist, expected, seq_len=seq_len, stride=args.stride,
+                                       embedding='model' if args.model else 'engineered', model=args.model)
+        else:
+            index = WindowIndex(args.index)
+        index_store(index, store, embed_fn, index.meta['seq_len'], args.stride)
+        print(f"Index has {len(index)} windows from {len(index.session_names)} sessions")
+    elif args.command == 'query':
+        index = WindowIndex(args.index)
+        store = SessionStore(args.store)
+        embed_fn, seq_len = make_embedder(index.meta.get('model'), index.meta['seq_len'])
+        offset = next(s['offset'] for s in store.sessions if s['name'] == args.session)
+        window, _ = store.gather([offset + args.start], seq_len)
+        label = None if args.label is None else int(store.preprocessor.encode_labels([args.label])[0])
+        scores, ids = index.search(embed_fn(window), args.k, args.nprobe, label, exclude_session=args.session)
+        for score, hit in zip(scores[0], index.describe(ids[0])):
+            print(f"  {hit['session']} rows {hit['start']}-{hit['start'] + seq_len}: "
+                  f"Position {store.preprocessor.decode_labels(hit['label'])} (similarity {score:.3f})")
+    else:
+        index = WindowIndex(args.index)
+        rng = np.random.default_rng(0)
+        queries = index.arrays['vectors'][rng.choice(len(index), args.queries)]
+        index.search(queries[:5], nprobe=args.nprobe)
+        t0 = time.perf_counter()
+        for qv in queries:
+            index.search(qv, nprobe=args.nprobe)
+        ms = (time.perf_counter() - t0) * 1000 / len(queries)
+        _, exact = index.search(queries, nprobe=len(index.centroids))
+        _, approx = index.search(queries, nprobe=args.nprobe)
+        recall = np.mean([len(set(e) & set(a)) / len(e) for e, a in zip(exact, approx)])
+        print(f"{len(index)} windows, {len(index.centroids)} lists: {ms:.2f} ms/query, recall@5 {recall:.3f}")
+    print('Done!')
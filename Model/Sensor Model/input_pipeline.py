@@ -0,0 +1,66 @@
+"""
+tf.data input pipeline that windows straight from the scaled 2D feature array.
+
+The (rows x features) array and its labels are placed in TensorFlow once;
+datasets only carry window start indices. Each batch is shuffled by index and
+gathered in a parallel map (window i covers rows [start, start + seq_len) and is
+labelled with the row at start + seq_len, matching ``make_windows``), then
+prefetched so the next batch is assembled while the current one trains.
+Train/validation splits and cross-validation folds are just different index
+arrays over the same tensors, so no fold copies the dataset.
+
+Usage (from a training script):
+  windows = WindowedInput(X_scaled, y)
+  train_idx, test_idx = train_test_split(windows.starts(50), test_size=0.2, random_state=42)
+  model.fit(windows.dataset(train_idx, 50), validation_data=windows.dataset(test_idx, 50, shuffle=False))
+"""
+import numpy as np
+
+
+class WindowedInput:
+    """Shared feature/label tensors plus index-based window datasets over them."""
+
+    def __init__(self, X, y):
+        import tensorflow as tf
+        self.num_rows, self.num_features = X.shape
+        self.features = tf.constant(np.asarray(X, dtype=np.float32))
+        self.labels = tf.constant(np.asarray(y, dtype=np.int32))
+
+    def starts(self, seq_len):
+        """Start index of every complete window (same windows as ``make_windows``)."""
+        n = self.num_rows - seq_len
+        if n <= 0:
+            raise ValueError(f"Need more than {seq_len} rows to build windows, got {self.num_rows}")
+        return np.arange(n, dtype=np.int64)
+
+    def labels_at(self, starts, seq_len):
+        """Labels of the given windows as a NumPy array (for scoring predictions)."""
+        return self.labels.numpy()[np.asarray(starts) + seq_len]
+
+    def dataset(self, starts, seq_len, batch_size=64, shuffle=True, num_classes=None, cache=False,
+                random_state=42):
+        """Batched ``tf.data.Dataset`` of (windows, labels) for the given window starts.
+
+        ``num_classes`` one-hot encodes the labels (for categorical_crossentropy).
+        ``cache`` keeps the assembled batches after the first pass; it is only
+        applied to unshuffled datasets (evaluation), since caching shuffled
+        batches would freeze their order.
+        """
+        import tensorflow as tf
+        features, labels = self.features, self.labels
+        offsets = tf.range(seq_len, dtype=tf.int64)
+
+        def gather(batch_starts):
+            X = tf.gather(features, batch_starts[:, None] + offsets)
+            y = tf.gather(labels, batch_starts + seq_len)
+            if num_classes:
+                y = tf.one_hot(y, num_classes)
+            return X, y
+
+        ds = tf.data.Dataset.from_tensor_slices(np.asarray(starts, dtype=np.int64))
+        if shuffle:
+            ds = ds.shuffle(len(starts), seed=random_state, reshuffle_each_iteration=True)
+        ds = ds.batch(batch_size).map(gather, num_parallel_calls=tf.data.AUTOTUNE)
+        if cache and not shuffle:
+            ds = ds.cache()
+        return ds.prefetch(tf.data.AUTOTUNE)
@@ -7,75 +7,24 @@ Original file is located at
     https://colab.research.google.com/drive/1fGJ2_cVPsWGpI-3C_6fOhdqB-_hJURtQ
 """
 
+import argparse
 import numpy as np
 import pandas as pd
-import tensorflow as tf
-from tensorflow.keras.models import Sequential
-from scikeras.wrappers import KerasClassifier
-from tensorflow.keras.layers import Input, LSTM, Dense, Dropout
-from sklearn.model_selection import train_test_split, GridSearchCV
-from sklearn.preprocessing import StandardScaler, LabelEncoder
-
-data1 = pd.read_csv('/content/sensor_data_nRF_IMU_1_19092025_164551_not_labelled.csv')
-data2 = pd.read_csv('/content/sensor_data_nRF_IMU_2_19092025_164551_labelled.csv')
-
-data1.head()
-
-data2.head()
-
-data2 = data2.drop('Unnamed: 11', axis=1)
-data2.head()
-
-data2.dropna(inplace=True)
-data2.head()
-
-data = pd.merge(data1, data2, on=['TimeStamp'])
-data.head()
-
-data.to_csv('19092025_labelled.csv', index=False)
-
-data.info()
-
-X = data.drop(['Position','TimeStamp'], axis=1).values
-y = data['Position'].values
-
-label_encoder = LabelEncoder()
-y = label_encoder.fit_transform(y)
-
-y
-
-scaler = StandardScaler()
-X_scaled = scaler.fit_transform(X)
-
-def create_sequences(X, y, seq_len):
-    Xs, ys = [], []
-    for i in range(len(X) - seq_len):
-        Xs.append(X[i:(i + seq_len)])
-        ys.append(y[i + seq_len])
-    return np.array(Xs), np.array(ys)
-
-def create_lstm_model(
-    sequence_length=50,
-    num_layers=2,
-    lstm_units_1=128,
-    lstm_units_2=64,
-    dropout_rate=0.3,
-    dense_units=64,
-    activation='relu',
-    optimizer='adam',
-    loss='sparse_categorical_crossentropy'
-):
-    model = Sequential()
-    model.add(Input(shape=(sequence_length, X.shape[1])))
-    model.add(LSTM(lstm_units_1, return_sequences=(num_layers > 1)))
-    model.add(Dropout(dropout_rate))
-    if num_layers > 1:
-        model.add(LSTM(lstm_units_2))
-        model.add(Dropout(dropout_rate))
-    model.add(Dense(dense_units, activation=activation))
-    model.add(Dense(len(np.unique(y)), activation='softmax'))
-    model.compile(optimizer=optimizer, loss=loss, metrics=['accuracy'])
-    return model
+from input_pipeline import WindowedInput
+from models import create_lstm_model
+from preprocessing import load_or_fit
+
+SOURCES = ['/content/sensor_data_nRF_IMU_1_19092025_164551_not_labelled.csv',
+           '/content/sensor_data_nRF_IMU_2_19092025_164551_labelled.csv']
+
+def load_labelled_session(sources):
+    data1 = pd.read_csv(sources[0])
+    data2 = pd.read_csv(sources[1])
+    data2 = data2.drop('Unnamed: 11', axis=1)
+    data2.dropna(inplace=True)
+    data = pd.merge(data1, data2, on=['TimeStamp'])
+    data.to_csv('19092025_labelled.csv', index=False)
+    return data
 
 param_grid = {
     'model__sequence_length': [40, 50, 60],
@@ -91,31 +40,105 @@ param_grid = {
     'epochs': [15, 30]
 }
 
-def build_sequences_for_grid(sequence_length):
-    X_seq, y_seq = create_sequences(X, y, sequence_length)
-    return train_test_split(X_seq, y_seq, test_size=0.2, random_state=42)
-
-best_score = 0
-best_params = None
-
-for sequence_length in param_grid['model__sequence_length']:
-    X_seq, y_seq = create_sequences(X, y, sequence_length)
-    X_train, X_test, y_train, y_test = train_test_split(X_seq, y_seq, test_size=0.2, random_state=42)
-    grid = GridSearchCV(
-        KerasClassifier(model=create_lstm_model, verbose=1),
-        param_grid,
-        scoring='accuracy',
-        cv=3,
-        n_jobs=1
-    )
-    grid_result = grid.fit(X_train, y_train)
-    print(f"Best score for sequence_length={sequence_length}: {grid_result.best_score_}")
-    print(f"Best params: {grid_result.best_params_}")
-    if grid_result.best_score_ > best_score:
-        best_score = grid_result.best_score_
-        best_params = grid_result.best_params_
-
-print(f"Overall Best score: {best_score}")
-print(f"Overall Best Parameters: {best_params}")
-
-print("Thank You")
\ No newline at end of file
+ARCHITECTURE_PARAMS = ['sequence_length', 'num_layers', 'lstm_units_1', 'lstm_units_2',
+                       'dropout_rate', 'dense_units', 'activation']
+
+def canonical_params(params):
+    """Collapse grid points that train the same model."""
+    params = dict(params)
+    if params['model__num_layers'] == 1:
+        # lstm_units_2 is ignored by a single-layer model
+        params['model__lstm_units_2'] = None
+    # Both losses give the same objective and gradients (categorical just takes one-hot labels)
+    params['model__loss'] = 'sparse_categorical_crossentropy'
+    return params
+
+def unique_trials(grid):
+    """Deduplicated trials as (params without epochs, sorted epoch budgets)."""
+    from sklearn.model_selection import ParameterGrid
+    trials = {}
+    for params in ParameterGrid(grid):
+        params = canonical_params(params)
+        epochs = params.pop('epochs')
+        trials.setdefault(tuple(sorted(params.items(), key=lambda kv: kv[0])), set()).add(epochs)
+    return [(dict(key), sorted(epochs)) for key, epochs in trials.items()]
+
+# One built model per architecture; trials reset it to the same initial weights and recompile
+# with their optimizer instead of rebuilding the graph.
+model_cache = {}
+
+def get_model(model_params, preprocessor):
+    arch = tuple(model_params[k] for k in ARCHITECTURE_PARAMS)
+    if arch not in model_cache:
+        model = create_lstm_model(num_features=preprocessor.num_features, num_classes=preprocessor.num_classes,
+                                  **{k: model_params[k] for k in ARCHITECTURE_PARAMS})
+        model_cache[arch] = (model, model.get_weights())
+    model, initial_weights = model_cache[arch]
+    model.set_weights(initial_weights)
+    model.compile(optimizer=model_params['optimizer'], loss=model_params['loss'], metrics=['accuracy'])
+    return model
+
+def cross_val_scores(params, epoch_budgets, windows, train_idx, preprocessor, cv=3):
+    """Mean fold accuracy for every epoch budget.
+
+    Each fold trains once up to the largest budget, continuing from the previous
+    checkpoint (e.g. 15 -> 30 epochs) and scoring at every budget on the way.
+    """
+    from sklearn.model_selection import StratifiedKFold
+    model_params = {k[len('model__'):]: v for k, v in params.items() if k.startswith('model__')}
+    seq_len = model_params['sequence_length']
+    folds = StratifiedKFold(n_splits=cv).split(train_idx, windows.labels_at(train_idx, seq_len))
+    scores = {epochs: [] for epochs in epoch_budgets}
+    for fit_idx, val_idx in folds:
+        model = get_model(model_params, preprocessor)
+        train_ds = windows.dataset(train_idx[fit_idx], seq_len, params['batch_size'])
+        val_ds = windows.dataset(train_idx[val_idx], seq_len, 1024, shuffle=False, cache=True)
+        val_labels = windows.labels_at(train_idx[val_idx], seq_len)
+        done = 0
+        for epochs in epoch_budgets:
+            model.fit(train_ds, initial_epoch=done, epochs=epochs, verbose=1)
+            done = epochs
+            probs = model.predict(val_ds, verbose=0)
+            scores[epochs].append(np.mean(probs.argmax(axis=1) == val_labels))
+    return {epochs: float(np.mean(s)) for epochs, s in scores.items()}
+
+def grid_search(sources=SOURCES, param_grid=param_grid):
+    from sklearn.model_selection import train_test_split, ParameterGrid
+    preprocessor, X, y = load_or_fit(sources, load_labelled_session)
+
+    # Every fold is an index subset over these shared tensors; windows are gathered per batch
+    windows = WindowedInput(X, y)
+
+    best_score = 0
+    best_params = None
+
+    grid = {k: v for k, v in param_grid.items() if k != 'model__sequence_length'}
+    trials = unique_trials(grid)
+    print(f"{len(ParameterGrid(grid))} grid points -> {len(trials)} distinct trials per sequence length")
+    for sequence_length in param_grid['model__sequence_length']:
+        train_idx, test_idx = train_test_split(windows.starts(sequence_length), test_size=0.2, random_state=42)
+        model_cache.clear()
+        seq_best_score, seq_best_params = 0, None
+        for params, epoch_budgets in trials:
+            params = dict(params, model__sequence_length=sequence_length)
+            for epochs, score in cross_val_scores(params, epoch_budgets, windows, train_idx, preprocessor).items():
+                if score > seq_best_score:
+                    seq_best_score, seq_best_params = score, dict(params, epochs=epochs)
+        print(f"Best score for sequence_length={sequence_length}: {seq_best_score}")
+        print(f"Best params: {seq_best_params}")
+        if seq_best_score > best_score:
+            best_score = seq_best_score
+            best_params = seq_best_params
+
+    print(f"Overall Best score: {best_score}")
+    print(f"Overall Best Parameters: {best_params}")
+    return best_score, best_params
+
+if __name__ == '__main__':
+    p = argparse.ArgumentParser()
+    p.add_argument('--inputs', nargs=2, default=SOURCES, metavar=('NOT_LABELLED', 'LABELLED'),
+                   help='Device 1 (not labelled) and device 2 (labelled) CSVs of the session')
+    args = p.parse_args()
+
+    grid_search(args.inputs)
+    print("Thank You")
\ No newline at end of file
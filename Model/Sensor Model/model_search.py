@@ -0,0 +1,209 @@
+"""
+Latency-aware architecture search with knowledge distillation.
+
+Trains a create_lstm_model teacher (or loads an existing one), then distills it
+into a set of compact students (GRU, 1D-CNN, TCN, tiny LSTM). Students are fit
+on soft targets: ``alpha * one_hot(y) + (1 - alpha) * softmax(teacher_logits / T)``.
+
+Every candidate, including the teacher, is scored on the held-out windows for
+accuracy, parameter count and measured single-window latency (median of batch-1
+calls on this CPU, so run it on hardware similar to the deployment target).
+The results are written to a CSV with the Pareto-optimal candidates flagged
+(no other candidate is at least as accurate, as fast and as small, and strictly
+better in one of them). With --latency-sla the most accurate model on the front
+within the budget is reported.
+
+Usage:
+  python model_search.py --store store/ --output artifacts/search
+  python model_search.py --inputs data/*_labelled.csv --teacher artifacts/basic_lstm.keras --latency-sla 5
+"""
+import argparse
+import json
+import os
+import time
+import numpy as np
+import pandas as pd
+from preprocessing import LABEL_COLUMN, load_or_fit, make_windows
+from session_store import SessionStore, split_window_starts
+
+DEFAULT_OUTPUT_DIR = os.path.join('artifacts', 'search')
+SEQUENCE_LENGTH = 50
+
+TEACHER_PARAMS = {'num_layers': 2, 'lstm_units_1': 128, 'lstm_units_2': 64, 'dropout_rate': 0.3, 'dense_units': 64}
+
+# (name, builder in models.MODEL_BUILDERS, builder kwargs)
+STUDENTS = [
+    ('tiny_lstm_8', 'tiny_lstm', {'units': 8}),
+    ('tiny_lstm_16', 'tiny_lstm', {'units': 16}),
+    ('gru_16', 'gru', {'units': 16, 'dense_units': 16}),
+    ('gru_32', 'gru', {'units': 32, 'dense_units': 32}),
+    ('cnn_16', 'cnn', {'filters': 16, 'dense_units': 16}),
+    ('cnn_32', 'cnn', {'filters': 32, 'dense_units': 32}),
+    ('tcn_16', 'tcn', {'filters': 16}),
+    ('tcn_24', 'tcn', {'filters': 24}),
+]
+
+
+def load_windows(store_path=None, inputs=None, seq_len=SEQUENCE_LENGTH, test_size=0.2, random_state=42,
+                 artifact_path=None):
+    """Return (preprocessor, X_train, X_test, y_train, y_test) windows from a store or labelled CSVs.
+
+    For CSVs the fitted preprocessing is written to ``artifact_path`` when given; a store
+    already carries its own.
+    """
+    if store_path:
+        store = SessionStore(store_path)
+        train_starts, test_starts = split_window_starts(store.window_starts(seq_len), test_size, random_state)
+        X_train, y_train = store.gather(train_starts, seq_len)
+        X_test, y_test = store.gather(test_starts, seq_len)
+        return store.preprocessor, X_train, X_test, y_train, y_test
+
+    from sklearn.model_selection import train_test_split
+
+    def read_all(paths):
+        data = pd.concat([pd.read_csv(f) for f in paths], ignore_index=True)
+        return data.dropna(subset=[LABEL_COLUMN])
+
+    preprocessor, X, y = load_or_fit(inputs, read_all, artifact_path)
+    X_seq, y_seq = make_windows(X, y, seq_len)
+    X_train, X_test, y_train, y_test = train_test_split(X_seq, y_seq, test_size=test_size,
+                                                        random_state=random_state)
+    return preprocessor, X_train, X_test, y_train, y_test
+
+
+def soft_targets(teacher_probs, y, num_classes, temperature=4.0, alpha=0.3):
+    """Blend hard labels with the teacher's temperature-softened distribution.
+
+    The teacher ends in a softmax, so dividing its logits by T is the same as
+    raising the probabilities to 1/T and renormalising.
+    """
+    logp = np.log(np.clip(teacher_probs, 1e-8, 1.0)) / temperature
+    logp -= logp.max(axis=1, keepdims=True)
+    soft = np.exp(logp)
+    soft /= soft.sum(axis=1, keepdims=True)
+    hard = np.eye(num_classes, dtype=np.float32)[y]
+    return (alpha * hard + (1.0 - alpha) * soft).astype(np.float32)
+
+
+def fit(model, X, targets, epochs, batch_size):
+    from tensorflow.keras.callbacks import EarlyStopping
+    model.fit(X, targets, epochs=epochs, batch_size=batch_size, validation_split=0.1, verbose=0,
+              callbacks=[EarlyStopping(patience=3, restore_best_weights=True)])
+    return model
+
+
+def measure_latency(model, seq_len, num_features, repeats=200, warmup=20):
+    """Median wall time (ms) of one batch-1 inference, as on a streaming device."""
+    x = np.random.default_rng(0).standard_normal((1, seq_len, num_features)).astype(np.float32)
+    for _ in range(warmup):
+        model.predict_on_batch(x)
+    times = np.empty(repeats)
+    for i in range(repeats):
+        t0 = time.perf_counter()
+        model.predict_on_batch(x)
+        times[i] = time.perf_counter() - t0
+    return float(np.median(times) * 1000.0)
+
+
+def evaluate(name, model, X_test, y_test, seq_len, num_features):
+    probs = model.predict(X_test, batch_size=1024, verbose=0)
+    return {
+        'name': name,
+        'accuracy': float((probs.argmax(axis=1) == y_test).mean()),
+        'latency_ms': measure_latency(model, seq_len, num_features),
+        'params': int(model.count_params()),
+    }
+
+
+def pareto_front(results):
+    """Flag candidates not dominated on (max accuracy, min latency, min params)."""
+    for r in results:
+        r['pareto'] = not any(
+            o is not r
+            and o['accuracy'] >= r['accuracy'] and o['latency_ms'] <= r['latency_ms'] and o['params'] <= r['params']
+            and (o['accuracy'] > r['accuracy'] or o['latency_ms'] < r['latency_ms'] or o['params'] < r['params'])
+            for o in results)
+    return [r for r in results if r['pareto']]
+
+
+def pick_for_sla(front, latency_sla):
+    """Most accurate front member within the latency budget (None if nothing fits)."""
+    fitting = [r for r in front if r['latency_ms'] <= latency_sla]
+    return max(fitting, key=lambda r: r['accuracy']) if fitting else None
+
+
+def run(store_path=None, inputs=None, output_dir=DEFAULT_OUTPUT_DIR, teacher_path=None, teacher_params=None,
+        seq_len=SEQUENCE_LENGTH, epochs=30, batch_size=64, temperature=4.0, alpha=0.3, students=STUDENTS):
+    import tensorflow as tf
+    from models import MODEL_BUILDERS, create_lstm_model
+
+    os.makedirs(output_dir, exist_ok=True)
+    # Next to the searched models, never over the deployed artifacts/preprocessing.json
+    preprocessor, X_train, X_test, y_train, y_test = load_windows(
+        store_path, inputs, seq_len, artifact_path=os.path.join(output_dir, 'preprocessing.json'))
+    num_features, num_classes = preprocessor.num_features, preprocessor.num_classes
+    print(f"{len(X_train)} training / {len(X_test)} test windows, {num_features} features, {num_classes} classes")
+
+    if teacher_path:
+        teacher = tf.keras.models.load_model(teacher_path)
+        print(f"Loaded teacher {teacher_path}")
+    else:
+        params = dict(TEACHER_PARAMS, **(teacher_params or {}))
+        teacher = create_lstm_model(sequence_length=seq_len, num_features=num_features,
+                                    num_classes=num_classes, **params)
+        fit(teacher, X_train, y_train, epochs, batch_size)
+        teacher.save(os.path.join(output_dir, 'teacher.keras'))
+    results = [evaluate('teacher', teacher, X_test, y_test, seq_len, num_features)]
+    print(f"  teacher: acc={results[0]['accuracy']:.3f} latency={results[0]['latency_ms']:.2f}ms "
+          f"params={results[0]['params']:,}")
+
+    targets = soft_targets(teacher.predict(X_train, batch_size=1024, verbose=0), y_train, num_classes,
+                           temperature, alpha)
+    for name, builder, kwargs in students:
+        model = MODEL_BUILDERS[builder](sequence_length=seq_len, num_features=num_features,
+                                        num_classes=num_classes, loss='categorical_crossentropy', **kwargs)
+        fit(model, X_train, targets, epochs, batch_size)
+        model.save(os.path.join(output_dir, f'{name}.keras'))
+        r = evaluate(name, model, X_test, y_test, seq_len, num_features)
+        results.append(r)
+        print(f"  {name}: acc={r['accuracy']:.3f} latency={r['latency_ms']:.2f}ms params={r['params']:,}")
+
+    front = pareto_front(results)
+    table = pd.DataFrame(results).sort_values('latency_ms')
+    table.to_csv(os.path.join(output_dir, 'search_results.csv'), index=False)
+    return table, front
+
+
+if __name__ == '__main__':
+    p = argparse.ArgumentParser()
+    src = p.add_mutually_exclusive_group(required=True)
+    src.add_argument('--store', help='Session store directory (session_store.py)')
+    src.add_argument('--inputs', nargs='+', help='Merged, labelled sensor CSVs')
+    p.add_argument('--output', default=DEFAULT_OUTPUT_DIR, help='Directory for models and search_results.csv')
+    p.add_argument('--teacher', help='Existing teacher model (.keras) instead of training one')
+    p.add_argument('--teacher-params', help='JSON of create_lstm_model params, e.g. the grid search best_params')
+    p.add_argument('--sequence-length', type=int, default=SEQUENCE_LENGTH, help='Window length')
+    p.add_argument('--epochs', type=int, default=30, help='Max epochs per model (early stopping on 10%% validation)')
+    p.add_argument('--batch-size', type=int, default=64, help='Training batch size')
+    p.add_argument('--temperature', type=float, default=4.0, help='Distillation temperature')
+    p.add_argument('--alpha', type=float, default=0.3, help='Weight of the hard labels in the student targets')
+    p.add_argument('--latency-sla', type=float, default=None, help='Latency budget per window in ms')
+    args = p.parse_args()
+
+    teacher_params = None
+    if args.teacher_params:
+        teacher_params = {k.replace('model__', ''): v for k, v in json.loads(args.teacher_params).items()
+                          if k.replace('model__', '') in TEACHER_PARAMS}
+    table, front = run(args.store, args.inputs, args.output, args.teacher, teacher_params, args.sequence_length,
+                       args.epochs, args.batch_size, args.temperature, args.alpha)
+    print(table.to_string(index=False))
+    print(f"Pareto front: {', '.join(r['name'] for r in sorted(front, key=lambda r: r['latency_ms']))}")
+    if args.latency_sla is not None:
+        choice = pick_for_sla(front, args.latency_sla)
+        if choice is None:
+            print(f"No candidate meets the {args.latency_sla}ms latency SLA")
+        else:
+            print(f"Within {args.latency_sla}ms: {choice['name']} (acc={choice['accuracy']:.3f}, "
+                  f"{choice['latency_ms']:.2f}ms, {choice['params']:,} params) -> "
+                  f"{os.path.join(args.output, choice['name'] + '.keras')}")
+    print('Done!')
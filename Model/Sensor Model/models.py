@@ -0,0 +1,111 @@
+"""
+Keras model builders for the sensor pose classifiers.
+
+create_lstm_model is the architecture searched in lstm+gridsearchcv.py; the other
+builders are compact alternatives (GRU, 1D-CNN, TCN, tiny LSTM) used as
+students by model_search.py. All take the window shape and class count
+explicitly and return a compiled model with a softmax output. TensorFlow is
+imported by the builders, so importing this module stays cheap.
+"""
+
+
+def create_lstm_model(
+    sequence_length=50,
+    num_layers=2,
+    lstm_units_1=128,
+    lstm_units_2=64,
+    dropout_rate=0.3,
+    dense_units=64,
+    activation='relu',
+    optimizer='adam',
+    loss='sparse_categorical_crossentropy',
+    num_features=None,
+    num_classes=None,
+):
+    from tensorflow.keras.models import Sequential
+    from tensorflow.keras.layers import Input, LSTM, Dense, Dropout
+    model = Sequential()
+    model.add(Input(shape=(sequence_length, num_features)))
+    model.add(LSTM(lstm_units_1, return_sequences=(num_layers > 1)))
+    model.add(Dropout(dropout_rate))
+    if num_layers > 1:
+        model.add(LSTM(lstm_units_2))
+        model.add(Dropout(dropout_rate))
+    model.add(Dense(dense_units, activation=activation))
+    model.add(Dense(num_classes, activation='softmax'))
+    model.compile(optimizer=optimizer, loss=loss, metrics=['accuracy'])
+    return model
+
+
+def create_tiny_lstm_model(sequence_length=50, units=16, num_features=None, num_classes=None,
+                           optimizer='adam', loss='sparse_categorical_crossentropy'):
+    from tensorflow.keras.models import Sequential
+    from tensorflow.keras.layers import Input, LSTM, Dense
+    model = Sequential([
+        Input(shape=(sequence_length, num_features)),
+        LSTM(units),
+        Dense(num_classes, activation='softmax'),
+    ])
+    model.compile(optimizer=optimizer, loss=loss, metrics=['accuracy'])
+    return model
+
+
+def create_gru_model(sequence_length=50, units=32, dense_units=32, dropout_rate=0.2, num_features=None,
+                     num_classes=None, optimizer='adam', loss='sparse_categorical_crossentropy'):
+    from tensorflow.keras.models import Sequential
+    from tensorflow.keras.layers import Input, GRU, Dense, Dropout
+    model = Sequential([
+        Input(shape=(sequence_length, num_features)),
+        GRU(units),
+        Dropout(dropout_rate),
+        Dense(dense_units, activation='relu'),
+        Dense(num_classes, activation='softmax'),
+    ])
+    model.compile(optimizer=optimizer, loss=loss, metrics=['accuracy'])
+    return model
+
+
+def create_cnn_model(sequence_length=50, filters=32, kernel_size=5, dense_units=32, dropout_rate=0.2,
+                     num_features=None, num_classes=None, optimizer='adam', loss='sparse_categorical_crossentropy'):
+    from tensorflow.keras.models import Sequential
+    from tensorflow.keras.layers import Input, Conv1D, MaxPooling1D, GlobalAveragePooling1D, Dense, Dropout
+    model = Sequential([
+        Input(shape=(sequence_length, num_features)),
+        Conv1D(filters, kernel_size, padding='same', activation='relu'),
+        MaxPooling1D(2),
+        Conv1D(filters, kernel_size, padding='same', activation='relu'),
+        GlobalAveragePooling1D(),
+        Dropout(dropout_rate),
+        Dense(dense_units, activation='relu'),
+        Dense(num_classes, activation='softmax'),
+    ])
+    model.compile(optimizer=optimizer, loss=loss, metrics=['accuracy'])
+    return model
+
+
+def create_tcn_model(sequence_length=50, filters=24, kernel_size=3, dilations=(1, 2, 4, 8), dropout_rate=0.1,
+                     num_features=None, num_classes=None, optimizer='adam', loss='sparse_categorical_crossentropy'):
+    """Residual stack of dilated causal convolutions (receptive field covers the window)."""
+    import tensorflow as tf
+    from tensorflow.keras.layers import Input, Conv1D, Dropout, Add, Activation, GlobalAveragePooling1D, Dense
+    inputs = Input(shape=(sequence_length, num_features))
+    x = Conv1D(filters, 1)(inputs)
+    for d in dilations:
+        h = Conv1D(filters, kernel_size, padding='causal', dilation_rate=d, activation='relu')(x)
+        h = Dropout(dropout_rate)(h)
+        h = Conv1D(filters, kernel_size, padding='causal', dilation_rate=d)(h)
+        x = Activation('relu')(Add()([x, h]))
+    x = GlobalAveragePooling1D()(x)
+    outputs = Dense(num_classes, activation='softmax')(x)
+    model = tf.keras.Model(inputs, outputs)
+    model.compile(optimizer=optimizer, loss=loss, metrics=['accuracy'])
+    return model
+
+
+MODEL_BUILDERS = {
+    'lstm': create_lstm_model,
+    'tiny_lstm': create_tiny_lstm_model,
+    'gru': create_gru_model,
+    'cnn': create_cnn_model,
+    'tcn': create_tcn_model,
+}
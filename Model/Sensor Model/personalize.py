@@ -0,0 +1,205 @@
+"""
+Per-participant fine-tuning of the dense head on top of a frozen LSTM backbone.
+
+The model trained by basic_lstm.py is split after its last recurrent layer:
+the LSTM stack (the shared backbone) stays frozen and only the Dense head is
+refit for a new participant. The backbone embeddings of the participant's
+windows are computed once and cached, so fitting the head only touches a
+(windows x embedding) matrix and takes seconds on a CPU. The head is warm-started
+from the shared head weights.
+
+Each user gets a small .npz file of head weights (a few KB) next to the one
+shared backbone; predictions run the backbone in Keras and the head in NumPy.
+
+The participant's labelled session CSVs are scaled with the training artifact
+(artifacts/preprocessing.json); the last --holdout share of every session's
+windows is kept aside to report shared vs personalized accuracy.
+
+Usage:
+  python personalize.py fit --user p07 --inputs data/labelled/p07_*_labelled.csv
+  python personalize.py evaluate --user p07 --inputs data/labelled/p07_23092025_120831_labelled.csv
+"""
+import argparse
+import os
+import time
+import numpy as np
+from preprocessing import DEFAULT_ARTIFACT_PATH, LABEL_COLUMN, SensorPreprocessor, cache_key, file_digest, make_windows
+from session_store import read_session
+
+DEFAULT_MODEL_PATH = os.path.join('artifacts', 'basic_lstm.keras')
+DEFAULT_HEADS_DIR = os.path.join('artifacts', 'heads')
+DEFAULT_EMBEDDING_CACHE = os.path.join('artifacts', 'embedding_cache')
+RECURRENT_LAYERS = ('LSTM', 'GRU')
+
+
+def split_model(model):
+    """Return (backbone, head_layers): backbone ends at the last recurrent layer."""
+    import tensorflow as tf
+    last = max(i for i, layer in enumerate(model.layers) if type(layer).__name__ in RECURRENT_LAYERS)
+    backbone = tf.keras.Model(model.inputs, model.layers[last].output)
+    backbone.trainable = False
+    head = [layer for layer in model.layers[last + 1:] if type(layer).__name__ == 'Dense']
+    return backbone, head
+
+
+class DenseHead:
+    """Dense layers as NumPy arrays (ReLU/tanh hidden layers, softmax output)."""
+
+    def __init__(self, weights, biases, activations, classes):
+        self.weights = [np.asarray(w, dtype=np.float32) for w in weights]
+        self.biases = [np.asarray(b, dtype=np.float32) for b in biases]
+        self.activations = list(activations)
+        self.classes = np.asarray(classes)
+
+    @classmethod
+    def from_layers(cls, layers, classes):
+        weights, biases = zip(*(layer.get_weights() for layer in layers))
+        return cls(weights, biases, [layer.get_config()['activation'] for layer in layers], classes)
+
+    def predict_proba(self, E):
+        h = np.asarray(E, dtype=np.float32)
+        for w, b, act in zip(self.weights, self.biases, self.activations):
+            h = h @ w + b
+            if act == 'relu':
+                np.maximum(h, 0.0, out=h)
+            elif act == 'tanh':
+                np.tanh(h, out=h)
+            elif act == 'softmax':
+                h -= h.max(axis=1, keepdims=True)
+                np.exp(h, out=h)
+                h /= h.sum(axis=1, keepdims=True)
+        return h
+
+    def predict(self, E):
+        """Predicted class indices."""
+        return self.predict_proba(E).argmax(axis=1)
+
+    def to_keras(self):
+        import tensorflow as tf
+        inputs = tf.keras.Input(shape=(self.weights[0].shape[0],))
+        x = inputs
+        for w, b, act in zip(self.weights, self.biases, self.activations):
+            layer = tf.keras.layers.Dense(w.shape[1], activation=act)
+            x = layer(x)
+            layer.set_weights([w, b])
+        return tf.keras.Model(inputs, x)
+
+    def save(self, path):
+        arrays = {'classes': self.classes, 'activations': np.array(self.activations),
+                  'layers': np.array(len(self.weights))}
+        for i, (w, b) in enumerate(zip(self.weights, self.biases)):
+            arrays[f'w{i}'] = w
+            arrays[f'b{i}'] = b
+        np.savez(path, **arrays)
+        return path
+
+    @classmethod
+    def load(cls, path):
+        z = np.load(path)
+        n = int(z['layers'])
+        return cls([z[f'w{i}'] for i in range(n)], [z[f'b{i}'] for i in range(n)],
+                   z['activations'].tolist(), z['classes'])
+
+
+def participant_windows(paths, preprocessor, seq_len, holdout=0.2):
+    """Windows per session (never across sessions), split in time into fit/holdout parts."""
+    fit_X, fit_y, hold_X, hold_y = [], [], [], []
+    for path in paths:
+        data = read_session(path, preprocessor.feature_columns)
+        X = preprocessor.transform(data)
+        y = preprocessor.encode_labels(data[LABEL_COLUMN].to_numpy())
+        if len(X) <= seq_len:
+            continue
+        windows, labels = make_windows(X, y, seq_len)
+        cut = int(len(windows) * (1.0 - holdout))
+        fit_X.append(windows[:cut])
+        fit_y.append(labels[:cut])
+        hold_X.append(windows[cut:])
+        hold_y.append(labels[cut:])
+    if not fit_X:
+        raise ValueError(f"No session longer than {seq_len} rows in {paths}")
+    return (np.concatenate(fit_X), np.concatenate(fit_y), np.concatenate(hold_X), np.concatenate(hold_y))
+
+
+def embed(backbone, windows, batch_size=2048):
+    """Backbone outputs for every window, one batch at a time."""
+    out = np.empty((len(windows), backbone.output_shape[-1]), dtype=np.float32)
+    for start in range(0, len(windows), batch_size):
+        batch = np.ascontiguousarray(windows[start:start + batch_size], dtype=np.float32)
+        out[start:start + len(batch)] = backbone.predict_on_batch(batch)
+    return out
+
+
+def cached_embeddings(backbone, paths, preprocessor, seq_len, model_path, holdout,
+                      cache_dir=DEFAULT_EMBEDDING_CACHE):
+    """(E_fit, y_fit, E_hold, y_hold), computed once per (inputs, model, holdout)."""
+    key = cache_key(paths, f"{file_digest([model_path])}:{holdout}")
+    path = os.path.join(cache_dir, f'{key}.npz')
+    if os.path.exists(path):
+        z = np.load(path)
+        print(f"Loaded cached embeddings {path}")
+        return z['E_fit'], z['y_fit'], z['E_hold'], z['y_hold']
+    X_fit, y_fit, X_hold, y_hold = participant_windows(paths, preprocessor, seq_len, holdout)
+    E_fit, E_hold = embed(backbone, X_fit), embed(backbone, X_hold)
+    os.makedirs(cache_dir, exist_ok=True)
+    np.savez(path, E_fit=E_fit, y_fit=y_fit, E_hold=E_hold, y_hold=y_hold)
+    return E_fit, y_fit, E_hold, y_hold
+
+
+def fit_head(shared_head, E, y, epochs=50, batch_size=256, learning_rate=1e-3):
+    """Refit a copy of the shared head on the participant's embeddings."""
+    import tensorflow as tf
+    model = shared_head.to_keras()
+    model.compile(optimizer=tf.keras.optimizers.Adam(learning_rate), loss='sparse_categorical_crossentropy')
+    model.fit(E, y, epochs=epochs, batch_size=batch_size, validation_split=0.1, verbose=0,
+              callbacks=[tf.keras.callbacks.EarlyStopping(patience=5, restore_best_weights=True)])
+    dense = [layer for layer in model.layers if isinstance(layer, tf.keras.layers.Dense)]
+    return DenseHead.from_layers(dense, shared_head.classes)
+
+
+def head_path(user, heads_dir=DEFAULT_HEADS_DIR):
+    return os.path.join(heads_dir, f'{user}.npz')
+
+
+def load_shared(model_path, artifact_path):
+    import tensorflow as tf
+    model = tf.keras.models.load_model(model_path)
+    preprocessor = SensorPreprocessor.load(artifact_path)
+    backbone, layers = split_model(model)
+    return backbone, DenseHead.from_layers(layers, preprocessor.classes), preprocessor, model.input_shape[1]
+
+
+def accuracy(head, E, y):
+    return float((head.predict(E) == y).mean()) if len(y) else float('nan')
+
+
+if __name__ == '__main__':
+    p = argparse.ArgumentParser()
+    sub = p.add_subparsers(dest='command', required=True)
+    for name, help_text in [('fit', 'Fit and save a head for one participant'),
+                            ('evaluate', 'Compare the shared and personalized heads on held-out windows')]:
+        s = sub.add_parser(name, help=help_text)
+        s.add_argument('--user', required=True, help='Participant id (head file name)')
+        s.add_argument('--inputs', nargs='+', required=True, help="Participant's labelled session CSVs")
+        s.add_argument('--model', default=DEFAULT_MODEL_PATH, help='Shared model from basic_lstm.py')
+        s.add_argument('--artifact', default=DEFAULT_ARTIFACT_PATH, help='Preprocessing artifact used in training')
+        s.add_argument('--heads-dir', default=DEFAULT_HEADS_DIR, help='Directory of per-user heads')
+        s.add_argument('--holdout', type=float, default=0.2, help='Share of each session held out (last windows)')
+    sub.choices['fit'].add_argument('--epochs', type=int, default=50, help='Max head epochs')
+    args = p.parse_args()
+
+    backbone, shared_head, preprocessor, seq_len = load_shared(args.model, args.artifact)
+    E_fit, y_fit, E_hold, y_hold = cached_embeddings(backbone, args.inputs, preprocessor, seq_len,
+                                                     args.model, args.holdout)
+    if args.command == 'fit':
+        t0 = time.perf_counter()
+        head = fit_head(shared_head, E_fit, y_fit, args.epochs)
+        os.makedirs(args.heads_dir, exist_ok=True)
+        head.save(head_path(args.user, args.heads_dir))
+        print(f"Fitted head for {args.user} on {len(y_fit)} windows in {time.perf_counter() - t0:.1f}s "
+              f"-> {head_path(args.user, args.heads_dir)}")
+    else:
+        head = DenseHead.load(head_path(args.user, args.heads_dir))
+    print(f"Held-out accuracy ({len(y_hold)} windows): shared {accuracy(shared_head, E_hold, y_hold):.3f}, "
+          f"personalized {accuracy(head, E_hold, y_hold):.3f}")
+    print('Done!')
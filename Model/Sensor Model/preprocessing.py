@@ -0,0 +1,265 @@
+"""
+Fit-once preprocessing for the sensor LSTM models.
+
+The pipeline learns the feature column order, StandardScaler statistics and the
+Position label mapping from a merged, labelled sensor DataFrame and stores them
+in a small versioned JSON artifact, so training and streaming inference apply
+exactly the same transform.
+
+Transformed arrays are cached under a content hash of the source CSVs (plus the
+artifact version and the loader's source), so re-running an experiment on
+unchanged data skips reading, merging and scaling entirely.
+
+Usage:
+  python preprocessing.py --inputs 19092025_labelled.csv --artifact artifacts/preprocessing.json
+"""
+import argparse
+import hashlib
+import inspect
+import json
+import os
+import numpy as np
+import pandas as pd
+
+ARTIFACT_VERSION = 1
+LABEL_COLUMN = 'Position'
+NON_FEATURE_COLUMNS = ['Position', 'TimeStamp']
+DEFAULT_ARTIFACT_PATH = os.path.join('artifacts', 'preprocessing.json')
+DEFAULT_CACHE_DIR = 'preprocess_cache'
+
+
+class SensorPreprocessor:
+    """Feature selection, standard scaling and label encoding in one object."""
+
+    def __init__(self, feature_columns=None, mean=None, scale=None, classes=None):
+        self.feature_columns = list(feature_columns) if feature_columns is not None else None
+        self.mean = np.asarray(mean, dtype=np.float32) if mean is not None else None
+        self.scale = np.asarray(scale, dtype=np.float32) if scale is not None else None
+        self.classes = np.asarray(classes) if classes is not None else None
+        # Running state for partial_fit; unknown for a loaded artifact (it stores no sample count)
+        self._n = 0
+        self._mean = self._m2 = None
+        self._classes = set()
+
+    @property
+    def is_fitted(self):
+        return self.feature_columns is not None and self.mean is not None
+
+    @property
+    def num_features(self):
+        return len(self.feature_columns)
+
+    @property
+    def num_classes(self):
+        return len(self.classes)
+
+    def fit(self, data):
+        """Learn column order, per-feature mean/std and the label mapping."""
+        self.feature_columns = [c for c in data.columns
+                                if c not in NON_FEATURE_COLUMNS and not c.startswith('Unnamed')]
+        X = data[self.feature_columns].to_numpy(dtype=np.float64)
+        self.mean = X.mean(axis=0).astype(np.float32)
+        std = X.std(axis=0)
+        # Same convention as StandardScaler: constant features are left unscaled
+        std[std == 0.0] = 1.0
+        self.scale = std.astype(np.float32)
+        if LABEL_COLUMN in data.columns:
+            self.classes = np.unique(data[LABEL_COLUMN].to_numpy())
+        # Later partial_fit calls continue from this data
+        self._n = len(X)
+        self._mean = X.mean(axis=0) if len(X) else np.zeros(len(self.feature_columns))
+        self._m2 = ((X - self._mean) ** 2).sum(axis=0)
+        self._classes = set(self.classes.tolist()) if self.classes is not None else set()
+        return self
+
+    def partial_fit(self, data):
+        """Accumulate mean/std and labels over one chunk (e.g. one session) at a time.
+
+        Uses the pairwise mean/variance update so sessions never have to be
+        concatenated in memory; the result matches ``fit`` on the full data.
+        It continues after ``fit``, but not after ``load``: the artifact has
+        no sample count to weight new chunks against.
+        """
+        if self._mean is None:
+            if self.mean is not None:
+                raise ValueError('partial_fit cannot extend a loaded preprocessing artifact; '
+                                 'refit with fit() or partial_fit() on a new SensorPreprocessor')
+            if self.feature_columns is None:
+                self.feature_columns = [c for c in data.columns
+                                        if c not in NON_FEATURE_COLUMNS and not c.startswith('Unnamed')]
+            self._m2 = np.zeros(len(self.feature_columns))
+            self._mean = np.zeros(len(self.feature_columns))
+        X = data[self.feature_columns].to_numpy(dtype=np.float64)
+        n_b = len(X)
+        if n_b:
+            mean_b = X.mean(axis=0)
+            m2_b = ((X - mean_b) ** 2).sum(axis=0)
+            n = self._n + n_b
+            delta = mean_b - self._mean
+            self._mean = self._mean + delta * n_b / n
+            self._m2 = self._m2 + m2_b + delta ** 2 * self._n * n_b / n
+            self._n = n
+        if LABEL_COLUMN in data.columns:
+            self._classes.update(data[LABEL_COLUMN].dropna().unique().tolist())
+        std = np.sqrt(self._m2 / max(self._n, 1))
+        std[std == 0.0] = 1.0
+        self.mean = self._mean.astype(np.float32)
+        self.scale = std.astype(np.float32)
+        self.classes = np.array(sorted(self._classes)) if self._classes else None
+        return self
+
+    def transform_array(self, X, out=None):
+        """Scale a raw (n, num_features) array already in feature column order.
+
+        This is the streaming entry point: a single fused subtract/divide over
+        float32, writing into ``out`` when given to avoid per-call allocation.
+        """
+        X = np.asarray(X, dtype=np.float32)
+        if out is None:
+            out = np.empty_like(X)
+        np.subtract(X, self.mean, out=out)
+        np.divide(out, self.scale, out=out)
+        return out
+
+    def transform(self, data):
+        """Return scaled float32 features for a DataFrame (columns picked by name)."""
+        missing = [c for c in self.feature_columns if c not in data.columns]
+        if missing:
+            raise ValueError(f"Missing feature columns: {missing}")
+        X = data[self.feature_columns].to_numpy(dtype=np.float32, copy=True)
+        return self.transform_array(X, out=X)
+
+    def encode_labels(self, y):
+        """Map raw Position values to contiguous class indices 0..num_classes-1."""
+        y = np.asarray(y)
+        idx = np.searchsorted(self.classes, y)
+        idx = np.clip(idx, 0, len(self.classes) - 1)
+        unknown = self.classes[idx] != y
+        if unknown.any():
+            raise ValueError(f"Unknown labels: {sorted(set(y[unknown].tolist()))}")
+        return idx.astype(np.int32)
+
+    def decode_labels(self, idx):
+        """Map class indices back to the original Position values."""
+        return self.classes[np.asarray(idx)]
+
+    def fit_transform(self, data):
+        self.fit(data)
+        return self.transform(data), self.encode_labels(data[LABEL_COLUMN].to_numpy())
+
+    def to_dict(self):
+        return {
+            'version': ARTIFACT_VERSION,
+            'feature_columns': self.feature_columns,
+            'mean': self.mean.tolist(),
+            'scale': self.scale.tolist(),
+            'classes': self.classes.tolist() if self.classes is not None else None,
+        }
+
+    def save(self, path):
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        with open(path, 'w') as f:
+            json.dump(self.to_dict(), f, indent=2)
+        return path
+
+    @classmethod
+    def load(cls, path):
+        with open(path) as f:
+            state = json.load(f)
+        if state.get('version') != ARTIFACT_VERSION:
+            raise ValueError(f"Unsupported preprocessing artifact version {state.get('version')} in {path}")
+        return cls(state['feature_columns'], state['mean'], state['scale'], state['classes'])
+
+
+def make_windows(X, y, seq_len):
+    """Sliding windows as a zero-copy view; labels are taken at the step after each window.
+
+    Matches the original ``create_sequences`` (window i covers X[i:i+seq_len] and is
+    labelled y[i+seq_len]) without materialising len(X) * seq_len rows.
+    """
+    n = len(X) - seq_len
+    if n <= 0:
+        raise ValueError(f"Need more than {seq_len} rows to build windows, got {len(X)}")
+    windows = np.lib.stride_tricks.sliding_window_view(X, seq_len, axis=0)[:n]
+    # sliding_window_view puts the window axis last: (n, features, seq_len) -> (n, seq_len, features)
+    windows = windows.transpose(0, 2, 1)
+    return windows, y[seq_len:seq_len + n]
+
+
+def file_digest(paths):
+    """SHA-256 over the bytes of the given files, in order."""
+    h = hashlib.sha256()
+    for path in paths:
+        with open(path, 'rb') as f:
+            for chunk in iter(lambda: f.read(1 << 20), b''):
+                h.update(chunk)
+    return h.hexdigest()
+
+
+def cache_key(sources, extra=''):
+    return hashlib.sha256(f"v{ARTIFACT_VERSION}:{file_digest(sources)}:{extra}".encode()).hexdigest()[:24]
+
+
+def loader_digest(load_frame):
+    """Short hash of a loader's source code, so a changed merge rule misses the cache."""
+    try:
+        code = inspect.getsource(load_frame)
+    except (OSError, TypeError):
+        code = f"{getattr(load_frame, '__module__', '')}.{getattr(load_frame, '__qualname__', repr(load_frame))}"
+    return hashlib.sha256(code.encode()).hexdigest()[:16]
+
+
+def load_or_fit(sources, load_frame, artifact_path=None, cache_dir=DEFAULT_CACHE_DIR, extra_key=''):
+    """Return (preprocessor, X, y) for the given source CSVs.
+
+    ``load_frame`` is called with ``sources`` and must return the merged labelled
+    DataFrame; it only runs on a cache miss, and its source code is part of the
+    cache key. On a hit the scaled arrays are memory-mapped straight from the cache.
+
+    The artifact is written to ``artifact_path`` only when one is given (on a hit
+    too, so it always describes the arrays being returned). Pass
+    DEFAULT_ARTIFACT_PATH only from the run that produces the deployed model:
+    batch_infer.py and personalize.py read that file.
+    """
+    key = cache_key(sources, f"{loader_digest(load_frame)}:{extra_key}")
+    entry = os.path.join(cache_dir, key)
+    if os.path.exists(os.path.join(entry, 'DONE')):
+        pre = SensorPreprocessor.load(os.path.join(entry, 'preprocessing.json'))
+        X = np.load(os.path.join(entry, 'X.npy'), mmap_mode='r')
+        y = np.load(os.path.join(entry, 'y.npy'))
+        if artifact_path:
+            # The artifact may have been overwritten by a run on other data since this entry was cached
+            pre.save(artifact_path)
+        print(f"Loaded preprocessed arrays from cache {entry} ({len(X)} rows)")
+        return pre, X, y
+
+    data = load_frame(sources)
+    pre = SensorPreprocessor()
+    X, y = pre.fit_transform(data)
+    if artifact_path:
+        pre.save(artifact_path)
+
+    os.makedirs(entry, exist_ok=True)
+    pre.save(os.path.join(entry, 'preprocessing.json'))
+    np.save(os.path.join(entry, 'X.npy'), X)
+    np.save(os.path.join(entry, 'y.npy'), y)
+    open(os.path.join(entry, 'DONE'), 'w').close()
+    print(f"Cached preprocessed arrays in {entry} ({len(X)} rows)")
+    return pre, X, y
+
+
+if __name__ == '__main__':
+    p = argparse.ArgumentParser()
+    p.add_argument('--inputs', nargs='+', required=True, help='Merged, labelled sensor CSVs')
+    p.add_argument('--artifact', default=DEFAULT_ARTIFACT_PATH, help='Output preprocessing artifact (JSON)')
+    p.add_argument('--cache-dir', default=DEFAULT_CACHE_DIR, help='Directory for cached transformed arrays')
+    args = p.parse_args()
+
+    def read_all(paths):
+        data = pd.concat([pd.read_csv(f) for f in paths], ignore_index=True)
+        return data.dropna(subset=[LABEL_COLUMN])
+
+    pre, X, y = load_or_fit(args.inputs, read_all, args.artifact, args.cache_dir)
+    print(f"Features: {pre.feature_columns}")
+    print(f"Classes: {pre.classes.tolist()}")
+    print(f"Saved artifact: {args.artifact}")
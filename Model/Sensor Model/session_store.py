@@ -0,0 +1,205 @@
+"""
+Memory-mapped training store for labelled sensor sessions.
+
+A store is a directory holding:
+  features.f32       scaled float32 features, all sessions back to back (rows x features)
+  labels.i32         encoded class index per row
+  index.json         session names with row offset/length, shapes and feature columns
+  preprocessing.json the SensorPreprocessor artifact used to scale the features
+
+Sessions are streamed into the store one at a time, so building never holds more
+than one session in memory. Training reads windows straight out of the memory
+map; windows never cross a session boundary and shuffling permutes window start
+indices instead of copying data.
+
+Usage:
+  python session_store.py --inputs data/*_labelled.csv --output store/
+"""
+import argparse
+import json
+import os
+import numpy as np
+import pandas as pd
+from preprocessing import SensorPreprocessor, LABEL_COLUMN
+
+STORE_VERSION = 1
+FEATURES_FILE = 'features.f32'
+LABELS_FILE = 'labels.i32'
+INDEX_FILE = 'index.json'
+PREPROCESSING_FILE = 'preprocessing.json'
+
+
+def read_session(path, columns=None):
+    """Read one labelled session CSV, keeping only labelled rows."""
+    if columns is None:
+        data = pd.read_csv(path)
+    else:
+        data = pd.read_csv(path, usecols=list(columns) + [LABEL_COLUMN],
+                           dtype={c: np.float32 for c in columns})
+    return data.dropna(subset=[LABEL_COLUMN])
+
+
+def build_store(session_paths, output_dir, preprocessor=None):
+    """Convert labelled session CSVs into a memory-mapped store.
+
+    When no fitted ``preprocessor`` is given, one is fitted incrementally over
+    all sessions first (one extra read per session, never all at once).
+    """
+    if preprocessor is None:
+        preprocessor = SensorPreprocessor()
+        for path in session_paths:
+            preprocessor.partial_fit(read_session(path))
+
+    os.makedirs(output_dir, exist_ok=True)
+    sessions = []
+    offset = 0
+    with open(os.path.join(output_dir, FEATURES_FILE), 'wb') as f_x, \
+            open(os.path.join(output_dir, LABELS_FILE), 'wb') as f_y:
+        for path in session_paths:
+            data = read_session(path, preprocessor.feature_columns)
+            X = preprocessor.transform(data)
+            y = preprocessor.encode_labels(data[LABEL_COLUMN].to_numpy())
+            f_x.write(np.ascontiguousarray(X, dtype=np.float32).tobytes())
+            f_y.write(y.astype(np.int32).tobytes())
+            name = os.path.splitext(os.path.basename(path))[0]
+            sessions.append({'name': name, 'offset': offset, 'length': len(X)})
+            print(f"  {name}: {len(X)} rows at offset {offset}")
+            offset += len(X)
+
+    preprocessor.save(os.path.join(output_dir, PREPROCESSING_FILE))
+    index = {
+        'version': STORE_VERSION,
+        'rows': offset,
+        'num_features': preprocessor.num_features,
+        'feature_columns': preprocessor.feature_columns,
+        'sessions': sessions,
+    }
+    with open(os.path.join(output_dir, INDEX_FILE), 'w') as f:
+        json.dump(index, f, indent=2)
+    print(f"Built store {output_dir}: {offset} rows from {len(sessions)} session(s)")
+    return SessionStore(output_dir)
+
+
+class SessionStore:
+    """Read-only view over a store directory created by ``build_store``."""
+
+    def __init__(self, path):
+        self.path = path
+        with open(os.path.join(path, INDEX_FILE)) as f:
+            self.index = json.load(f)
+        if self.index.get('version') != STORE_VERSION:
+            raise ValueError(f"Unsupported store version {self.index.get('version')} in {path}")
+        rows, width = self.index['rows'], self.index['num_features']
+        self.features = np.memmap(os.path.join(path, FEATURES_FILE), dtype=np.float32,
+                                  mode='r', shape=(rows, width))
+        self.labels = np.memmap(os.path.join(path, LABELS_FILE), dtype=np.int32,
+                                mode='r', shape=(rows,))
+        self.preprocessor = SensorPreprocessor.load(os.path.join(path, PREPROCESSING_FILE))
+
+    @property
+    def sessions(self):
+        return self.index['sessions']
+
+    def __len__(self):
+        return self.index['rows']
+
+    def session(self, name):
+        """Return (features, labels) views for one session."""
+        for s in self.sessions:
+            if s['name'] == name:
+                sl = slice(s['offset'], s['offset'] + s['length'])
+                return self.features[sl], self.labels[sl]
+        raise KeyError(name)
+
+    def window_starts(self, seq_len, sessions=None):
+        """Row index of every window start that stays inside its session.
+
+        Window i covers rows [start, start + seq_len) and is labelled with the row
+        at start + seq_len, matching ``make_windows``.
+        """
+        chosen = self.sessions if sessions is None else [s for s in self.sessions if s['name'] in sessions]
+        starts = [np.arange(s['offset'], s['offset'] + s['length'] - seq_len, dtype=np.int64)
+                  for s in chosen if s['length'] > seq_len]
+        return np.concatenate(starts) if starts else np.empty(0, dtype=np.int64)
+
+    def window(self, start, seq_len):
+        """Zero-copy view of a single window."""
+        return self.features[start:start + seq_len]
+
+    def gather(self, starts, seq_len, out=None):
+        """Assemble a (len(starts), seq_len, features) batch with one vectorized take.
+
+        This is the only copy on the read path; ``out`` lets callers reuse a buffer.
+        """
+        starts = np.asarray(starts, dtype=np.int64)
+        rows = starts[:, None] + np.arange(seq_len)
+        if out is not None:
+            out = out[:len(starts)]
+        X = np.take(self.features, rows, axis=0, out=out)
+        return X, np.asarray(self.labels[starts + seq_len])
+
+
+def split_window_starts(starts, test_size=0.2, random_state=42):
+    """Shuffle window indices (not data) and split them into train/test."""
+    rng = np.random.default_rng(random_state)
+    order = rng.permutation(len(starts))
+    n_test = int(round(len(starts) * test_size))
+    return starts[order[n_test:]], starts[order[:n_test]]
+
+
+def keras_sequence(store, starts, seq_len, batch_size=64, shuffle=True, random_state=42):
+    """Keras ``Sequence`` over window starts; shuffles the index every epoch."""
+    from tensorflow import keras
+
+    class WindowSequence(keras.utils.Sequence):
+        def __init__(self):
+            super().__init__()
+            self.starts = np.array(starts)
+            self.rng = np.random.default_rng(random_state)
+            if shuffle:
+                self.rng.shuffle(self.starts)
+
+        def __len__(self):
+            return int(np.ceil(len(self.starts) / batch_size))
+
+        def __getitem__(self, i):
+            batch = self.starts[i * batch_size:(i + 1) * batch_size]
+            return store.gather(batch, seq_len)
+
+        def on_epoch_end(self):
+            if shuffle:
+                self.rng.shuffle(self.starts)
+
+    return WindowSequence()
+
+
+def tf_dataset(store, starts, seq_len, batch_size=64, shuffle=True, random_state=42):
+    """``tf.data`` pipeline that shuffles window starts and gathers batches from the memmap."""
+    import tensorflow as tf
+    width = store.features.shape[1]
+
+    def load_batch(batch_starts):
+        X, y = store.gather(batch_starts, seq_len)
+        return X, y.astype(np.int32)
+
+    ds = tf.data.Dataset.from_tensor_slices(np.asarray(starts, dtype=np.int64))
+    if shuffle:
+        ds = ds.shuffle(len(starts), seed=random_state, reshuffle_each_iteration=True)
+    ds = ds.batch(batch_size)
+    ds = ds.map(lambda s: tf.numpy_function(load_batch, [s], (tf.float32, tf.int32)),
+                num_parallel_calls=tf.data.AUTOTUNE)
+    ds = ds.map(lambda X, y: (tf.ensure_shape(X, (None, seq_len, width)), tf.ensure_shape(y, (None,))))
+    return ds.prefetch(tf.data.AUTOTUNE)
+
+
+if __name__ == '__main__':
+    p = argparse.ArgumentParser()
+    p.add_argument('--inputs', nargs='+', required=True, help='Labelled session CSVs (with Position column)')
+    p.add_argument('--output', required=True, help='Output store directory')
+    p.add_argument('--artifact', help='Existing preprocessing artifact to reuse instead of refitting')
+    args = p.parse_args()
+
+    pre = SensorPreprocessor.load(args.artifact) if args.artifact else None
+    store = build_store(args.inputs, args.output, pre)
+    print(f"Features: {store.index['feature_columns']}")
+    print('Done!')
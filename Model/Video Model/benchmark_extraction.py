@@ -0,0 +1,71 @@
+"""
+Benchmark landmark extraction throughput (frames/s) on a synthetic video.
+
+Writes a synthetic clip with OpenCV, then runs detect_landmarks on it without the
+cache in three configurations:
+  sequential   decode, colour conversion and pose inference on one thread
+  pipelined    decode + conversion on a producer thread with a bounded queue
+  downscaled   pipelined, with frames downscaled to --inference-width first
+
+Usage:
+  python benchmark_extraction.py --frames 600 --width 1280 --height 720
+"""
+import argparse
+import os
+import tempfile
+import time
+import cv2
+import numpy as np
+from create_dataset_from_video import FRAME_QUEUE_SIZE, detect_landmarks
+
+
+def write_synthetic_video(path, frames=600, width=1280, height=720, fps=30.0):
+    """A moving figure-like blob on a textured background (decode cost similar to real footage)."""
+    writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*'mp4v'), fps, (width, height))
+    rng = np.random.default_rng(0)
+    background = rng.integers(0, 255, (height, width, 3), dtype=np.uint8)
+    for i in range(frames):
+        frame = background.copy()
+        cx = int(width * (0.3 + 0.4 * (0.5 + 0.5 * np.sin(i / 20))))
+        cv2.circle(frame, (cx, height // 3), height // 12, (200, 180, 160), -1)
+        cv2.rectangle(frame, (cx - width // 30, height // 3), (cx + width // 30, 2 * height // 3), (90, 60, 200), -1)
+        writer.write(frame)
+    writer.release()
+    return path
+
+
+def time_run(video, **settings):
+    t0 = time.perf_counter()
+    detect_landmarks(video, cache_dir=None, **settings)
+    return time.perf_counter() - t0
+
+
+if __name__ == '__main__':
+    p = argparse.ArgumentParser()
+    p.add_argument('--frames', type=int, default=600, help='Frames in the synthetic video')
+    p.add_argument('--width', type=int, default=1280, help='Synthetic video width')
+    p.add_argument('--height', type=int, default=720, help='Synthetic video height')
+    p.add_argument('--inference-width', type=int, default=640, help='Downscaled width for the last run')
+    p.add_argument('--video', default=None, help='Benchmark this video instead of a synthetic one')
+    args = p.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        video = args.video or write_synthetic_video(os.path.join(tmp, 'synthetic.mp4'),
+                                                    args.frames, args.width, args.height)
+        cap = cv2.VideoCapture(video)
+        total = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+        cap.release()
+
+        runs = [
+            ('sequential', {'queue_size': 0}),
+            ('pipelined', {'queue_size': FRAME_QUEUE_SIZE}),
+            (f'downscaled ({args.inference_width}px)', {'queue_size': FRAME_QUEUE_SIZE,
+                                                        'inference_width': args.inference_width}),
+        ]
+        baseline = None
+        for name, settings in runs:
+            secs = time_run(video, **settings)
+            fps = total / secs
+            baseline = baseline or fps
+            print(f"{name:>22}: {fps:7.1f} frames/s ({fps / baseline:.2f}x)")
+    print('Done!')
@@ -0,0 +1,157 @@
+"""
+Compact pose classifier over MediaPipe landmark features with NumPy-only inference.
+
+Trains a small MLP (scikit-learn) on the per-frame datasets written by
+create_dataset_from_video.py / merge_datasets.py, using the normalized
+coordinates and joint angles when present (raw x, y, z otherwise). Labels are
+folded with POSE_CLASS_MAPPING, so mirrored poses of the sequence share a
+class (9 classes for the 12 poses).
+
+The trained network is exported as plain arrays (.npz). Inference needs only
+NumPy: a standardisation and a few float32 matrix products over a whole batch
+of frames, which classifies thousands of frames per second on a CPU.
+
+Usage:
+  python landmark_classifier.py train --data data/combined_dataset.csv --output landmark_mlp.npz
+  python landmark_classifier.py benchmark --data data/combined_dataset.csv --model landmark_mlp.npz
+"""
+import argparse
+import time
+import numpy as np
+import pandas as pd
+from create_dataset_from_video import LANDMARK_NAMES, JOINT_ANGLES, POSE_CLASS_MAPPING
+
+
+def feature_columns(columns):
+    """Normalized coordinates + angles when available, raw coordinates otherwise."""
+    normalized = [f"{n}_n{a}" for n in LANDMARK_NAMES for a in 'xyz']
+    if all(c in columns for c in normalized):
+        return normalized + [c for c in JOINT_ANGLES if c in columns]
+    return [f"{n}_{a}" for n in LANDMARK_NAMES for a in 'xyz']
+
+
+def fold_pose_classes(y):
+    """Apply POSE_CLASS_MAPPING (identity for already-folded classes 1..9)."""
+    lookup = np.arange(max(POSE_CLASS_MAPPING) + 1)
+    for pose_num, pose_class in POSE_CLASS_MAPPING.items():
+        lookup[pose_num] = pose_class
+    return lookup[np.asarray(y, dtype=np.int64)]
+
+
+class NumpyPoseClassifier:
+    """Standardisation + ReLU MLP evaluated with NumPy only."""
+
+    def __init__(self, columns, mean, scale, weights, biases, classes):
+        self.columns = list(columns)
+        self.mean = np.asarray(mean, dtype=np.float32)
+        self.scale = np.asarray(scale, dtype=np.float32)
+        self.weights = [np.ascontiguousarray(w, dtype=np.float32) for w in weights]
+        self.biases = [np.asarray(b, dtype=np.float32) for b in biases]
+        self.classes = np.asarray(classes)
+
+    @classmethod
+    def from_sklearn(cls, columns, scaler, mlp):
+        return cls(columns, scaler.mean_, scaler.scale_, mlp.coefs_, mlp.intercepts_, mlp.classes_)
+
+    def predict_proba(self, X):
+        h = (np.asarray(X, dtype=np.float32) - self.mean) / self.scale
+        last = len(self.weights) - 1
+        for i, (w, b) in enumerate(zip(self.weights, self.biases)):
+            h = h @ w
+            h += b
+            if i < last:
+                np.maximum(h, 0.0, out=h)
+        h -= h.max(axis=1, keepdims=True)
+        np.exp(h, out=h)
+        h /= h.sum(axis=1, keepdims=True)
+        return h
+
+    def predict(self, X):
+        return self.classes[self.predict_proba(X).argmax(axis=1)]
+
+    def predict_frame(self, data):
+        """Predict pose_class for every row of a landmark DataFrame."""
+        return self.predict(data[self.columns].to_numpy(dtype=np.float32))
+
+    def save(self, path):
+        arrays = {'columns': np.array(self.columns), 'mean': self.mean, 'scale': self.scale,
+                  'classes': self.classes, 'layers': np.array(len(self.weights))}
+        for i, (w, b) in enumerate(zip(self.weights, self.biases)):
+            arrays[f'w{i}'] = w
+            arrays[f'b{i}'] = b
+        np.savez(path, **arrays)
+        return path
+
+    @classmethod
+    def load(cls, path):
+        z = np.load(path)
+        n = int(z['layers'])
+        return cls(z['columns'].tolist(), z['mean'], z['scale'],
+                   [z[f'w{i}'] for i in range(n)], [z[f'b{i}'] for i in range(n)], z['classes'])
+
+
+def split_data(data, test_size=0.2, random_state=42):
+    """Hold out whole videos when there are several, so frames of one clip never leak into the test set."""
+    from sklearn.model_selection import GroupShuffleSplit, train_test_split
+    if 'video_source' in data and data['video_source'].nunique() > 1:
+        splitter = GroupShuffleSplit(n_splits=1, test_size=test_size, random_state=random_state)
+        train_idx, test_idx = next(splitter.split(data, groups=data['video_source']))
+        return data.iloc[train_idx], data.iloc[test_idx]
+    return train_test_split(data, test_size=test_size, random_state=random_state, stratify=data['pose_class'])
+
+
+def train(data, hidden=(64, 32), random_state=42):
+    from sklearn.neural_network import MLPClassifier
+    from sklearn.preprocessing import StandardScaler
+    columns = feature_columns(data.columns)
+    X = data[columns].to_numpy(dtype=np.float32)
+    y = fold_pose_classes(data['pose_class'])
+    scaler = StandardScaler().fit(X)
+    mlp = MLPClassifier(hidden_layer_sizes=hidden, activation='relu', max_iter=500,
+                        early_stopping=True, random_state=random_state)
+    mlp.fit(scaler.transform(X), y)
+    return NumpyPoseClassifier.from_sklearn(columns, scaler, mlp)
+
+
+def benchmark(model, data, batch_size=4096, repeats=20):
+    """Accuracy on ``data`` and frames/s of the NumPy path at a given batch size."""
+    X = data[model.columns].to_numpy(dtype=np.float32)
+    y = fold_pose_classes(data['pose_class'])
+    accuracy = float((model.predict(X) == y).mean())
+    reps = max(1, batch_size // max(len(X), 1))
+    batch = np.tile(X, (reps, 1))[:batch_size] if len(X) < batch_size else X[:batch_size]
+    model.predict(batch)  # warm-up
+    t0 = time.perf_counter()
+    for _ in range(repeats):
+        model.predict(batch)
+    elapsed = time.perf_counter() - t0
+    return accuracy, repeats * len(batch) / elapsed
+
+
+if __name__ == '__main__':
+    p = argparse.ArgumentParser()
+    sub = p.add_subparsers(dest='command', required=True)
+    t = sub.add_parser('train', help='Train on a landmark dataset and export NumPy weights')
+    t.add_argument('--data', required=True, help='Landmark dataset CSV (pose_class + landmark columns)')
+    t.add_argument('--output', required=True, help='Output model (.npz)')
+    t.add_argument('--hidden', nargs='+', type=int, default=[64, 32], help='Hidden layer sizes')
+    b = sub.add_parser('benchmark', help='Report accuracy and frames/s of an exported model')
+    b.add_argument('--data', required=True, help='Landmark dataset CSV')
+    b.add_argument('--model', required=True, help='Exported model (.npz)')
+    b.add_argument('--batch-size', type=int, default=4096, help='Frames per inference batch')
+    args = p.parse_args()
+
+    data = pd.read_csv(args.data)
+    if args.command == 'train':
+        train_df, test_df = split_data(data)
+        model = train(train_df, tuple(args.hidden))
+        model.save(args.output)
+        acc, fps = benchmark(model, test_df)
+        print(f"Saved model: {args.output} ({len(model.columns)} features, classes {model.classes.tolist()})")
+        print(f"Held-out accuracy: {acc:.3f}, NumPy inference: {fps:,.0f} frames/s")
+    else:
+        model = NumpyPoseClassifier.load(args.model)
+        acc, fps = benchmark(model, data, args.batch_size)
+        print(f"Accuracy: {acc:.3f}")
+        print(f"Throughput: {fps:,.0f} frames/s (batch {args.batch_size})")
+    print('Done!')
@@ -0,0 +1,130 @@
+"""
+Joint landmark extraction from a synchronized multi-camera recording (front/side/back).
+
+Each view is processed by create_dataset_from_video.detect_landmarks in its own
+process, so the wall-clock cost is roughly that of the slowest single view. The
+per-view detections are aligned on time (frame / fps, plus an optional per-view
+offset in seconds) onto the first view's clock and labelled once on that clock.
+The views do not share a coordinate frame, so joints are never mixed across
+cameras: each frame's landmarks all come from the view with the highest mean
+joint visibility, and the derived features are
+  best      normalized coordinates and joint angles of that view (default)
+  weighted  the same features computed per view, averaged with each view's
+            mean visibility as weight (normalized coordinates only agree for
+            cameras with similar framing; angles are comparable across views)
+
+Output has the same columns as the single-view dataset. There is one row
+per labelled reference frame at which any view detected a pose, so frames the
+first camera missed are filled from the others. It is written once for the whole set.
+
+Usage:
+  python multiview_extract.py --videos front.mp4 side.mp4 back.mp4 \
+      --intervals data/pose_intervals_video1.csv --output data/video1_multiview.csv
+"""
+import argparse
+import os
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+import pandas as pd
+from create_dataset_from_video import (LANDMARK_NAMES, detect_landmarks, label_frames, landmark_features,
+                                       landmarks_to_frame, load_intervals, save_dataset)
+
+JOINTS = LANDMARK_NAMES
+
+
+def _extract_view(video):
+    fps, frames, coords = detect_landmarks(video)
+    return video, fps, frames, coords
+
+
+def align_views(views, offsets, tolerance, intervals=None):
+    """Reindex every view onto one timeline on the first view's clock.
+
+    The timeline holds every reference frame index at which any view detected a
+    pose, so frames the reference camera missed (occlusion) are still filled
+    from the others. Pose labels come from ``intervals`` on that clock, and
+    unlabelled frames are dropped. Returns (frames, pose_class) and, per view,
+    a DataFrame of landmark columns aligned row for row (NaN where the view has
+    no frame within ``tolerance`` seconds).
+    """
+    ref_fps = views[0][1]
+    t_all = np.concatenate([frames / fps + offset for (_, fps, frames, _), offset in zip(views, offsets)])
+    ref_frames = np.unique(np.rint((t_all - offsets[0]) * ref_fps).astype(np.int64))
+    ref_frames = ref_frames[ref_frames >= 0]
+    pose_class = label_frames(ref_frames, ref_fps, intervals)
+    keep = pose_class > 0
+    ref_frames, pose_class = ref_frames[keep], pose_class[keep]
+    t_ref = ref_frames / ref_fps + offsets[0]
+    lm_cols = [f'{j}_{a}' for j in JOINTS for a in ('x', 'y', 'z', 'visibility')]
+    aligned = []
+    for (video, fps, frames, coords), offset in zip(views, offsets):
+        if len(frames) == 0:
+            aligned.append(None)
+            continue
+        order = np.argsort(frames, kind='stable')
+        t = frames[order] / fps + offset
+        idx = np.clip(np.searchsorted(t, t_ref), 0, len(t) - 1)
+        prev = np.clip(idx - 1, 0, len(t) - 1)
+        idx = np.where(np.abs(t[prev] - t_ref) < np.abs(t[idx] - t_ref), prev, idx)
+        view = coords[order][idx].astype(np.float64).reshape(len(idx), -1)
+        view[np.abs(t[idx] - t_ref) > tolerance] = np.nan
+        aligned.append(pd.DataFrame(view, columns=lm_cols))
+    return ref_frames, pose_class, aligned
+
+
+def fuse_views(frames, pose_class, aligned, mode='best'):
+    """Dataset rows for the aligned views, with one camera's geometry per frame.
+
+    Landmarks from different cameras do not share a coordinate frame, so every
+    frame takes all its landmarks from the view with the highest mean joint
+    visibility, and the normalized coordinates and angles are computed from
+    that view alone. With ``weighted`` those derived features are instead
+    computed per view and blended by each view's mean visibility.
+    """
+    n = len(frames)
+    coords = np.stack([v.to_numpy(dtype=np.float32).reshape(n, len(JOINTS), 4) if v is not None
+                       else np.full((n, len(JOINTS), 4), np.nan, dtype=np.float32) for v in aligned])
+    vis = np.nan_to_num(coords[..., 3], nan=-1.0).mean(axis=2)
+    best = vis.argmax(axis=0)
+    df = landmarks_to_frame(frames, pose_class, coords[best, np.arange(n)])
+    if mode == 'weighted':
+        per_view = [landmark_features(c) for c in coords]
+        w = np.clip(vis, 0.0, None)
+        for col in per_view[0]:
+            f = np.stack([features[col] for features in per_view]).astype(np.float64)
+            fw = np.where(np.isnan(f), 0.0, w)
+            total = fw.sum(axis=0)
+            blended = np.nansum(f * fw, axis=0) / np.where(total > 0, total, 1)
+            df[col] = np.where(total > 0, blended, df[col]).astype(np.float32)
+    return df
+
+
+def process_views(videos, intervals_csv, output_csv, offsets=None, mode='best', tolerance=None):
+    intervals = load_intervals(intervals_csv) if intervals_csv and os.path.exists(intervals_csv) else {}
+    offsets = offsets or [0.0] * len(videos)
+    with ProcessPoolExecutor(max_workers=len(videos)) as pool:
+        views = list(pool.map(_extract_view, videos))
+    for video, fps, frames, _ in views:
+        print(f"  {os.path.basename(video)}: {len(frames)} frames with a detected pose ({fps:.1f} fps)")
+
+    tolerance = tolerance if tolerance is not None else 1.0 / views[0][1]
+    frames, pose_class, aligned = align_views(views, offsets, tolerance, intervals)
+    if len(frames) == 0 or all(v is None for v in aligned):
+        raise ValueError(f"No detected, labelled frames in any view of {videos}")
+    df_new = fuse_views(frames, pose_class, aligned, mode)
+    df_new = df_new.dropna(subset=[f'{j}_x' for j in JOINTS], how='all').reset_index(drop=True)
+    df_new['video_source'] = '+'.join(os.path.splitext(os.path.basename(v))[0] for v in videos)
+    return save_dataset(df_new, output_csv)
+
+
+if __name__ == '__main__':
+    p = argparse.ArgumentParser()
+    p.add_argument('--videos', nargs='+', required=True, help='Synchronized videos of one session (first is the time reference)')
+    p.add_argument('--intervals', required=False, help='CSV with pose intervals (pose_num,start,end) on the reference clock')
+    p.add_argument('--offsets', nargs='+', type=float, default=None, help='Per-view start offset in seconds')
+    p.add_argument('--mode', choices=['best', 'weighted'], default='best', help='How the views are combined per frame')
+    p.add_argument('--output', required=True, help='Output dataset CSV path')
+    args = p.parse_args()
+
+    out = process_views(args.videos, args.intervals, args.output, args.offsets, args.mode)
+    print('Done:', out)
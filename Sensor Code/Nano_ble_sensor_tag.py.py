@@ -1,13 +1,11 @@
+import argparse
 import asyncio
 import csv
 import time
 import logging
 import os
 from datetime import datetime
-from bleak import BleakClient, BleakScanner
-
-# Enable debug logging
-logging.basicConfig(level=logging.DEBUG)
+from ble_rate_control import MIN_PERIOD, NRF_PERIOD_UUID, RateController, period_bytes
 
 # UUIDs (matching Arduino code)
 DEVICE_NAME = "nRF_IMU"
@@ -16,16 +14,23 @@ GYRO_CHAR_UUID  = "0000B001-0000-1000-8000-00805F9B34FB"
 MAG_CHAR_UUID   = "0000C001-0000-1000-8000-00805F9B34FB"
 HEART_CHAR_UUID = "0000D001-0000-1000-8000-00805F9B34FB"
 
-# ---------- Folder and CSV setup ----------
+# ---------- Folder and CSV setup (on run, not on import) ----------
 FOLDER_NAME = "sensor_csv_data"
-if not os.path.exists(FOLDER_NAME):
-    os.makedirs(FOLDER_NAME)
+CSV_PATH = None
+csv_file = None
+writer = None
+controller = None  # RateController, set by main() when the firmware has a writable period (A002)
+
+def open_csv():
+    global CSV_PATH, csv_file, writer
+    if not os.path.exists(FOLDER_NAME):
+        os.makedirs(FOLDER_NAME)
 
-CSV_PATH = os.path.join(FOLDER_NAME, f"sensor_data_{datetime.now().strftime('%d%m%Y_%H%M%S')}.csv")
-csv_file = open(CSV_PATH, "w", newline="")
-writer = csv.writer(csv_file)
-writer.writerow(["TimeStamp", "Gx", "Gy", "Gz", "Ax", "Ay", "Az", "Mx", "My", "Mz", "BPM"])
-csv_file.flush()  # Immediately write header
+    CSV_PATH = os.path.join(FOLDER_NAME, f"sensor_data_{datetime.now().strftime('%d%m%Y_%H%M%S')}.csv")
+    csv_file = open(CSV_PATH, "w", newline="")
+    writer = csv.writer(csv_file)
+    writer.writerow(["TimeStamp", "Gx", "Gy", "Gz", "Ax", "Ay", "Az", "Mx", "My", "Mz", "BPM"])
+    csv_file.flush()  # Immediately write header
 
 # Buffer to store latest sensor data
 sensor_data = {
@@ -64,6 +69,9 @@ async def notification_handler(sender, data):
         timestamp = datetime.now().strftime('%H:%M:%S')
         
         if sender.uuid.lower() == ACCEL_CHAR_UUID.lower():
+            # One accelerometer notification per sampling period
+            if controller:
+                controller.record(DEVICE_NAME)
             values = value.split(" ")[1].split(",")
             ax, ay, az = map(float, values)
             sensor_data["accel"] = [ax, ay, az]
@@ -93,7 +101,10 @@ async def notification_handler(sender, data):
     except (UnicodeDecodeError, ValueError, IndexError) as e:
         logging.error(f"Error processing data from {sender.uuid}: {e}, Raw data: {data}")
 
-async def main():
+async def main(adaptive=True):
+    global controller
+    from bleak import BleakClient, BleakScanner
+
     print("Scanning for nRF_IMU...")
     device = None
     devices = await BleakScanner.discover(timeout=15.0)
@@ -111,6 +122,16 @@ async def main():
     async with BleakClient(device.address, timeout=30.0) as client:
         print(f"Connected to {device.name}")
 
+        # Start at 100 ms; the rate controller adapts the period through A002 from here
+        control = None
+        try:
+            await client.write_gatt_char(NRF_PERIOD_UUID, period_bytes(MIN_PERIOD))
+            controller = RateController(adaptive=adaptive)
+            controller.add(DEVICE_NAME, MIN_PERIOD)
+            control = asyncio.create_task(controller.run({DEVICE_NAME: client}, period_uuid=NRF_PERIOD_UUID))
+        except Exception as e:
+            logging.warning(f"No writable sampling period (A002), keeping the fixed rate: {e}")
+
         try:
             await client.start_notify(ACCEL_CHAR_UUID, notification_handler)
             await client.start_notify(GYRO_CHAR_UUID, notification_handler)
@@ -119,6 +140,8 @@ async def main():
             print("Subscribed to all characteristics.")
         except Exception as e:
             logging.error(f"Failed to subscribe to notifications: {e}")
+            if control:
+                control.cancel()
             return
 
         try:
@@ -129,10 +152,19 @@ async def main():
             await client.stop_notify(GYRO_CHAR_UUID)
             await client.stop_notify(MAG_CHAR_UUID)
             await client.stop_notify(HEART_CHAR_UUID)
+        finally:
+            if control:
+                control.cancel()
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Log one nRF IMU with heart rate to sensor_csv_data")
+    parser.add_argument("--fixed-period", action="store_true", help="Keep the 100 ms period (no rate control)")
+    args = parser.parse_args()
+    # Enable debug logging
+    logging.basicConfig(level=logging.DEBUG)
+    open_csv()
     try:
-        asyncio.run(main())
+        asyncio.run(main(adaptive=not args.fixed_period))
     finally:
         csv_file.close()
         print(f"Saved to {CSV_PATH}")
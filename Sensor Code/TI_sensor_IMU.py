@@ -1,8 +1,8 @@
+import argparse
 import asyncio
 import struct
 import csv
 from datetime import datetime
-from bleak import BleakClient, BleakScanner
 
 # ====== UUIDs (CC2650 SensorTag) ======
 MOVEMENT_DATA_UUID   = "f000aa81-0451-4000-b000-000000000000"
@@ -16,13 +16,18 @@ MOVEMENT_PERIOD_BYTE  = bytearray([0x0A])
 
 CSV_PATH = "imu_raw.csv"
 
-# ---------- CSV setup ----------
-csv_file = open(CSV_PATH, "w", newline="")
-writer = csv.writer(csv_file)
-writer.writerow(["timestamp_iso",
-                 "gyro_x_raw","gyro_y_raw","gyro_z_raw",
-                 "acc_x_raw","acc_y_raw","acc_z_raw",
-                 "mag_x_raw","mag_y_raw","mag_z_raw"])
+csv_file = None
+writer = None
+
+# ---------- CSV setup (on run, not on import) ----------
+def open_csv(path=CSV_PATH):
+    global csv_file, writer
+    csv_file = open(path, "w", newline="")
+    writer = csv.writer(csv_file)
+    writer.writerow(["timestamp_iso",
+                     "gyro_x_raw","gyro_y_raw","gyro_z_raw",
+                     "acc_x_raw","acc_y_raw","acc_z_raw",
+                     "mag_x_raw","mag_y_raw","mag_z_raw"])
 
 # ---------- Notification callback ----------
 def movement_cb(_: int, data: bytearray):
@@ -34,6 +39,8 @@ def movement_cb(_: int, data: bytearray):
                      gx, gy, gz, ax, ay, az, mx, my, mz])
 
 async def main():
+    from bleak import BleakClient, BleakScanner
+
     print("Scanning for SensorTag…")
     devices = await BleakScanner.discover(timeout=5.0)
     tags = [d for d in devices if d.name and ("CC2650" in d.name or "SensorTag" in d.name)]
@@ -70,8 +77,12 @@ async def main():
             await client.stop_notify(MOVEMENT_DATA_UUID)
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Log raw IMU values from one CC2650 SensorTag")
+    parser.add_argument("--output", default=CSV_PATH, help="Output CSV path")
+    args = parser.parse_args()
+    open_csv(args.output)
     try:
         asyncio.run(main())
     finally:
         csv_file.close()
-        print(f"Saved to {CSV_PATH}")
+        print(f"Saved to {args.output}")
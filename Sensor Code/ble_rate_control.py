@@ -0,0 +1,313 @@
+"""
+Adaptive sampling period for SensorTag loggers sharing one BLE adapter.
+
+Every device sharing the adapter also shares its radio time. At the fixed
+100 ms period (MOVEMENT_PERIOD_BYTE) a few tags work fine, but with more
+devices notifications start to drop, and past the knee the retransmissions
+waste airtime so the total number of delivered samples goes down.
+``RateController`` counts the notifications delivered by each device over a
+control interval and compares them with what the configured period should
+produce, which gives the loss. It then adjusts the periods AIMD-style through
+the MOVEMENT_PERIOD_UUID write:
+  aggregate loss > loss_high     every device backs off (period x backoff)
+  aggregate loss < loss_low      every device speeds up by one 10 ms step
+  one device much lossier        only that device backs off (weak link), once
+                                 that has held for ``persist`` scored intervals in
+                                 a row, so binomial noise in one interval does not
+                                 push a single device to a slower period
+The interval after a change is not scored, so the new period can take effect.
+
+The nano33_ble_with_HR.ino firmware takes the same byte on its A002
+characteristic (NRF_PERIOD_UUID) instead of a fixed delay(100); the nano and
+quadruple loggers pass that UUID to ``RateController.run``.
+
+MTU is negotiated once at connect (exchange_mtu in the loggers); bleak has no
+runtime renegotiation, and the 18-byte movement payload fits the default
+23-byte ATT MTU anyway, so the period is the knob that is adapted.
+
+The controller is tested against a modelled shared radio: ``SharedRadio``
+delivers each notification with a probability that falls once the offered
+load (sum of 1/period over its peripherals) passes its capacity.
+``SimulatedSensorTag`` uses that radio to stand in for BleakClient, and
+``simulate`` steps the same model on a virtual clock.
+
+Usage:
+  python ble_rate_control.py bench --devices 1 2 4 8 --capacity 60
+  python ble_rate_control.py live --devices 3 --seconds 20
+  python dual_sensortag_logger.py --simulate
+"""
+import argparse
+import asyncio
+import math
+import struct
+import time
+from types import SimpleNamespace
+import numpy as np
+
+MOVEMENT_DATA_UUID   = "f000aa81-0451-4000-b000-000000000000"
+MOVEMENT_PERIOD_UUID = "f000aa83-0451-4000-b000-000000000000"
+NRF_PERIOD_UUID      = "0000A002-0000-1000-8000-00805F9B34FB"
+
+PERIOD_UNIT_MS = 10   # SensorTag period register resolution
+MIN_PERIOD = 0x0A     # 100 ms, the CC2650 firmware floor
+MAX_PERIOD = 0xFF     # 2.55 s
+
+
+def period_bytes(period):
+    """Value for a MOVEMENT_PERIOD_UUID write (period in 10 ms units)."""
+    return bytearray([int(period)])
+
+
+class RateController:
+    """Per-device delivered rate / loss tracking and period decisions."""
+
+    def __init__(self, min_period=MIN_PERIOD, max_period=MAX_PERIOD, loss_low=0.02, loss_high=0.10,
+                 backoff=1.25, step=1, persist=3, adaptive=True):
+        self.min_period = min_period
+        self.max_period = max_period
+        self.loss_low = loss_low
+        self.loss_high = loss_high
+        self.backoff = backoff
+        self.step = step
+        self.persist = persist
+        self.adaptive = adaptive
+        self.devices = {}
+        self.history = []
+
+    def add(self, name, period=MIN_PERIOD, now=None):
+        self.devices[name] = {'period': int(period), 'count': 0, 'total': 0, 'lossy': 0,
+                              'since': time.monotonic() if now is None else now, 'settling': True}
+
+    def remove(self, name):
+        self.devices.pop(name, None)
+
+    def record(self, name, n=1):
+        """Count delivered notifications (called from the notification callback)."""
+        device = self.devices.get(name)
+        if device is not None:
+            device['count'] += n
+            device['total'] += n
+
+    def clamp(self, period):
+        return int(min(self.max_period, max(self.min_period, period)))
+
+    def update(self, now=None):
+        """Score the last interval and return {device: new period} for the devices to reconfigure."""
+        now = time.monotonic() if now is None else now
+        stats = {}
+        for name, device in self.devices.items():
+            elapsed = now - device['since']
+            expected = elapsed * 1000.0 / (device['period'] * PERIOD_UNIT_MS)
+            stats[name] = {'period': device['period'], 'delivered': device['count'], 'expected': expected,
+                           'rate': device['count'] / elapsed if elapsed > 0 else 0.0,
+                           'loss': max(0.0, 1.0 - device['count'] / expected) if expected > 0 else 0.0,
+                           'settling': device['settling']}
+            device['count'] = 0
+            device['since'] = now
+            device['settling'] = False
+
+        scored = {name: s for name, s in stats.items() if not s['settling']}
+        expected = sum(s['expected'] for s in scored.values())
+        delivered = sum(s['delivered'] for s in scored.values())
+        loss = max(0.0, 1.0 - delivered / expected) if expected > 0 else 0.0
+        self.history.append({'time': now, 'loss': loss, 'rate': sum(s['rate'] for s in stats.values()),
+                             'periods': {name: s['period'] for name, s in stats.items()}})
+        if not self.adaptive or not scored:
+            return {}
+
+        changes = {}
+        for name, s in scored.items():
+            device = self.devices[name]
+            period = s['period']
+            weak = loss <= self.loss_high and loss > self.loss_low and s['loss'] > max(self.loss_high, 2 * loss)
+            device['lossy'] = device['lossy'] + 1 if weak else 0
+            if loss > self.loss_high:
+                period = math.ceil(period * self.backoff)
+            elif weak:
+                if device['lossy'] >= self.persist:
+                    period = math.ceil(period * self.backoff)
+            elif loss < self.loss_low:
+                period -= self.step
+            period = self.clamp(period)
+            if period != s['period']:
+                changes[name] = period
+                device['period'] = period
+                device['settling'] = True
+                device['lossy'] = 0
+        return changes
+
+    def summary(self):
+        last = self.history[-1] if self.history else {'loss': 0.0, 'rate': 0.0, 'periods': {}}
+        periods = ', '.join(f"{name} {p * PERIOD_UNIT_MS} ms" for name, p in last['periods'].items())
+        return f"{last['rate']:.1f} samples/s, loss {last['loss']:.1%} ({periods})"
+
+    async def run(self, clients, interval=5.0, verbose=True, period_uuid=MOVEMENT_PERIOD_UUID):
+        """Control loop: every ``interval`` s score the devices and write changed periods to ``clients``.
+
+        ``period_uuid`` is the characteristic taking the period byte (NRF_PERIOD_UUID for nRF IMUs).
+        """
+        while True:
+            await asyncio.sleep(interval)
+            changes = self.update()
+            for name, period in changes.items():
+                client = clients.get(name)
+                if client is None or not client.is_connected:
+                    continue
+                try:
+                    await client.write_gatt_char(period_uuid, period_bytes(period))
+                except Exception as e:
+                    print(f"{name}: period write failed - {e}")
+            if verbose:
+                print(f"Rate control: {self.summary()}")
+
+
+class SharedRadio:
+    """Shared-bandwidth model: past ``capacity`` notifications/s, delivery falls off as (capacity/offered)**collapse."""
+
+    def __init__(self, capacity=60.0, base_loss=0.01, collapse=2.0, seed=0):
+        self.capacity = capacity
+        self.base_loss = base_loss
+        self.collapse = collapse
+        self.rng = np.random.default_rng(seed)
+        self.peripherals = {}
+
+    def offered(self):
+        return sum(1000.0 / (p.period * PERIOD_UNIT_MS) for p in self.peripherals.values() if p.streaming)
+
+    def delivery_probability(self, offered=None):
+        offered = self.offered() if offered is None else offered
+        p = 1.0 - self.base_loss
+        if offered > self.capacity:
+            p *= (self.capacity / offered) ** self.collapse
+        return p
+
+    def discover(self, n):
+        """Advertisement stand-ins for ``n`` simulated tags (what BleakScanner.discover returns)."""
+        return [SimpleNamespace(name='CC2650 SensorTag (simulated)', address=f'SIM:{i + 1:02d}') for i in range(n)]
+
+    def client(self, address):
+        """BleakClient replacement: ``connect_and_stream(..., client_factory=radio.client)``."""
+        return SimulatedSensorTag(address, self)
+
+
+class SimulatedSensorTag:
+    """The subset of the BleakClient API the loggers use, backed by a ``SharedRadio``."""
+
+    def __init__(self, address, radio):
+        self.address = address
+        self.radio = radio
+        self.period = MIN_PERIOD
+        self.mtu_size = 23
+        self.is_connected = False
+        self.streaming = False
+        self._task = None
+
+    async def connect(self, timeout=10.0):
+        self.is_connected = True
+        self.radio.peripherals[self.address] = self
+        return True
+
+    async def disconnect(self):
+        await self.stop_notify(MOVEMENT_DATA_UUID)
+        self.is_connected = False
+        self.radio.peripherals.pop(self.address, None)
+        return True
+
+    async def write_gatt_char(self, uuid, data, response=False):
+        if uuid == MOVEMENT_PERIOD_UUID:
+            self.period = max(MIN_PERIOD, data[0])
+
+    async def start_notify(self, uuid, callback):
+        self.streaming = True
+        self._task = asyncio.create_task(self._notify(callback))
+
+    async def stop_notify(self, uuid):
+        self.streaming = False
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+    async def _notify(self, callback):
+        t = 0
+        while self.streaming:
+            await asyncio.sleep(self.period * PERIOD_UNIT_MS / 1000.0)
+            t += 1
+            if self.radio.rng.random() < self.radio.delivery_probability():
+                angle = t * self.period * PERIOD_UNIT_MS / 1000.0
+                values = [int(1000 * math.sin(angle + k)) for k in range(9)]
+                callback(0, bytearray(struct.pack('<hhhhhhhhh', *values)))
+
+
+def simulate(n_devices, seconds=120.0, interval=5.0, radio=None, controller=None, period=MIN_PERIOD):
+    """Virtual-clock run of ``n_devices`` tags on ``radio``; returns the controller (its history holds the trace)."""
+    radio = radio or SharedRadio()
+    controller = controller or RateController()
+    tags = [radio.client(d.address) for d in radio.discover(n_devices)]
+    for tag in tags:
+        tag.period = period
+        tag.streaming = True
+        radio.peripherals[tag.address] = tag
+        controller.add(tag.address, period, now=0.0)
+    now = 0.0
+    while now < seconds:
+        p = radio.delivery_probability()
+        for tag in tags:
+            sent = interval * 1000.0 / (tag.period * PERIOD_UNIT_MS)
+            controller.record(tag.address, int(radio.rng.binomial(int(round(sent)), p)))
+        now += interval
+        for name, new_period in controller.update(now).items():
+            radio.peripherals[name].period = new_period
+    return controller
+
+
+def steady_rate(controller, tail=0.5):
+    """Mean aggregate delivered samples/s and loss over the last ``tail`` share of a run."""
+    history = controller.history[int(len(controller.history) * (1.0 - tail)):]
+    return np.mean([h['rate'] for h in history]), np.mean([h['loss'] for h in history])
+
+
+async def live(n_devices, seconds, interval, radio):
+    """Stream from simulated tags in real time through the same control loop the logger uses."""
+    controller = RateController()
+    clients = {}
+    for d in radio.discover(n_devices):
+        client = radio.client(d.address)
+        await client.connect()
+        await client.write_gatt_char(MOVEMENT_PERIOD_UUID, period_bytes(MIN_PERIOD))
+        controller.add(d.address, MIN_PERIOD)
+        await client.start_notify(MOVEMENT_DATA_UUID, lambda _, data, name=d.address: controller.record(name))
+        clients[d.address] = client
+    task = asyncio.create_task(controller.run(clients, interval))
+    await asyncio.sleep(seconds)
+    task.cancel()
+    for client in clients.values():
+        await client.disconnect()
+    return controller
+
+
+if __name__ == '__main__':
+    p = argparse.ArgumentParser()
+    sub = p.add_subparsers(dest='command', required=True)
+    for name, help_text in [('bench', 'Fixed 100 ms vs adaptive periods on a virtual clock'),
+                            ('live', 'Real-time run against simulated SensorTags')]:
+        s = sub.add_parser(name, help=help_text)
+        s.add_argument('--devices', type=int, nargs='+', default=[1, 2, 4, 8], help='Numbers of devices to simulate')
+        s.add_argument('--capacity', type=float, default=60.0, help='Radio capacity (notifications/s, all devices)')
+        s.add_argument('--base-loss', type=float, default=0.01, help='Loss below capacity')
+        s.add_argument('--interval', type=float, default=5.0, help='Control interval (s)')
+        s.add_argument('--seconds', type=float, default=300.0, help='Run length (s)')
+    args = p.parse_args()
+
+    for n in args.devices:
+        if args.command == 'bench':
+            fixed = simulate(n, args.seconds, args.interval, SharedRadio(args.capacity, args.base_loss),
+                             RateController(adaptive=False))
+            adaptive = simulate(n, args.seconds, args.interval, SharedRadio(args.capacity, args.base_loss))
+            (fixed_rate, fixed_loss), (rate, loss) = steady_rate(fixed), steady_rate(adaptive)
+            periods = sorted(d['period'] * PERIOD_UNIT_MS for d in adaptive.devices.values())
+            print(f"{n} device(s): fixed {fixed_rate:.1f} samples/s (loss {fixed_loss:.1%}) -> "
+                  f"adaptive {rate:.1f} samples/s (loss {loss:.1%}), periods {periods} ms")
+        else:
+            controller = asyncio.run(live(n, args.seconds, args.interval, SharedRadio(args.capacity, args.base_loss)))
+            print(f"{n} device(s): {controller.summary()}")
+    print('Done!')
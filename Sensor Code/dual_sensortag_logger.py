@@ -1,9 +1,10 @@
+import argparse
 import asyncio
 import struct
 import csv
 import os
 from datetime import datetime
-from bleak import BleakClient, BleakScanner
+from ble_rate_control import MIN_PERIOD, RateController, SharedRadio, period_bytes
 
 # ====== UUIDs (CC2650 SensorTag) ======
 MOVEMENT_DATA_UUID   = "f000aa81-0451-4000-b000-000000000000"
@@ -11,29 +12,36 @@ MOVEMENT_CONFIG_UUID = "f000aa82-0451-4000-b000-000000000000"
 MOVEMENT_PERIOD_UUID = "f000aa83-0451-4000-b000-000000000000"
 
 MOVEMENT_CONFIG_BYTES = bytearray([0x7F, 0x02])
-MOVEMENT_PERIOD_BYTE  = bytearray([0x0A])  # 100ms
+MOVEMENT_PERIOD_BYTE  = period_bytes(MIN_PERIOD)  # 100ms, adapted at runtime by RateController
 
-# ====== Prepare folders ======
-os.makedirs("SensorTag_Device1", exist_ok=True)
-os.makedirs("SensorTag_Device2", exist_ok=True)
+csv_path_1 = csv_path_2 = None
+csv_file_1 = csv_file_2 = None
+writer1 = writer2 = None
 
-# ====== File setup ======
-timestamp = datetime.now().strftime('%d%m%Y_%H%M%S')
-csv_path_1 = os.path.join("SensorTag_Device1", f"device1_{timestamp}.csv")
-csv_path_2 = os.path.join("SensorTag_Device2", f"device2_{timestamp}.csv")
+# ====== Folder and file setup (on run, not on import) ======
+def open_csv_files():
+    global csv_path_1, csv_path_2, csv_file_1, csv_file_2, writer1, writer2
+    os.makedirs("SensorTag_Device1", exist_ok=True)
+    os.makedirs("SensorTag_Device2", exist_ok=True)
 
-csv_file_1 = open(csv_path_1, "w", newline="")
-csv_file_2 = open(csv_path_2, "w", newline="")
+    timestamp = datetime.now().strftime('%d%m%Y_%H%M%S')
+    csv_path_1 = os.path.join("SensorTag_Device1", f"device1_{timestamp}.csv")
+    csv_path_2 = os.path.join("SensorTag_Device2", f"device2_{timestamp}.csv")
 
-writer1 = csv.writer(csv_file_1)
-writer2 = csv.writer(csv_file_2)
+    csv_file_1 = open(csv_path_1, "w", newline="")
+    csv_file_2 = open(csv_path_2, "w", newline="")
 
-writer1.writerow(["TimeStamp", "Gx", "Gy", "Gz", "Ax", "Ay", "Az", "Mx", "My", "Mz"])
-writer2.writerow(["TimeStamp", "Gx", "Gy", "Gz", "Ax", "Ay", "Az", "Mx", "My", "Mz"])
+    writer1 = csv.writer(csv_file_1)
+    writer2 = csv.writer(csv_file_2)
+
+    writer1.writerow(["TimeStamp", "Gx", "Gy", "Gz", "Ax", "Ay", "Az", "Mx", "My", "Mz"])
+    writer2.writerow(["TimeStamp", "Gx", "Gy", "Gz", "Ax", "Ay", "Az", "Mx", "My", "Mz"])
 
 # ====== Notification callback ======
-def create_callback(writer, label):
+def create_callback(writer, label, controller=None):
     def movement_cb(_: int, data: bytearray):
+        if controller:
+            controller.record(label)
         gx, gy, gz, ax, ay, az, mx, my, mz = struct.unpack("<hhhhhhhhh", data[:18])
         timestamp = datetime.now().strftime('%H:%M:%S')
         writer.writerow([timestamp, gx, gy, gz, ax, ay, az, mx, my, mz])
@@ -45,11 +53,14 @@ def create_callback(writer, label):
     return movement_cb
 
 # ====== Connect and Stream ======
-async def connect_and_stream(tag, name, writer, retries=3):
+async def connect_and_stream(tag, name, writer, controller=None, retries=3, client_factory=None):
+    if client_factory is None:
+        from bleak import BleakClient
+        client_factory = BleakClient
     for attempt in range(retries):
         try:
             print(f"Attempting connection to {name} ({tag.address})... Try {attempt + 1}")
-            client = BleakClient(tag.address)
+            client = client_factory(tag.address)
             await client.connect(timeout=10.0)
 
             if not client.is_connected:
@@ -65,7 +76,9 @@ async def connect_and_stream(tag, name, writer, retries=3):
             await client.write_gatt_char(MOVEMENT_CONFIG_UUID, MOVEMENT_CONFIG_BYTES)
             await client.write_gatt_char(MOVEMENT_PERIOD_UUID,  MOVEMENT_PERIOD_BYTE)
 
-            await client.start_notify(MOVEMENT_DATA_UUID, create_callback(writer, name))
+            if controller:
+                controller.add(name, MOVEMENT_PERIOD_BYTE[0])
+            await client.start_notify(MOVEMENT_DATA_UUID, create_callback(writer, name, controller))
             print(f"{name}: Streaming IMU data...")
 
             return client
@@ -78,9 +91,17 @@ async def connect_and_stream(tag, name, writer, retries=3):
     return None
 
 # ====== Main ======
-async def main():
-    print("Scanning for SensorTags…")
-    devices = await BleakScanner.discover(timeout=30.0)
+async def main(adaptive=True, simulate=False):
+    controller = RateController(adaptive=adaptive)
+    client_factory = None
+    if simulate:
+        radio = SharedRadio()
+        client_factory = radio.client
+        devices = radio.discover(2)
+    else:
+        from bleak import BleakScanner
+        print("Scanning for SensorTags…")
+        devices = await BleakScanner.discover(timeout=30.0)
     tags = [d for d in devices if d.name and ("CC2650" in d.name or "SensorTag" in d.name)]
 
     if len(tags) < 2:
@@ -91,19 +112,23 @@ async def main():
     print(f"Found Device 1: {tag1.name} @ {tag1.address}")
     print(f"Found Device 2: {tag2.name} @ {tag2.address}")
 
-    client1 = await connect_and_stream(tag1, "Device 1", writer1)
+    client1 = await connect_and_stream(tag1, "Device 1", writer1, controller, client_factory=client_factory)
     await asyncio.sleep(2)
-    client2 = await connect_and_stream(tag2, "Device 2", writer2)
+    client2 = await connect_and_stream(tag2, "Device 2", writer2, controller, client_factory=client_factory)
 
     if not client1 or not client2:
         print("One or both devices failed to connect.")
         return
 
+    # Adjust the sampling periods to the loss seen on the shared adapter
+    control = asyncio.create_task(controller.run({"Device 1": client1, "Device 2": client2}))
+
     try:
         await asyncio.Event().wait()  # Run until stopped manually
     except KeyboardInterrupt:
         print("\nKeyboardInterrupt: Stopping notifications...")
     finally:
+        control.cancel()
         if client1:
             await client1.stop_notify(MOVEMENT_DATA_UUID)
             await client1.disconnect()
@@ -114,8 +139,13 @@ async def main():
         print("Disconnected.")
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--fixed-period", action="store_true", help="Keep the 100 ms period (no rate control)")
+    parser.add_argument("--simulate", action="store_true", help="Stream from simulated SensorTags on a modelled radio")
+    args = parser.parse_args()
+    open_csv_files()
     try:
-        asyncio.run(main())
+        asyncio.run(main(adaptive=not args.fixed_period, simulate=args.simulate))
     finally:
         csv_file_1.close()
         csv_file_2.close()
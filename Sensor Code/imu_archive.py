@@ -0,0 +1,335 @@
+"""
+Compact archive format (.imua) for raw IMU streams written by the loggers.
+
+The logger CSVs repeat a text timestamp and spell out every sample as text. An
+archive stores the same table in chunks of rows:
+  - the timestamp as milliseconds since the session start
+  - every sensor column (Gx..Mz, BPM, ...) as integers: SensorTag int16 values
+    directly, nRF float values quantized to the decimal step they were logged
+    with (e.g. 0.01 for "9.81"), so the round trip is exact
+  - missing values (an empty Position on unlabelled rows, BPM before the first
+    heart-rate reading) kept through a validity mask column per nullable
+    column; the value itself is carried forward from the last valid one
+  - each column delta-encoded, zigzag-mapped and written as LEB128 varints,
+    then zlib-compressed per chunk
+
+A footer holds the chunk index (byte offset, row count, first/last time), so a
+time-range read only decompresses the chunks that overlap it. Encoding and
+decoding are vectorized with NumPy (no per-sample Python loop).
+
+Layout: MAGIC | chunk bytes ... | footer JSON | footer length (8 bytes, little endian) | MAGIC
+
+Usage:
+  python imu_archive.py pack sensor_csv_data/device_1/*.csv --output archive/
+  python imu_archive.py unpack archive/sensor_data_nRF_IMU_1_19092025_164551.imua --output restored.csv
+  python imu_archive.py read archive/sensor_data_nRF_IMU_1_19092025_164551.imua --start 16:50:00 --end 16:55:00
+  python imu_archive.py bench sensor_csv_data/device_1/*.csv
+"""
+import argparse
+import json
+import os
+import re
+import struct
+import time
+import zlib
+from datetime import datetime
+import numpy as np
+import pandas as pd
+from sensor_loader import load_logger_csv
+
+MAGIC = b'IMUA'
+FORMAT_VERSION = 2
+READABLE_VERSIONS = (1, 2)
+ARCHIVE_SUFFIX = '.imua'
+CHUNK_ROWS = 4096
+TIME_COLUMNS = ['TimeStamp', 'timestamp_iso']
+MAX_DECIMALS = 6
+SESSION_PATTERN = re.compile(r'(\d{8}_\d{6})')
+
+
+def zigzag(v):
+    """Map signed int64 to unsigned so small magnitudes get small codes (0, -1, 1, -2 -> 0, 1, 2, 3)."""
+    v = v.astype(np.int64)
+    return ((v << 1) ^ (v >> 63)).astype(np.uint64)
+
+
+def unzigzag(u):
+    return (u >> np.uint64(1)).astype(np.int64) ^ -(u & np.uint64(1)).astype(np.int64)
+
+
+def encode_varints(u):
+    """LEB128-encode an array of uint64 values into bytes (7 bits per byte, high bit = continue)."""
+    u = np.asarray(u, dtype=np.uint64)
+    nbytes = np.ones(len(u), dtype=np.int64)
+    for k in range(1, 10):
+        nbytes += u >= np.uint64(1 << (7 * k))
+    starts = np.cumsum(nbytes) - nbytes
+    out = np.zeros(int(nbytes.sum()), dtype=np.uint8)
+    for k in range(int(nbytes.max()) if len(u) else 0):
+        has = nbytes > k
+        byte = ((u[has] >> np.uint64(7 * k)) & np.uint64(0x7F)).astype(np.uint8)
+        byte[nbytes[has] > k + 1] |= 0x80
+        out[starts[has] + k] = byte
+    return out.tobytes()
+
+
+def decode_varints(buf):
+    """Decode a LEB128 byte string back to uint64 values."""
+    b = np.frombuffer(buf, dtype=np.uint8)
+    if not len(b):
+        return np.empty(0, dtype=np.uint64)
+    last = (b & 0x80) == 0
+    value_idx = np.concatenate(([0], np.cumsum(last)[:-1]))
+    starts = np.flatnonzero(np.concatenate(([True], last[:-1])))
+    shift = (np.arange(len(b)) - starts[value_idx]) * 7
+    parts = (b & 0x7F).astype(np.uint64) << shift.astype(np.uint64)
+    return np.add.reduceat(parts, starts)
+
+
+def decimal_step(values):
+    """Largest step 10**-d (d <= MAX_DECIMALS) that represents every value exactly."""
+    v = np.asarray(values, dtype=np.float64)
+    for d in range(MAX_DECIMALS + 1):
+        scaled = v * 10 ** d
+        if np.all(np.abs(scaled - np.round(scaled)) < 1e-6 * np.maximum(1.0, np.abs(scaled))):
+            return 10.0 ** -d
+    return 10.0 ** -MAX_DECIMALS
+
+
+def session_start(path, default=None):
+    """Session start from a logger file name (..._ddmmYYYY_HHMMSS.csv)."""
+    m = SESSION_PATTERN.search(os.path.basename(path))
+    if m:
+        return datetime.strptime(m.group(1), '%d%m%Y_%H%M%S')
+    return default or datetime(1970, 1, 1)
+
+
+def to_milliseconds(stamps, start):
+    """Text timestamps -> int64 ms since ``start``; returns (ms, time format).
+
+    HH:MM:SS stamps carry no date, so they are placed on the session day and
+    rolled over midnight whenever they go backwards.
+    """
+    stamps = pd.Series(stamps).astype(str)
+    hms = stamps.str.fullmatch(r'\d{1,2}:\d{2}:\d{2}').all()
+    if hms:
+        secs = pd.to_timedelta(stamps).dt.total_seconds().to_numpy()
+        day0 = (start - start.replace(hour=0, minute=0, second=0, microsecond=0)).total_seconds()
+        secs = secs - day0
+        secs += 86400.0 * np.cumsum(np.concatenate(([0], np.diff(secs) < -43200)))
+        return np.round(secs * 1000).astype(np.int64), 'hms'
+    parsed = pd.to_datetime(stamps, format='ISO8601')
+    return ((parsed - pd.Timestamp(start)).dt.total_seconds().to_numpy() * 1000).round().astype(np.int64), 'iso'
+
+
+_HMS_STRINGS = None
+
+
+def from_milliseconds(ms, start, fmt):
+    """Inverse of ``to_milliseconds``; HH:MM:SS strings come from a lookup table, not strftime."""
+    global _HMS_STRINGS
+    if fmt == 'hms':
+        if _HMS_STRINGS is None:
+            _HMS_STRINGS = np.array([f"{s // 3600:02d}:{s // 60 % 60:02d}:{s % 60:02d}" for s in range(86400)],
+                                    dtype=object)
+        day0 = (start - start.replace(hour=0, minute=0, second=0, microsecond=0)).total_seconds()
+        return _HMS_STRINGS[(ms // 1000 + int(day0)) % 86400]
+    times = pd.Timestamp(start) + pd.to_timedelta(ms, unit='ms')
+    return times.strftime('%Y-%m-%dT%H:%M:%S.%f')
+
+
+def _encode_chunk(ms, ints):
+    """Delta + zigzag + varint for the time column and every value column, then zlib."""
+    columns = [ms] + [ints[:, j] for j in range(ints.shape[1])]
+    deltas = np.concatenate([np.diff(c, prepend=np.int64(0)) for c in columns])
+    return zlib.compress(encode_varints(zigzag(deltas)), 6)
+
+
+def _decode_chunk(blob, rows, width):
+    deltas = unzigzag(decode_varints(zlib.decompress(blob))).reshape(width + 1, rows)
+    return np.cumsum(deltas, axis=1)
+
+
+def write_archive(data, path, start=None, chunk_rows=CHUNK_ROWS):
+    """Write a logger DataFrame (time column + numeric sensor columns) to ``path``."""
+    time_col = next((c for c in TIME_COLUMNS if c in data.columns), None)
+    if time_col is None:
+        raise ValueError(f"No time column ({', '.join(TIME_COLUMNS)}) in archive input")
+    columns = [c for c in data.columns if c != time_col]
+    values = data[columns].to_numpy(dtype=np.float64)
+    missing = np.isnan(values)
+    nullable = [j for j in range(len(columns)) if missing[:, j].any()]
+    start = start or datetime(1970, 1, 1)
+    ms, time_format = to_milliseconds(data[time_col], start)
+    steps = [decimal_step(values[~missing[:, j], j]) for j in range(len(columns))]
+    # Gaps repeat the last valid value (zero deltas); the validity masks go after the value columns
+    filled = pd.DataFrame(values).ffill().fillna(0.0).to_numpy() if nullable else values
+    ints = np.round(filled / np.array(steps)).astype(np.int64)
+    if nullable:
+        ints = np.hstack([ints, (~missing[:, nullable]).astype(np.int64)])
+
+    chunks = []
+    tmp = path + '.tmp'
+    with open(tmp, 'wb') as f:
+        f.write(MAGIC)
+        for i in range(0, len(data), chunk_rows):
+            blob = _encode_chunk(ms[i:i + chunk_rows], ints[i:i + chunk_rows])
+            chunks.append({'offset': f.tell(), 'size': len(blob), 'rows': int(min(chunk_rows, len(data) - i)),
+                           't_first': int(ms[i]), 't_last': int(ms[min(i + chunk_rows, len(data)) - 1])})
+            f.write(blob)
+        footer = json.dumps({'version': FORMAT_VERSION, 'start': start.isoformat(), 'time_column': time_col,
+                             'time_format': time_format, 'columns': columns, 'steps': steps,
+                             'nullable': [columns[j] for j in nullable],
+                             'rows': len(data), 'chunks': chunks}).encode()
+        f.write(footer)
+        f.write(struct.pack('<Q', len(footer)))
+        f.write(MAGIC)
+    os.replace(tmp, path)
+    return path
+
+
+class ArchiveReader:
+    """Random access to an .imua file through its chunk index."""
+
+    def __init__(self, path):
+        self.path = path
+        with open(path, 'rb') as f:
+            f.seek(-12, os.SEEK_END)
+            length, magic = struct.unpack('<Q4s', f.read(12))
+            if magic != MAGIC:
+                raise ValueError(f"{path} is not an IMU archive")
+            f.seek(-12 - length, os.SEEK_END)
+            self.meta = json.loads(f.read(length))
+        if self.meta['version'] not in READABLE_VERSIONS:
+            raise ValueError(f"Unsupported archive version {self.meta['version']} in {path}")
+        self.start = datetime.fromisoformat(self.meta['start'])
+        self.columns = self.meta['columns']
+        self.steps = np.array(self.meta['steps'], dtype=np.float64)
+        self.chunks = self.meta['chunks']
+        self.nullable = self.meta.get('nullable', [])
+
+    def __len__(self):
+        return self.meta['rows']
+
+    def _to_ms(self, t):
+        """Seconds since session start, or an HH:MM:SS / ISO time string."""
+        if t is None or isinstance(t, (int, float)):
+            return None if t is None else int(round(t * 1000))
+        if re.fullmatch(r'\d{1,2}:\d{2}:\d{2}', t):
+            day = self.start.replace(hour=0, minute=0, second=0, microsecond=0)
+            ms = int((day + pd.to_timedelta(t) - self.start).total_seconds() * 1000)
+            return ms if ms >= 0 else ms + 86_400_000
+        return int((pd.Timestamp(t) - pd.Timestamp(self.start)).total_seconds() * 1000)
+
+    def read(self, start=None, end=None):
+        """Rows with start <= time <= end as a DataFrame in the original CSV layout."""
+        lo, hi = self._to_ms(start), self._to_ms(end)
+        selected = [c for c in self.chunks
+                    if (lo is None or c['t_last'] >= lo) and (hi is None or c['t_first'] <= hi)]
+        width = len(self.columns) + len(self.nullable)
+        blocks = []
+        with open(self.path, 'rb') as f:
+            for c in selected:
+                f.seek(c['offset'])
+                blocks.append(_decode_chunk(f.read(c['size']), c['rows'], width))
+        decoded = np.concatenate(blocks, axis=1) if blocks else np.empty((width + 1, 0), dtype=np.int64)
+        ms = decoded[0]
+        keep = np.ones(len(ms), dtype=bool)
+        if lo is not None:
+            keep &= ms >= lo
+        if hi is not None:
+            keep &= ms <= hi
+        n = len(self.columns)
+        values = decoded[1:1 + n, keep].T * self.steps
+        data = pd.DataFrame(values.astype(np.float32), columns=self.columns)
+        for j, step in enumerate(self.steps):
+            if step == 1.0 and self.columns[j] not in self.nullable:
+                data[self.columns[j]] = decoded[1 + j, keep]
+        for k, column in enumerate(self.nullable):
+            data.loc[decoded[1 + n + k, keep] == 0, column] = np.nan
+        data.insert(0, self.meta['time_column'], from_milliseconds(ms[keep], self.start, self.meta['time_format']))
+        return data
+
+
+def read_archive(path, start=None, end=None):
+    return ArchiveReader(path).read(start, end)
+
+
+def read_sensor_file(path):
+    """Load a logger recording from either its CSV or its .imua archive.
+
+    CSVs in a known logger layout go through the validating sensor_loader;
+    anything else (e.g. already merged tables) is read as-is.
+    """
+    if path.endswith(ARCHIVE_SUFFIX):
+        return read_archive(path)
+    try:
+        return load_logger_csv(path)
+    except ValueError:
+        return pd.read_csv(path)
+
+
+def pack_csv(csv_path, output_dir=None, chunk_rows=CHUNK_ROWS):
+    name = os.path.splitext(os.path.basename(csv_path))[0] + ARCHIVE_SUFFIX
+    out = os.path.join(output_dir or os.path.dirname(csv_path), name)
+    # load_logger_csv already drops rows missing a required sensor value. Optional columns
+    # (BPM before the first heart-rate reading, or never filled) and an empty Position on
+    # unlabelled rows are kept and stored through validity masks.
+    data = load_logger_csv(csv_path)
+    return write_archive(data, out, session_start(csv_path), chunk_rows)
+
+
+if __name__ == '__main__':
+    p = argparse.ArgumentParser()
+    sub = p.add_subparsers(dest='command', required=True)
+    pk = sub.add_parser('pack', help='Convert logger CSVs to archives')
+    pk.add_argument('inputs', nargs='+', help='Logger CSV files')
+    pk.add_argument('--output', default=None, help='Output directory (default: next to each CSV)')
+    pk.add_argument('--chunk-rows', type=int, default=CHUNK_ROWS, help='Rows per chunk')
+    up = sub.add_parser('unpack', help='Convert an archive back to CSV')
+    up.add_argument('archive', help='Archive file')
+    up.add_argument('--output', required=True, help='Output CSV')
+    rd = sub.add_parser('read', help='Print a time range of an archive')
+    rd.add_argument('archive', help='Archive file')
+    rd.add_argument('--start', default=None, help='Start time (HH:MM:SS, ISO or seconds from session start)')
+    rd.add_argument('--end', default=None, help='End time')
+    bn = sub.add_parser('bench', help='Compare size and load time of CSV and archive')
+    bn.add_argument('inputs', nargs='+', help='Logger CSV files')
+    args = p.parse_args()
+
+    def parse_time(t):
+        try:
+            return float(t)
+        except (TypeError, ValueError):
+            return t
+
+    if args.command == 'pack':
+        if args.output:
+            os.makedirs(args.output, exist_ok=True)
+        for path in args.inputs:
+            out = pack_csv(path, args.output, args.chunk_rows)
+            print(f"{path} -> {out} ({os.path.getsize(path) / max(os.path.getsize(out), 1):.1f}x smaller)")
+    elif args.command == 'unpack':
+        read_archive(args.archive).to_csv(args.output, index=False)
+        print(f"Wrote {args.output}")
+    elif args.command == 'read':
+        print(read_archive(args.archive, parse_time(args.start), parse_time(args.end)).to_string(index=False))
+    else:
+        import tempfile
+        csv_bytes = archive_bytes = csv_secs = archive_secs = 0.0
+        with tempfile.TemporaryDirectory() as tmp:
+            for path in args.inputs:
+                out = pack_csv(path, tmp)
+                t0 = time.perf_counter()
+                pd.read_csv(path)
+                csv_secs += time.perf_counter() - t0
+                t0 = time.perf_counter()
+                read_archive(out)
+                archive_secs += time.perf_counter() - t0
+                csv_bytes += os.path.getsize(path)
+                archive_bytes += os.path.getsize(out)
+        print(f"Size: {csv_bytes / 1e6:.2f} MB CSV -> {archive_bytes / 1e6:.2f} MB archive "
+              f"({csv_bytes / max(archive_bytes, 1):.1f}x)")
+        print(f"Load: {csv_secs * 1000:.0f} ms CSV -> {archive_secs * 1000:.0f} ms archive "
+              f"({csv_secs / max(archive_secs, 1e-9):.1f}x)")
+    print('Done!')
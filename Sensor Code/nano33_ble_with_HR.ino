@@ -8,6 +8,9 @@
 // Accelerometer Service and Characteristic UUIDs
 BLEService accelService("A000");
 BLECharacteristic accelChar("A001", BLERead | BLENotify, 32); // String format for accel data
+// Sampling period in 10 ms units (same encoding as the SensorTag period register), writable by the central
+BLEByteCharacteristic periodChar("A002", BLERead | BLEWrite);
+#define MIN_PERIOD 1 // 10 ms
 
 // Gyroscope Service and Characteristic UUIDs
 BLEService gyroService("B000");
@@ -53,6 +56,7 @@ void setup() {
 
   // Add characteristics to services
   accelService.addCharacteristic(accelChar);
+  accelService.addCharacteristic(periodChar);
   gyroService.addCharacteristic(gyroChar);
   magService.addCharacteristic(magChar);
   heartService.addCharacteristic(heartChar);
@@ -68,6 +72,7 @@ void setup() {
   gyroChar.writeValue("0.00,0.00,0.00");
   magChar.writeValue("0.00,0.00,0.00");
   heartChar.writeValue("0");
+  periodChar.writeValue(10); // 100 ms
 
   // Start advertising
   BLE.advertise();
@@ -167,7 +172,8 @@ void loop() {
         Serial.println("Heart Rate: Not available");
       }
 
-      delay(100); // Adjust for desired update rate
+      // Update rate set by the central through periodChar (default 100 ms)
+      delay(max((int)periodChar.value(), MIN_PERIOD) * 10);
     }
 
     Serial.print("Disconnected from central: ");
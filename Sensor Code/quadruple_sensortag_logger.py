@@ -1,12 +1,10 @@
+import argparse
 import asyncio
 import csv
 import logging
 import os
 from datetime import datetime
-from bleak import BleakClient, BleakScanner, BleakError
-
-# Enable debug logging
-logging.basicConfig(level=logging.DEBUG, format='%(asctime)s - %(levelname)s - %(message)s')
+from ble_rate_control import MIN_PERIOD, NRF_PERIOD_UUID, RateController, period_bytes
 
 # UUIDs (matching Arduino code)
 DEVICE_NAME_1 = "nRF_IMU_1"
@@ -16,6 +14,8 @@ DEVICE_NAME_4 = "nRF_IMU"
 ACCEL_CHAR_UUID = "0000A001-0000-1000-8000-00805F9B34FB"
 GYRO_CHAR_UUID = "0000B001-0000-1000-8000-00805F9B34FB"
 MAG_CHAR_UUID = "0000C001-0000-1000-8000-00805F9B34FB"
+HEART_CHAR_UUID = "0000D001-0000-1000-8000-00805F9B34FB"
+IMU_KEYS = ["accel", "gyro", "mag"]
 
 # Folder setup
 BASE_FOLDER = "sensor_csv_data"
@@ -24,11 +24,6 @@ DEVICE_2_FOLDER = os.path.join(BASE_FOLDER, "device_2")
 DEVICE_3_FOLDER = os.path.join(BASE_FOLDER, "device_3")
 DEVICE_4_FOLDER = os.path.join(BASE_FOLDER, "device_4")
 
-# Create folders if they don't exist
-for folder in [DEVICE_1_FOLDER, DEVICE_2_FOLDER, DEVICE_3_FOLDER, DEVICE_4_FOLDER]:
-    if not os.path.exists(folder):
-        os.makedirs(folder)
-
 # CSV file setup
 timestamp = datetime.now().strftime('%d%m%Y_%H%M%S')
 CSV_PATH_1 = os.path.join(DEVICE_1_FOLDER, f"sensor_data_nRF_IMU_1_{timestamp}.csv")
@@ -36,27 +31,34 @@ CSV_PATH_2 = os.path.join(DEVICE_2_FOLDER, f"sensor_data_nRF_IMU_2_{timestamp}.c
 CSV_PATH_3 = os.path.join(DEVICE_3_FOLDER, f"sensor_data_nRF_IMU_3_{timestamp}.csv")
 CSV_PATH_4 = os.path.join(DEVICE_4_FOLDER, f"sensor_data_nRF_IMU_{timestamp}.csv")
 
-# Initialize CSV files and writers
+# CSV files and writers, opened by open_csv_files() when the logger runs (not on import)
 csv_files = {}
 writers = {}
-for path, label in [(CSV_PATH_1, "Device 1"), (CSV_PATH_2, "Device 2"), (CSV_PATH_3, "Device 3"), (CSV_PATH_4, "Device 4")]:
-    csv_files[label] = open(path, "w", newline="")
-    writers[label] = csv.writer(csv_files[label])
-    writers[label].writerow(["TimeStamp", "Ax", "Ay", "Az", "Gx", "Gy", "Gz", "Mx", "My", "Mz"])
-    csv_files[label].flush()
 
-# Buffer to store latest sensor data for each device
+def open_csv_files():
+    # Create folders if they don't exist
+    for folder in [DEVICE_1_FOLDER, DEVICE_2_FOLDER, DEVICE_3_FOLDER, DEVICE_4_FOLDER]:
+        if not os.path.exists(folder):
+            os.makedirs(folder)
+    for path, label in [(CSV_PATH_1, "Device 1"), (CSV_PATH_2, "Device 2"), (CSV_PATH_3, "Device 3"), (CSV_PATH_4, "Device 4")]:
+        csv_files[label] = open(path, "w", newline="")
+        writers[label] = csv.writer(csv_files[label])
+        writers[label].writerow(["TimeStamp", "Ax", "Ay", "Az", "Gx", "Gy", "Gz", "Mx", "My", "Mz", "BPM"])
+        csv_files[label].flush()
+
+# Buffer to store latest sensor data for each device (heart is the last BPM reading, kept across rows)
 sensor_data = {
-    "Device 1": {"accel": None, "gyro": None, "mag": None},
-    "Device 2": {"accel": None, "gyro": None, "mag": None},
-    "Device 3": {"accel": None, "gyro": None, "mag": None},
-    "Device 4": {"accel": None, "gyro": None, "mag": None}
+    "Device 1": {"accel": None, "gyro": None, "mag": None, "heart": None},
+    "Device 2": {"accel": None, "gyro": None, "mag": None, "heart": None},
+    "Device 3": {"accel": None, "gyro": None, "mag": None, "heart": None},
+    "Device 4": {"accel": None, "gyro": None, "mag": None, "heart": None}
 }
 
 async def write_csv(timestamp, sensor_data, writer, csv_file, device_label):
-    """Write to CSV only if all sensor data is available."""
-    if all(sensor_data.values()):
-        writer.writerow([timestamp, *sensor_data["accel"], *sensor_data["gyro"], *sensor_data["mag"]])
+    """Write to CSV only if all IMU data is available (BPM is empty until the first heart-rate reading)."""
+    if all(sensor_data[key] for key in IMU_KEYS):
+        bpm = sensor_data["heart"] if sensor_data["heart"] is not None else ""
+        writer.writerow([timestamp, *sensor_data["accel"], *sensor_data["gyro"], *sensor_data["mag"], bpm])
         csv_file.flush()
         print(f"Data written for {device_label} at {timestamp}: A={sensor_data['accel']}, G={sensor_data['gyro']}, M={sensor_data['mag']}")
         # Reset buffer
@@ -66,7 +68,7 @@ async def write_csv(timestamp, sensor_data, writer, csv_file, device_label):
     else:
         logging.debug(f"Skipping CSV write for {device_label}, incomplete data: {sensor_data}")
 
-def notification_handler(sender, data, device_label, sensor_data, writer, csv_file):
+def notification_handler(sender, data, device_label, sensor_data, writer, csv_file, controller=None):
     """Handle incoming BLE notifications, print to console, and schedule CSV write."""
     logging.debug(f"Received data from {device_label} ({sender.uuid}): {data.hex()}")
     try:
@@ -75,6 +77,9 @@ def notification_handler(sender, data, device_label, sensor_data, writer, csv_fi
         logging.info(f"{device_label} received: {value}")
         
         if sender.uuid.lower() == ACCEL_CHAR_UUID.lower():
+            # One accelerometer notification per sampling period
+            if controller:
+                controller.record(device_label)
             values = value.split(" ")[1].split(",")
             ax, ay, az = map(float, values)
             sensor_data["accel"] = [ax, ay, az]
@@ -94,16 +99,22 @@ def notification_handler(sender, data, device_label, sensor_data, writer, csv_fi
             sensor_data["mag"] = [mx, my, mz]
             print(f"{device_label} Magnetometer: x={mx:.2f}, y={my:.2f}, z={mz:.2f} uT")
             asyncio.create_task(write_csv(timestamp, sensor_data, writer, csv_file, device_label))
+
+        elif sender.uuid.lower() == HEART_CHAR_UUID.lower():
+            sensor_data["heart"] = int(value.split(" ")[1])
+            print(f"{device_label} Heart Rate: {sensor_data['heart']} bpm")
             
     except (UnicodeDecodeError, ValueError, IndexError) as e:
         logging.error(f"Error processing data from {device_label} ({sender.uuid}): {e}, Raw data: {data.hex()}")
         # Write placeholder data only if no valid data has been written recently
         timestamp = datetime.now().strftime('%H:%M:%S')
-        if not any(sensor_data.values()):  # Only write if buffer is empty
+        if not any(sensor_data[key] for key in IMU_KEYS):  # Only write if buffer is empty
             asyncio.create_task(write_csv(timestamp, sensor_data, writer, csv_file, device_label))
 
-async def connect_and_subscribe(device, device_label, max_retries=3):
+async def connect_and_subscribe(device, device_label, controller=None, clients=None, max_retries=3):
     """Attempt to connect to the device and subscribe to notifications with retries."""
+    from bleak import BleakClient, BleakError
+
     for attempt in range(1, max_retries + 1):
         try:
             async with BleakClient(device.address, timeout=30.0) as client:
@@ -114,11 +125,22 @@ async def connect_and_subscribe(device, device_label, max_retries=3):
                     logging.error(f"Client not connected after initialization for {device_label}")
                     continue
                 
+                # Start at 100 ms; the rate controller adapts the period through A002 from here
+                adaptive = controller is not None
+                if adaptive:
+                    try:
+                        await client.write_gatt_char(NRF_PERIOD_UUID, period_bytes(MIN_PERIOD))
+                        controller.add(device_label, MIN_PERIOD)
+                        clients[device_label] = client
+                    except Exception as e:
+                        adaptive = False
+                        logging.warning(f"{device_label} has no writable sampling period (A002), keeping its fixed rate: {e}")
+
                 # Subscribe to notifications with delay
                 subscribed_uuids = []
-                for uuid in [ACCEL_CHAR_UUID, GYRO_CHAR_UUID, MAG_CHAR_UUID]:
+                for uuid in [ACCEL_CHAR_UUID, GYRO_CHAR_UUID, MAG_CHAR_UUID, HEART_CHAR_UUID]:
                     try:
-                        await client.start_notify(uuid, lambda sender, data: notification_handler(sender, data, device_label, sensor_data[device_label], writers[device_label], csv_files[device_label]))
+                        await client.start_notify(uuid, lambda sender, data: notification_handler(sender, data, device_label, sensor_data[device_label], writers[device_label], csv_files[device_label], controller if adaptive else None))
                         logging.info(f"Successfully subscribed to {uuid} for {device_label}")
                         subscribed_uuids.append(uuid)
                         await asyncio.sleep(0.5)
@@ -155,8 +177,15 @@ async def connect_and_subscribe(device, device_label, max_retries=3):
         except Exception as e:
             logging.error(f"Unexpected error during connection for {device_label}: {e}")
             return
+        finally:
+            # A disconnected device must not count as lost samples for the others
+            if controller is not None:
+                controller.remove(device_label)
+                clients.pop(device_label, None)
+
+async def main(adaptive=True):
+    from bleak import BleakScanner
 
-async def main():
     print("Scanning for nRF_IMU_1, nRF_IMU_2, nRF_IMU_3, and nRF_IMU...")
     devices = {
         "Device 1": None,
@@ -188,11 +217,19 @@ async def main():
         for label, dev in found_devices.items():
             print(f"{dev.name} ({dev.address}) as {label}")
 
+        # The devices share one adapter: adjust their sampling periods to the loss seen on it
+        controller = RateController(adaptive=adaptive)
+        clients = {}
+        control = asyncio.create_task(controller.run(clients, period_uuid=NRF_PERIOD_UUID))
+
         # Create connection tasks for all found devices
-        tasks = [connect_and_subscribe(dev, label) for label, dev in found_devices.items()]
+        tasks = [connect_and_subscribe(dev, label, controller, clients) for label, dev in found_devices.items()]
 
         # Run connection tasks concurrently
-        await asyncio.gather(*tasks, return_exceptions=True)
+        try:
+            await asyncio.gather(*tasks, return_exceptions=True)
+        finally:
+            control.cancel()
         
     except Exception as e:
         logging.error(f"Error in main loop: {e}")
@@ -209,4 +246,10 @@ async def main():
                 print(f"Saved Device 4 data to {CSV_PATH_4}")
 
 if __name__ == "__main__":
-    asyncio.run(main())
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Log up to four nRF IMUs (nRF_IMU_1..3, nRF_IMU) to sensor_csv_data/device_N")
+    parser.add_argument("--fixed-period", action="store_true", help="Keep the 100 ms period (no rate control)")
+    args = parser.parse_args()
+    # Enable debug logging
+    logging.basicConfig(level=logging.DEBUG, format='%(asctime)s - %(levelname)s - %(message)s')
+    open_csv_files()
+    asyncio.run(main(adaptive=not args.fixed_period))
\ No newline at end of file
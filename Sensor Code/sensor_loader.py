@@ -0,0 +1,152 @@
+"""
+Schema-aware, validating CSV loader for the logger outputs.
+
+Each logger in this folder writes its own layout:
+  nano         Nano_ble_sensor_tag.py.py     TimeStamp, Gx..Gz, Ax..Az, Mx..Mz, BPM   (float values)
+  sensortag    dual_sensortag_logger.py      TimeStamp, Gx..Gz, Ax..Az, Mx..Mz        (raw int16)
+  quadruple    quadruple_sensortag_logger.py TimeStamp, Ax..Az, Gx..Gz, Mx..Mz[, BPM] (float values)
+  ti_raw       TI_sensor_IMU.py              timestamp_iso, gyro_*_raw, acc_*_raw, mag_*_raw (raw int16)
+Hand-labelled copies add a Position column (and often an empty "Unnamed: N"
+column from a trailing comma). Optional columns (the quadruple logger's BPM,
+empty until the first heart-rate reading) are kept but may be missing.
+
+``load_logger_csv`` detects the layout from the header, reads only the known
+columns with pyarrow's CSV reader and compact dtypes (float32 / int16 values,
+dictionary-encoded (categorical) timestamps), then validates in vectorized form: rows with a
+malformed timestamp, missing sensor values or int16 values out of range are
+dropped, as are truncated lines (int16 layouts holding float values stay
+float32). Columns are returned in the file's order (``canonical=True``
+reorders quadruple files to the Gx..Mz order of the other loggers).
+
+Usage:
+  python sensor_loader.py sensor_csv_data/device_1/*.csv
+  python sensor_loader.py sensor_csv_data/device_1/*.csv --bench
+"""
+import argparse
+import time
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.csv as pacsv
+
+AXES = ['x', 'y', 'z']
+IMU_GAM = [f'{s}{a}' for s in 'GAM' for a in AXES]
+IMU_AGM = [f'{s}{a}' for s in 'AGM' for a in AXES]
+LABEL_COLUMN = 'Position'
+
+SCHEMAS = {
+    'nano': {'time': 'TimeStamp', 'values': IMU_GAM + ['BPM'], 'dtype': 'float32'},
+    'sensortag': {'time': 'TimeStamp', 'values': IMU_GAM, 'dtype': 'int16'},
+    'quadruple': {'time': 'TimeStamp', 'values': IMU_AGM, 'optional': ['BPM'], 'dtype': 'float32'},
+    'ti_raw': {'time': 'timestamp_iso',
+               'values': [f'{s}_{a}_raw' for s in ('gyro', 'acc', 'mag') for a in AXES], 'dtype': 'int16'},
+}
+TIME_PATTERNS = {'TimeStamp': r'^\d{2}:\d{2}:\d{2}$',
+                 'timestamp_iso': r'^\d{4}-\d{2}-\d{2}T\d{2}:\d{2}:\d{2}(\.\d+)?$'}
+
+
+def read_header(path):
+    with open(path, newline='') as f:
+        return [c.strip() for c in f.readline().rstrip('\r\n').split(',')]
+
+
+def detect_schema(columns):
+    """Name of the logger layout matching a header (extra Position/Unnamed columns allowed)."""
+    for name, schema in SCHEMAS.items():
+        if schema['time'] not in columns:
+            continue
+        present = [c for c in columns if c in schema['values']]
+        if present == schema['values']:
+            return name
+    raise ValueError(f"Unknown logger CSV layout: {columns}")
+
+
+def read_columns(path, columns, time_col):
+    """Read ``columns`` with the pyarrow CSV reader; returns (DataFrame, number of truncated lines skipped).
+
+    Values are read as float32 (int16 is applied after validation); a file with
+    non-numeric junk in a value column is re-read as text and coerced to NaN.
+    """
+    truncated = []
+
+    def skip(row):
+        truncated.append(row.number)
+        return 'skip'
+
+    def read(types):
+        truncated.clear()
+        convert = pacsv.ConvertOptions(include_columns=columns, column_types=types,
+                                       strings_can_be_null=True, timestamp_parsers=[])
+        table = pacsv.read_csv(path, parse_options=pacsv.ParseOptions(invalid_row_handler=skip),
+                               convert_options=convert)
+        return table.to_pandas(types_mapper={pa.string(): pd.ArrowDtype(pa.string())}.get)
+
+    types = {c: pa.float32() for c in columns}
+    # Timestamps repeat for every sample within a second: dictionary-encode them (a pandas Categorical)
+    types[time_col] = pa.dictionary(pa.int32(), pa.string())
+    try:
+        data = read(types)
+    except pa.ArrowInvalid:
+        data = read({c: pa.string() for c in columns})
+        for c in columns:
+            if c != time_col:
+                data[c] = pd.to_numeric(data[c], errors='coerce').astype(np.float32)
+        data[time_col] = data[time_col].astype('category')
+    return data, len(truncated)
+
+
+def load_logger_csv(path, schema=None, canonical=False, return_report=False):
+    """Read, type and validate one logger CSV; optionally return a repair report."""
+    header = read_header(path)
+    name = schema or detect_schema(header)
+    spec = SCHEMAS[name]
+    values = spec['values']
+    time_col = spec['time']
+    keep = [c for c in header if c == time_col or c in values or c in spec.get('optional', []) or c == LABEL_COLUMN]
+    data, truncated = read_columns(path, keep, time_col)
+
+    # Validate each distinct timestamp once, then map through the category codes
+    stamps = data[time_col].cat
+    valid = np.append(np.asarray(stamps.categories.str.match(TIME_PATTERNS[time_col]), dtype=bool), False)
+    bad_time = ~valid[stamps.codes.to_numpy()]
+    block = data[values].to_numpy()
+    missing = np.isnan(block).any(axis=1)
+    # Raw int16 layouts stay float32 if the file actually holds float values (an nRF device with that header)
+    as_int16 = spec['dtype'] == 'int16' and np.array_equal(block[~missing], np.round(block[~missing]))
+    out_of_range = np.zeros(len(data), dtype=bool)
+    if as_int16:
+        out_of_range = ((block < -32768) | (block > 32767)).any(axis=1)
+    drop = bad_time | missing | out_of_range
+    if drop.any():
+        data = data.loc[~drop].reset_index(drop=True)
+    if as_int16:
+        data[values] = data[values].astype(np.int16)
+    if canonical and name == 'quadruple':
+        data = data[[time_col] + IMU_GAM + [c for c in data.columns if c not in IMU_GAM and c != time_col]]
+    if return_report:
+        return data, {'schema': name, 'rows': int(len(drop)) + truncated, 'truncated': truncated, 'bad_time': int(bad_time.sum()),
+                      'missing': int(missing.sum()), 'out_of_range': int(out_of_range.sum()),
+                      'kept': int(len(data))}
+    return data
+
+
+if __name__ == '__main__':
+    p = argparse.ArgumentParser()
+    p.add_argument('inputs', nargs='+', help='Logger CSV files')
+    p.add_argument('--schema', choices=sorted(SCHEMAS), default=None, help='Force a layout instead of detecting it')
+    p.add_argument('--bench', action='store_true', help='Compare time and memory with a plain pd.read_csv')
+    args = p.parse_args()
+
+    for path in args.inputs:
+        t0 = time.perf_counter()
+        data, report = load_logger_csv(path, args.schema, return_report=True)
+        secs = time.perf_counter() - t0
+        print(f"{path}: {report}")
+        if args.bench:
+            t0 = time.perf_counter()
+            plain = pd.read_csv(path)
+            plain_secs = time.perf_counter() - t0
+            mem, plain_mem = data.memory_usage(deep=True).sum(), plain.memory_usage(deep=True).sum()
+            print(f"  load {plain_secs * 1000:.0f} ms -> {secs * 1000:.0f} ms ({plain_secs / max(secs, 1e-9):.1f}x), "
+                  f"memory {plain_mem / 1e6:.1f} MB -> {mem / 1e6:.1f} MB ({plain_mem / max(mem, 1):.1f}x)")
+    print('Done!')
@@ -0,0 +1,287 @@
+"""
+Asyncio ingest service for logger session uploads.
+
+Loggers (or the load-test client) POST their CSV output in gzip-compressed
+chunks:
+
+  POST /upload?session=<ddmmYYYY_HHMMSS>&device=<name>&seq=<n>
+  Content-Encoding: gzip
+  <CSV chunk with its header row, in any of the logger formats>
+
+A chunk is identified by (session, device, seq), so retries are idempotent: a
+chunk that was already committed is acknowledged again without being stored
+twice, and a retry of a chunk that is still pending waits for the same commit.
+
+Accepted chunks are buffered and written by a single writer task (group commit)
+every --flush-interval seconds or once --flush-rows rows are pending. Each flush
+writes one Parquet file per date partition
+(store/date=YYYY-MM-DD/part-<n>.parquet, rows sorted by session/device/seq) and
+appends the committed chunk keys to store/_manifest.jsonl. Requests are only
+acknowledged after their flush, and data is written exactly once, so there is
+no rewrite or compaction step; the manifest is reloaded on start-up.
+
+Read the store with pandas/pyarrow, e.g.
+  pd.read_parquet('ingest_store', filters=[('session', '==', '19092025_164551')])
+
+Usage:
+  python ingest_server.py --store ingest_store --port 8080
+  GET /health returns counters as JSON.
+"""
+import argparse
+import asyncio
+import gzip
+import io
+import json
+import os
+import time
+import zlib
+from datetime import datetime
+from urllib.parse import urlsplit, parse_qs
+import numpy as np
+import pyarrow as pa
+import pyarrow.csv as csv
+import pyarrow.parquet as pq
+
+DEFAULT_STORE = 'ingest_store'
+MANIFEST_FILE = '_manifest.jsonl'
+FLUSH_INTERVAL = 1.0
+FLUSH_ROWS = 200_000
+MAX_BODY = 32 * 1024 * 1024
+KEY_COLUMNS = ['session', 'device', 'seq', 'row']
+
+STATUS_TEXT = {200: 'OK', 201: 'Created', 400: 'Bad Request', 404: 'Not Found',
+               413: 'Payload Too Large', 500: 'Internal Server Error'}
+
+
+class BodyTooLarge(ValueError):
+    """Content-Length above MAX_BODY; answered with 413 instead of 400."""
+
+
+def session_date(session):
+    """Partition date from a ddmmYYYY_HHMMSS session id (today for other ids)."""
+    try:
+        return datetime.strptime(session[:8], '%d%m%Y').strftime('%Y-%m-%d')
+    except ValueError:
+        return datetime.now().strftime('%Y-%m-%d')
+
+
+def parse_chunk(body, encoding, session, device, seq):
+    """Decode one uploaded chunk into an Arrow table with the key columns prepended.
+
+    Numeric sensor columns are stored as float32; text columns (TimeStamp) as strings.
+    """
+    if encoding == 'gzip':
+        body = gzip.decompress(body)
+    # Timestamps stay text exactly as logged (HH:MM:SS or ISO), like the CSVs
+    table = csv.read_csv(io.BytesIO(body), convert_options=csv.ConvertOptions(timestamp_parsers=[]))
+    columns = [c.cast(pa.float32()) if pa.types.is_integer(c.type) or pa.types.is_floating(c.type)
+               else c.cast(pa.string()) for c in table.columns]
+    n = table.num_rows
+    keys = [pa.array([session] * n, pa.string()), pa.array([device] * n, pa.string()),
+            pa.array(np.full(n, seq, dtype=np.int32)), pa.array(np.arange(n, dtype=np.int32))]
+    return pa.Table.from_arrays(keys + columns, names=KEY_COLUMNS + table.column_names)
+
+
+class IngestStore:
+    """Idempotent, group-committed writer for the partitioned Parquet store."""
+
+    def __init__(self, path, flush_interval=FLUSH_INTERVAL, flush_rows=FLUSH_ROWS):
+        self.path = path
+        self.flush_interval = flush_interval
+        self.flush_rows = flush_rows
+        os.makedirs(path, exist_ok=True)
+        self.committed = set()
+        self.part = 0
+        manifest = os.path.join(path, MANIFEST_FILE)
+        if os.path.exists(manifest):
+            with open(manifest) as f:
+                for line in f:
+                    entry = json.loads(line)
+                    self.committed.add((entry['session'], entry['device'], entry['seq']))
+                    self.part = max(self.part, entry['part'] + 1)
+        self.pending = {}
+        self.pending_rows = 0
+        self.waiters = {}
+        self.wakeup = asyncio.Event()
+        self.stats = {'chunks': 0, 'duplicates': 0, 'rows': 0, 'files': 0, 'flushes': 0}
+
+    async def submit(self, key, frame):
+        """Queue a chunk; returns True when newly stored, False for a duplicate."""
+        if key in self.committed:
+            self.stats['duplicates'] += 1
+            return False
+        if key in self.waiters:
+            self.stats['duplicates'] += 1
+            await asyncio.shield(self.waiters[key])
+            return False
+        future = asyncio.get_running_loop().create_future()
+        self.waiters[key] = future
+        self.pending[key] = frame
+        self.pending_rows += frame.num_rows
+        if self.pending_rows >= self.flush_rows:
+            self.wakeup.set()
+        await asyncio.shield(future)
+        return True
+
+    async def run(self):
+        """Writer loop: flush on the interval or as soon as enough rows are pending."""
+        while True:
+            try:
+                await asyncio.wait_for(self.wakeup.wait(), self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self.wakeup.clear()
+            if self.pending:
+                await self.flush()
+
+    async def flush(self):
+        batch, self.pending, self.pending_rows = self.pending, {}, 0
+        # Keys stay in self.waiters until committed, so a retry arriving during the write waits for it
+        try:
+            entries = await asyncio.to_thread(self._write, batch)
+        except Exception as e:
+            for key in batch:
+                self.waiters.pop(key).set_exception(e)
+            return
+        self.committed.update(batch)
+        waiters = [self.waiters.pop(key) for key in batch]
+        self.stats['chunks'] += len(batch)
+        self.stats['rows'] += sum(f.num_rows for f in batch.values())
+        self.stats['files'] += len({e['part'] for e in entries})
+        self.stats['flushes'] += 1
+        for future in waiters:
+            future.set_result(True)
+
+    def _write(self, batch):
+        """Write one file per date partition, then record the chunks in the manifest."""
+        by_date = {}
+        for key, frame in batch.items():
+            by_date.setdefault(session_date(key[0]), []).append((key, frame))
+        entries = []
+        for date, chunks in by_date.items():
+            part = self.part
+            self.part += 1
+            data = pa.concat_tables([frame for _, frame in chunks], promote_options='permissive')
+            data = data.sort_by([(c, 'ascending') for c in KEY_COLUMNS])
+            directory = os.path.join(self.path, f'date={date}')
+            os.makedirs(directory, exist_ok=True)
+            final = os.path.join(directory, f'part-{part:06d}.parquet')
+            # Hidden temp name, so readers of the dataset never see a half-written file
+            tmp = os.path.join(directory, f'.part-{part:06d}.tmp')
+            pq.write_table(data, tmp,
+                           compression='zstd', row_group_size=64_000)
+            os.replace(tmp, final)
+            for (session, device, seq), _ in chunks:
+                entries.append({'session': session, 'device': device, 'seq': seq, 'part': part,
+                                'file': os.path.relpath(final, self.path)})
+        with open(os.path.join(self.path, MANIFEST_FILE), 'a') as f:
+            f.write(''.join(json.dumps(e) + '\n' for e in entries))
+            f.flush()
+            os.fsync(f.fileno())
+        return entries
+
+
+async def read_request(reader):
+    """Minimal HTTP/1.1 request parser: (method, target, headers, body) or None on EOF."""
+    line = await reader.readline()
+    if not line:
+        return None
+    method, target, _ = line.decode('latin-1').split(' ', 2)
+    headers = {}
+    while True:
+        line = await reader.readline()
+        if line in (b'\r\n', b'\n', b''):
+            break
+        name, _, value = line.decode('latin-1').partition(':')
+        headers[name.strip().lower()] = value.strip()
+    length = int(headers.get('content-length', 0))
+    if length > MAX_BODY:
+        raise BodyTooLarge(f'body of {length} bytes exceeds {MAX_BODY}')
+    body = await reader.readexactly(length) if length else b''
+    return method, target, headers, body
+
+
+def write_response(writer, status, payload):
+    body = json.dumps(payload).encode()
+    writer.write(f"HTTP/1.1 {status} {STATUS_TEXT[status]}\r\nContent-Type: application/json\r\n"
+                 f"Content-Length: {len(body)}\r\n\r\n".encode() + body)
+
+
+class IngestServer:
+    def __init__(self, store):
+        self.store = store
+        self.started = time.time()
+
+    async def handle(self, reader, writer):
+        """Serve requests on one keep-alive connection."""
+        try:
+            while True:
+                try:
+                    request = await read_request(reader)
+                except BodyTooLarge as e:
+                    write_response(writer, 413, {'error': str(e)})
+                    break
+                except (ValueError, asyncio.IncompleteReadError):
+                    write_response(writer, 400, {'error': 'malformed request'})
+                    break
+                if request is None:
+                    break
+                status, payload = await self.route(*request)
+                write_response(writer, status, payload)
+                await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+    async def route(self, method, target, headers, body):
+        url = urlsplit(target)
+        if method == 'GET' and url.path == '/health':
+            return 200, dict(self.store.stats, uptime=round(time.time() - self.started, 1),
+                             pending=len(self.store.pending))
+        if method != 'POST' or url.path != '/upload':
+            return 404, {'error': f'no route {method} {url.path}'}
+        query = {k: v[0] for k, v in parse_qs(url.query).items()}
+        try:
+            key = (query['session'], query['device'], int(query['seq']))
+            frame = await asyncio.to_thread(parse_chunk, body, headers.get('content-encoding'), *key)
+        # A corrupt gzip body raises zlib.error or EOFError (truncated stream), not only BadGzipFile
+        except (KeyError, ValueError, OSError, EOFError, zlib.error, pa.ArrowInvalid) as e:
+            return 400, {'error': f'invalid chunk: {e}'}
+        try:
+            stored = await self.store.submit(key, frame)
+        except Exception as e:
+            return 500, {'error': f'write failed: {e}'}
+        return (201 if stored else 200), {'session': key[0], 'device': key[1], 'seq': key[2],
+                                          'rows': frame.num_rows, 'duplicate': not stored}
+
+
+async def serve(store_path=DEFAULT_STORE, host='0.0.0.0', port=8080, flush_interval=FLUSH_INTERVAL,
+                flush_rows=FLUSH_ROWS):
+    store = IngestStore(store_path, flush_interval, flush_rows)
+    server = IngestServer(store)
+    writer_task = asyncio.create_task(store.run())
+    srv = await asyncio.start_server(server.handle, host, port, limit=1 << 16, backlog=1024)
+    print(f"Ingest server on {host}:{port}, store {store_path} ({len(store.committed)} chunks already committed)")
+    try:
+        async with srv:
+            await srv.serve_forever()
+    finally:
+        writer_task.cancel()
+        if store.pending:
+            await store.flush()
+
+
+if __name__ == '__main__':
+    p = argparse.ArgumentParser()
+    p.add_argument('--store', default=DEFAULT_STORE, help='Root directory of the Parquet store')
+    p.add_argument('--host', default='0.0.0.0', help='Bind address')
+    p.add_argument('--port', type=int, default=8080, help='Port')
+    p.add_argument('--flush-interval', type=float, default=FLUSH_INTERVAL, help='Seconds between group commits')
+    p.add_argument('--flush-rows', type=int, default=FLUSH_ROWS, help='Flush early once this many rows are pending')
+    args = p.parse_args()
+
+    try:
+        asyncio.run(serve(args.store, args.host, args.port, args.flush_interval, args.flush_rows))
+    except KeyboardInterrupt:
+        print('Stopped')
@@ -0,0 +1,137 @@
+"""
+Load-test client for ingest_server.py.
+
+Simulates many logger instances uploading at once. Each simulated device
+replays a logger CSV (the SensorTag/nRF formats from Sensor Code/, or a
+synthetic session in the same TimeStamp,Gx..Mz layout) as gzip chunks over its
+own keep-alive connection. A fraction of the chunks is sent twice to exercise
+idempotent retries: --duplicate-rate re-sends a chunk after it was acknowledged,
+--concurrent-retry-rate re-sends it on a second connection within --retry-delay
+seconds while the first request is still waiting for its group commit (or being
+written). Every chunk must be stored (201) exactly once whatever the timing,
+which the run checks at the end.
+
+Reports chunk and row throughput plus request latency percentiles.
+
+Usage:
+  python load_test.py --url http://127.0.0.1:8080 --devices 300 --chunk-rows 600
+  python load_test.py --devices 50 --concurrent-retry-rate 0.5 --retry-delay 1.5
+  python load_test.py --csv sensor_csv_data/device_1/sensor_data_nRF_IMU_1_19092025_164551.csv --devices 100
+"""
+import argparse
+import asyncio
+import gzip
+import random
+import time
+from datetime import datetime, timedelta
+from urllib.parse import urlsplit
+import numpy as np
+import pandas as pd
+
+LOGGER_COLUMNS = ['TimeStamp', 'Gx', 'Gy', 'Gz', 'Ax', 'Ay', 'Az', 'Mx', 'My', 'Mz']
+
+
+def synthetic_session(rows=6000, seed=0):
+    """A 10 Hz session in the dual/quadruple SensorTag logger CSV layout."""
+    rng = np.random.default_rng(seed)
+    start = datetime(2025, 9, 19, 16, 45, 51)
+    data = pd.DataFrame(rng.integers(-2000, 2000, (rows, 9)), columns=LOGGER_COLUMNS[1:])
+    data.insert(0, 'TimeStamp', [(start + timedelta(seconds=i // 10)).strftime('%H:%M:%S') for i in range(rows)])
+    return data
+
+
+def make_chunks(data, chunk_rows):
+    """gzip-compressed CSV chunks, each with its own header row."""
+    return [gzip.compress(data.iloc[i:i + chunk_rows].to_csv(index=False).encode(), compresslevel=6)
+            for i in range(0, len(data), chunk_rows)]
+
+
+async def post(reader, writer, host, path, body):
+    writer.write(f"POST {path} HTTP/1.1\r\nHost: {host}\r\nContent-Encoding: gzip\r\n"
+                 f"Content-Type: text/csv\r\nContent-Length: {len(body)}\r\n\r\n".encode() + body)
+    await writer.drain()
+    status = int((await reader.readline()).split()[1])
+    length = 0
+    while True:
+        line = await reader.readline()
+        if line in (b'\r\n', b''):
+            break
+        if line.lower().startswith(b'content-length:'):
+            length = int(line.split(b':')[1])
+    await reader.readexactly(length)
+    return status
+
+
+async def device(url, session, name, chunks, duplicate_rate, latencies, statuses, rng,
+                 concurrent_rate=0.0, retry_delay=1.0):
+    parts = urlsplit(url)
+    connections = [await asyncio.open_connection(parts.hostname, parts.port or 80)]
+
+    async def send(conn, path, body, delay=0.0):
+        await asyncio.sleep(delay)
+        t0 = time.perf_counter()
+        status = await post(*conn, parts.netloc, path, body)
+        latencies.append(time.perf_counter() - t0)
+        statuses[status] = statuses.get(status, 0) + 1
+
+    try:
+        for seq, body in enumerate(chunks):
+            path = f'/upload?session={session}&device={name}&seq={seq}'
+            draw = rng.random()
+            if draw < concurrent_rate:
+                # Retry over a second connection while the original is still pending or being written
+                if len(connections) == 1:
+                    connections.append(await asyncio.open_connection(parts.hostname, parts.port or 80))
+                await asyncio.gather(send(connections[0], path, body),
+                                     send(connections[1], path, body, rng.uniform(0.0, retry_delay)))
+                continue
+            await send(connections[0], path, body)
+            if draw < concurrent_rate + duplicate_rate:
+                await send(connections[0], path, body)
+    finally:
+        for _, writer in connections:
+            writer.close()
+
+
+async def run(url, data, devices=300, chunk_rows=600, duplicate_rate=0.05, seed=0,
+              concurrent_rate=0.0, retry_delay=1.0):
+    chunks = make_chunks(data, chunk_rows)
+    session = datetime.now().strftime('%d%m%Y_%H%M%S')
+    rng = random.Random(seed)
+    latencies, statuses = [], {}
+    t0 = time.perf_counter()
+    await asyncio.gather(*[device(url, session, f'device_{i + 1}', chunks, duplicate_rate, latencies, statuses, rng,
+                                  concurrent_rate, retry_delay)
+                           for i in range(devices)])
+    elapsed = time.perf_counter() - t0
+    lat = np.array(latencies) * 1000.0
+    stored = statuses.get(201, 0)
+    print(f"{devices} devices x {len(chunks)} chunks ({len(data)} rows each) in {elapsed:.1f}s")
+    print(f"  responses: {statuses}")
+    print(f"  {stored / elapsed:,.0f} chunks/s, {stored * chunk_rows / elapsed:,.0f} rows/s stored")
+    print(f"  latency ms: p50={np.percentile(lat, 50):.1f} p95={np.percentile(lat, 95):.1f} "
+          f"p99={np.percentile(lat, 99):.1f}")
+    expected = devices * len(chunks)
+    if stored == expected and set(statuses) <= {200, 201}:
+        print(f"  idempotency: ok ({expected} chunks stored once, {statuses.get(200, 0)} retries acknowledged)")
+    else:
+        print(f"  idempotency: FAILED ({stored} chunks stored for {expected} distinct chunks)")
+    return statuses
+
+
+if __name__ == '__main__':
+    p = argparse.ArgumentParser()
+    p.add_argument('--url', default='http://127.0.0.1:8080', help='Ingest server URL')
+    p.add_argument('--csv', default=None, help='Logger CSV to replay (synthetic session if omitted)')
+    p.add_argument('--devices', type=int, default=300, help='Concurrent simulated devices')
+    p.add_argument('--chunk-rows', type=int, default=600, help='Rows per uploaded chunk (600 = 1 min at 10 Hz)')
+    p.add_argument('--duplicate-rate', type=float, default=0.05, help='Fraction of chunks re-sent after their ack')
+    p.add_argument('--concurrent-retry-rate', type=float, default=0.05,
+                   help='Fraction of chunks re-sent on a second connection before the first is acknowledged')
+    p.add_argument('--retry-delay', type=float, default=1.0, help='Concurrent retries start within this many seconds')
+    args = p.parse_args()
+
+    data = pd.read_csv(args.csv) if args.csv else synthetic_session()
+    asyncio.run(run(args.url, data, args.devices, args.chunk_rows, args.duplicate_rate,
+                    concurrent_rate=args.concurrent_retry_rate, retry_delay=args.retry_delay))
+    print('Done!')
@@ -0,0 +1,54 @@
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'Model', 'Sensor Model'))
+from preprocessing import SensorPreprocessor  # noqa: E402
+
+
+@pytest.fixture
+def data():
+    rng = np.random.default_rng(0)
+    n = 1000
+    return pd.DataFrame({
+        'TimeStamp': np.arange(n) * 0.02,
+        'AccX': rng.normal(0.1, 1.0, n),
+        'GyroZ': rng.normal(50.0, 20.0, n),
+        'Const': np.full(n, 3.0),
+        'Position': rng.integers(1, 13, n),
+    })
+
+
+def assert_same_fit(pre, full):
+    assert pre.feature_columns == full.feature_columns
+    assert np.array_equal(pre.classes, full.classes)
+    np.testing.assert_allclose(pre.mean, full.mean, rtol=1e-5, atol=1e-6)
+    np.testing.assert_allclose(pre.scale, full.scale, rtol=1e-5)
+
+
+def test_partial_fit_over_chunks_matches_fit(data):
+    full = SensorPreprocessor().fit(data)
+    streamed = SensorPreprocessor()
+    for idx in np.array_split(np.arange(len(data)), 4):
+        streamed.partial_fit(data.iloc[idx])
+    assert_same_fit(streamed, full)
+
+
+def test_partial_fit_continues_after_fit(data):
+    full = SensorPreprocessor().fit(data)
+    parts = np.array_split(np.arange(len(data)), 4)
+    resumed = SensorPreprocessor().fit(data.iloc[parts[0]])
+    for idx in parts[1:]:
+        resumed.partial_fit(data.iloc[idx])
+    assert_same_fit(resumed, full)
+
+
+def test_partial_fit_after_load_raises(data, tmp_path):
+    path = tmp_path / 'preprocessing.json'
+    SensorPreprocessor().fit(data).save(str(path))
+    loaded = SensorPreprocessor.load(str(path))
+    with pytest.raises(ValueError):
+        loaded.partial_fit(data)
@@ -0,0 +1,55 @@
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'Model', 'DAG Creation'))
+from pose_graph import SURYA_NAMASKAR_POSES, compute_edge_weights  # noqa: E402
+from round_segmenter import RoundSegmenter, RoundStats, segment_stream  # noqa: E402
+
+POSES = SURYA_NAMASKAR_POSES
+GAP = [np.nan] * 3
+
+
+def synthetic_round(poses=POSES, rows=4, skip=()):
+    return [p for p in poses if p not in skip for _ in range(rows)]
+
+
+def run(labels, times=None):
+    stats = RoundStats(POSES)
+    times = np.arange(len(labels)) / 2.0 if times is None else times
+    rows = segment_stream(times, labels, RoundSegmenter(POSES), stats)
+    return rows, stats
+
+
+def test_rounds_separated_by_unlabelled_rows():
+    rows, _ = run(synthetic_round() + GAP + synthetic_round() + GAP + synthetic_round())
+    assert len(rows) == 3
+    assert all(r['complete'] for r in rows)
+    assert all(r[f'entry_s_{POSES[-1]}'] == (len(POSES) - 1) * 2.0 for r in rows)
+
+
+def test_round_that_skips_the_last_pose():
+    rows, _ = run(synthetic_round(skip=[POSES[-1]]) + synthetic_round())
+    assert len(rows) == 2
+    assert rows[0]['poses_visited'] == len(POSES) - 1
+    assert not rows[0]['complete']
+    assert rows[1]['complete']
+
+
+def test_edge_weights_average_every_step():
+    # pose 3 -> 4 twice in one round, the second step 3 s slower; gaps between labelled rows span the NaN rows
+    flicker = synthetic_round(POSES[:4]) + [POSES[2], POSES[3], POSES[3]] + synthetic_round(POSES[4:])
+    labels = flicker + GAP + synthetic_round()
+    steps = np.full(len(labels), 0.5)
+    steps[4 * 4 + 1] = 3.5
+    times = np.cumsum(steps)
+    _, stats = run(labels, times)
+
+    data = pd.DataFrame({'Position': labels, 't': times}).dropna().reset_index(drop=True)
+    data['delta_t'] = data['t'].diff().fillna(0)
+    expected = compute_edge_weights(data, POSES)
+    weights = stats.edge_weights()
+    for edge, weight in expected.items():
+        assert abs(weights[edge] - weight) < 1e-9
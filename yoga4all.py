@@ -0,0 +1,174 @@
+"""
+Single entry point for the Yoga4All tools.
+
+  log      record IMU sessions over BLE, archive logger CSVs   (Sensor Code)
+  merge    merge, label and fuse recorded sessions              (Model/Merge Data)
+  extract  landmark datasets from videos                        (Model/Video Model)
+  train    preprocess, train and search sensor models           (Model/Sensor Model)
+  infer    score sessions, retrieval, effort and form feedback  (Model/Sensor Model, Model/Feedback)
+  dag      pose graph and streaming pose decoding               (Model/DAG Creation)
+
+Each command runs one of its tools (the first one listed when none is named).
+Everything after the tool name goes to the tool unchanged, e.g.
+  python yoga4all.py log dual --simulate
+  python yoga4all.py train search --latency-sla 5
+  python yoga4all.py infer batch --data-dir sensor_csv_data --output predictions/
+
+The tool script runs as __main__ with its folder on sys.path, exactly as if it
+were started from there. Nothing is imported before a tool is chosen, so
+TensorFlow, mediapipe, cv2 and bleak only load for the command that needs
+them. `yoga4all.py --help` and `yoga4all.py <command> --help` use only the
+standard library. `python yoga4all.py startup` times those light invocations
+against the startup budget (100 ms) and checks that they create no files. It
+also runs `<command> <tool> --help` for every tool once and checks that it
+exits cleanly without creating files (e.g. a logger that starts scanning and
+opens CSVs instead); those load the tool's own imports, so they are timed but
+not held to the budget.
+
+Usage:
+  python yoga4all.py --help
+  python yoga4all.py train --help
+  python yoga4all.py merge label --data-dir sensor_csv_data --output data/labelled
+  python yoga4all.py startup --runs 10
+"""
+import argparse
+import os
+import runpy
+import sys
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+STARTUP_BUDGET_MS = 100.0
+
+# command -> (help, {tool: (script relative to the repo root, help)}); the first tool is the default
+COMMANDS = {
+    'log': ('Record IMU sessions over BLE and archive logger CSVs', {
+        'quadruple': ('Sensor Code/quadruple_sensortag_logger.py', 'Up to four nRF IMUs (sensor_csv_data/device_N)'),
+        'dual': ('Sensor Code/dual_sensortag_logger.py', 'Two CC2650 SensorTags with adaptive sampling period'),
+        'nano': ('Sensor Code/Nano_ble_sensor_tag.py.py', 'One nRF IMU with heart rate'),
+        'ti': ('Sensor Code/TI_sensor_IMU.py', 'One CC2650 SensorTag, raw values'),
+        'archive': ('Sensor Code/imu_archive.py', 'Pack/unpack/read compact .imua archives'),
+        'validate': ('Sensor Code/sensor_loader.py', 'Validate logger CSVs against their schema'),
+        'rate': ('Sensor Code/ble_rate_control.py', 'Sampling-period controller benchmarks'),
+    }),
+    'merge': ('Merge, label and fuse recorded sessions', {
+        'label': ('Model/Merge Data/label_sessions.py', 'Merge and label every session (label_rules.json)'),
+        'auto': ('Model/Merge Data/auto_label.py', 'DAG-constrained automatic Position labels'),
+        'fuse': ('Model/Merge Data/fuse_video_sensor.py', 'Align video landmarks with sensor streams'),
+        'datasets': ('Model/Merge Data/merge_datasets.py', 'Concatenate per-video datasets'),
+    }),
+    'extract': ('Landmark datasets from videos', {
+        'video': ('Model/Video Model/create_dataset_from_video.py', 'MediaPipe landmarks of one video'),
+        'multiview': ('Model/Video Model/multiview_extract.py', 'Fused landmarks from several camera angles'),
+        'classify': ('Model/Video Model/landmark_classifier.py', 'Landmark pose classifier'),
+        'bench': ('Model/Video Model/benchmark_extraction.py', 'Extraction throughput benchmark'),
+    }),
+    'train': ('Preprocess, train and search sensor models', {
+        'lstm': ('Model/Sensor Model/basic_lstm.py', 'Train the basic LSTM'),
+        'grid': ('Model/Sensor Model/lstm+gridsearchcv.py', 'LSTM grid search with cross-validation'),
+        'search': ('Model/Sensor Model/model_search.py', 'Latency-aware architecture search'),
+        'personalize': ('Model/Sensor Model/personalize.py', 'Per-participant head fine-tuning'),
+        'preprocess': ('Model/Sensor Model/preprocessing.py', 'Fit the preprocessing artifact'),
+        'store': ('Model/Sensor Model/session_store.py', 'Build the memory-mapped session store'),
+    }),
+    'infer': ('Score sessions, retrieval, effort and form feedback', {
+        'batch': ('Model/Sensor Model/batch_infer.py', 'Batch scoring of archived sessions'),
+        'index': ('Model/Sensor Model/embedding_index.py', 'Nearest-pose window retrieval'),
+        'effort': ('Model/Feedback/effort_stream.py', 'Heart-rate effort per pose segment'),
+        'feedback': ('Model/Feedback/dtw_feedback.py', 'Execution feedback against references'),
+    }),
+    'dag': ('Pose graph and streaming pose decoding', {
+        'graph': ('Model/DAG Creation/dag.py', 'Measure and draw the pose graph'),
+        'decode': ('Model/DAG Creation/online_decoder.py', 'Streaming fixed-lag pose decoder'),
+        'rounds': ('Model/DAG Creation/round_segmenter.py', 'Per-round timing and incremental pose graph'),
+    }),
+}
+LIGHT_INVOCATIONS = [['--help']] + [[command, '--help'] for command in COMMANDS]
+TOOL_HELP_INVOCATIONS = [[command, tool, '--help'] for command, (_, tools) in COMMANDS.items() for tool in tools]
+
+
+def build_parser():
+    p = argparse.ArgumentParser(prog='yoga4all', description='Yoga4All tools',
+                                formatter_class=argparse.RawDescriptionHelpFormatter)
+    sub = p.add_subparsers(dest='command', required=True, metavar='command')
+    for command, (help_text, tools) in COMMANDS.items():
+        listing = '\n'.join(f"  {name:<12}{tool_help} ({path})" for name, (path, tool_help) in tools.items())
+        s = sub.add_parser(command, help=help_text, formatter_class=argparse.RawDescriptionHelpFormatter,
+                           description=f"{help_text}.\n\ntools (default: {next(iter(tools))}):\n{listing}")
+        s.add_argument('tool', nargs='?', choices=list(tools), help='Tool to run')
+        s.add_argument('args', nargs=argparse.REMAINDER, help='Arguments passed to the tool')
+    s = sub.add_parser('startup', help='Time the light invocations against the startup budget')
+    s.add_argument('--runs', type=int, default=10, help='Runs per invocation (median is reported)')
+    s.add_argument('--budget', type=float, default=STARTUP_BUDGET_MS, help='Startup budget (ms)')
+    return p
+
+
+def run_tool(command, tool, args):
+    """Run a tool script as __main__ with its own folder importable, like `python <script> args`."""
+    path = os.path.join(ROOT, COMMANDS[command][1][tool][0])
+    sys.path.insert(0, os.path.dirname(path))
+    sys.argv = [path] + list(args)
+    runpy.run_path(path, run_name='__main__')
+
+
+def startup(runs=10, budget=STARTUP_BUDGET_MS):
+    """Median wall time of each light invocation in a fresh interpreter; returns True if all fit the budget."""
+    import statistics
+    import subprocess
+    import tempfile
+    import time
+
+    def timed(cmd, cwd, runs=runs):
+        times = []
+        for _ in range(runs):
+            t0 = time.perf_counter()
+            code = subprocess.run(cmd, cwd=cwd, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+                                  stdin=subprocess.DEVNULL, timeout=60, check=False).returncode
+            times.append((time.perf_counter() - t0) * 1000)
+        return statistics.median(times), code
+
+    ok = True
+    with tempfile.TemporaryDirectory() as cwd:
+        base, _ = timed([sys.executable, '-c', 'pass'], cwd)
+        print(f"{'python -c pass':<28}{base:7.1f} ms  (interpreter baseline)")
+        for invocation in LIGHT_INVOCATIONS:
+            ms, _ = timed([sys.executable, os.path.abspath(__file__)] + invocation, cwd)
+            created = os.listdir(cwd)
+            status = 'ok' if ms <= budget and not created else 'OVER' if ms > budget else 'FILES'
+            ok &= status == 'ok'
+            print(f"{' '.join(['yoga4all'] + invocation):<28}{ms:7.1f} ms  {status}"
+                  + (f" (created {created})" if created else ''))
+    print(f"Budget {budget:.0f} ms: {'met' if ok else 'NOT met'}")
+
+    clean = True
+    for invocation in TOOL_HELP_INVOCATIONS:
+        with tempfile.TemporaryDirectory() as cwd:
+            try:
+                ms, code = timed([sys.executable, os.path.abspath(__file__)] + invocation, cwd, runs=1)
+            except subprocess.TimeoutExpired:
+                ms, code = float('nan'), 'timeout'
+            created = os.listdir(cwd)
+        status = 'FILES' if created else f'EXIT {code}' if code else 'ok'
+        clean &= status == 'ok'
+        print(f"{' '.join(['yoga4all'] + invocation):<40}{ms:7.1f} ms  {status}"
+              + (f" (created {created})" if created else ''))
+    print(f"Tool --help: {'clean' if clean else 'NOT clean'}")
+    return ok and clean
+
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else list(argv)
+    p = build_parser()
+    # Only the command and tool name are parsed here: options after them (including --help) belong to the tool
+    if argv and argv[0] in COMMANDS and len(argv) > 1 and argv[1] in COMMANDS[argv[0]][1]:
+        return run_tool(argv[0], argv[1], argv[2:])
+    if argv and argv[0] in COMMANDS and argv[1:] and argv[1] not in ('-h', '--help'):
+        # Options without a tool name go to the default tool
+        return run_tool(argv[0], next(iter(COMMANDS[argv[0]][1])), argv[1:])
+    args = p.parse_args(argv)
+    if args.command == 'startup':
+        sys.exit(0 if startup(args.runs, args.budget) else 1)
+    run_tool(args.command, args.tool or next(iter(COMMANDS[args.command][1])), args.args)
+
+
+if __name__ == '__main__':
+    main()